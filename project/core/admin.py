@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import SEARCH_VAR
 
-from .models import Council, Session, Vote, Deputy, Voice
-from .utils import recalc_vote_results
+from .models import Council, Session, Vote, Deputy, Voice, ParsedPage
+from .utils import recalc_vote_results, recalc_votes_results
+from .agreement import refresh_agreement
+from .search import search_votes
 
 
 @admin.register(Council)
@@ -27,12 +30,43 @@ class VoteAdmin(admin.ModelAdmin):
     list_filter = ('types', 'council', 'session')
     search_fields = ('title',)
     inlines = (VoiceAdminInline,)
+    actions = ('recalc_results',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексам названия вместо ILIKE по всей таблице
+        if not search_term.strip():
+            return queryset, False
+        return search_votes(queryset, search_term), False
+
+    def get_ordering(self, request):
+        # ChangeList сортирует результаты заново, поэтому при поиске
+        # сортировка по релевантности идёт первой
+        if request.GET.get(SEARCH_VAR, '').strip():
+            return ('-search_rank',)
+        return super().get_ordering(request)
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
         # Пересчитываем результаты голосования
         recalc_vote_results(obj)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Голоса из формы уже сохранены, пересчитываем статистику по
+        # депутатам для сессии голосования (и прежней сессии)
+        sessions = {form.instance.session_id}
+        if 'session' in form.changed_data and form.initial.get('session'):
+            sessions.add(form.initial['session'])
+        refresh_agreement(sessions)
+
+    def recalc_results(self, request, queryset):
+        # Пересчитываем результаты выбранных голосований одним запросом
+        count = recalc_votes_results(queryset.values_list('pk', flat=True))
+        self.message_user(
+            request, 'Изменено голосований: {}'.format(count)
+        )
+    recalc_results.short_description = 'Пересчитать результаты голосований'
+
 
 @admin.register(Deputy)
 class DeputyAdmin(admin.ModelAdmin):
@@ -47,3 +81,31 @@ class VoiceAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         # Пересчитываем результаты голосования
         recalc_vote_results(obj.vote)
+
+        # Пересчитываем статистику по депутатам для сессии голосования
+        # (и сессии прежнего голосования)
+        votes = {obj.vote_id}
+        if 'vote' in form.changed_data and form.initial.get('vote'):
+            votes.add(form.initial['vote'])
+        refresh_agreement(
+            Vote.objects.filter(pk__in=votes)
+                        .values_list('session_id', flat=True)
+        )
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recalc_vote_results(obj.vote)
+        refresh_agreement([obj.vote.session_id])
+
+
+@admin.register(ParsedPage)
+class ParsedPageAdmin(admin.ModelAdmin):
+    list_display = (
+        'file_name', 'page', 'parser_version', 'parsed', 'quarantined'
+    )
+    list_filter = ('parser_version', 'file_name')
+
+    def quarantined(self, obj):
+        return bool(obj.error)
+    quarantined.boolean = True
+    quarantined.short_description = 'в карантине'
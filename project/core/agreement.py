@@ -0,0 +1,560 @@
+from django.db import transaction
+from django.db.models import QuerySet
+
+from .models import Vote, Deputy, Voice, Agreement, AgreementVersion
+from .generation import dataset_changed
+from .response_cache import ResponseCache
+
+from typing import Optional, Iterable, Iterator, Union
+from datetime import date
+import uuid
+import numpy as np
+
+
+# Значения Voice.RESULT, при которых депутат принял участие в голосовании:
+# За, Проти, Утримався
+VOTED_RESULTS = (1, 2, 3)
+
+# Минимальный средний процент одинаковых голосов депутатов одного блока
+BLOC_THRESHOLD = 80.0
+
+
+def get_index(ids: np.ndarray, pk: int) -> int:
+    """
+    Получаем позицию id в упорядоченном массиве
+    """
+    index = int(np.searchsorted(ids, pk))
+    if index == len(ids) or ids[index] != pk:
+        raise KeyError(pk)
+    return index
+
+
+def get_deputies() -> tuple:
+    """
+    Получаем упорядоченные id и ФИО всех депутатов
+    """
+    deputies = list(
+        Deputy.objects.order_by('pk').values_list('pk', 'full_name')
+    )
+    return (
+        np.array([pk for pk, _ in deputies], dtype=np.int64),
+        [full_name for _, full_name in deputies]
+    )
+
+
+class VoteMatrix:
+    """
+    Матрица голосов депутаты × голосования (int8, значение Voice.RESULT,
+    0 - голоса депутата нет). Голосования упорядочены по дате сессии,
+    внутри сессии сгруппированы по городскому совету, строки и столбцы
+    сопоставлены по id депутатов и голосований.
+    """
+    def __init__(self, deputy_ids: np.ndarray, full_names: list,
+                 vote_ids: np.ndarray, session_ids: np.ndarray,
+                 council_ids: np.ndarray, results: np.ndarray):
+        self.deputy_ids = deputy_ids
+        self.full_names = full_names
+        self.vote_ids = vote_ids
+        self.session_ids = session_ids
+        self.council_ids = council_ids
+        self.results = results
+
+    @classmethod
+    def from_db(cls, votes: Optional[QuerySet] = None) -> 'VoteMatrix':
+        """
+        Собираем матрицу по голосованиям из базы данных тремя запросами
+        """
+        if votes is None:
+            votes = Vote.objects.all()
+
+        columns = np.array(
+            votes.order_by('session__date', 'session_id', 'council_id', 'pk')
+                 .values_list('pk', 'session_id', 'council_id'),
+            dtype=np.int64
+        ).reshape(-1, 3)
+        vote_ids = columns[:, 0]
+        deputy_ids, full_names = get_deputies()
+        voices = Voice.objects.filter(vote__in=votes).values_list(
+            'deputy_id', 'vote_id', 'result'
+        )
+        voices = np.array(voices, dtype=np.int64).reshape(-1, 3)
+
+        results = np.zeros((len(deputy_ids), len(vote_ids)), dtype=np.int8)
+        if len(voices):
+            # Голосования упорядочены по дате, а не по id
+            order = np.argsort(vote_ids)
+            positions = order[
+                np.searchsorted(vote_ids, voices[:, 1], sorter=order)
+            ]
+            rows = np.searchsorted(deputy_ids, voices[:, 0])
+            results[rows, positions] = voices[:, 2]
+
+        return cls(
+            deputy_ids, full_names, vote_ids, columns[:, 1], columns[:, 2],
+            results
+        )
+
+    def get_deputy_index(self, deputy_id: int) -> int:
+        """
+        Получаем номер строки депутата
+        """
+        return get_index(self.deputy_ids, deputy_id)
+
+    def iter_blocks(self) -> Iterator[tuple]:
+        """
+        Получаем столбцы голосований каждой сессии городского совета
+        (id совета, id сессии, срез столбцов)
+        """
+        if not len(self.vote_ids):
+            return
+
+        changes = np.flatnonzero(
+            (np.diff(self.session_ids) != 0) |
+            (np.diff(self.council_ids) != 0)
+        ) + 1
+        starts = np.concatenate(([0], changes))
+        stops = np.concatenate((changes, [len(self.vote_ids)]))
+        for start, stop in zip(starts, stops):
+            yield (
+                int(self.council_ids[start]), int(self.session_ids[start]),
+                slice(start, stop)
+            )
+
+    def get_agreement(self, indexes: Union[list, slice],
+                      columns: slice = slice(None)) -> tuple:
+        """
+        Получаем для указанных строк депутатов количество голосований,
+        в которых депутаты проголосовали одинаково, и количество
+        голосований, в которых приняли участие оба (матрицы
+        len(indexes) × количество депутатов). Можно ограничиться
+        указанными столбцами голосований.
+        """
+        # Голоса кодируем отдельной 0/1 матрицей на каждое значение,
+        # тогда совпадения считаются произведением матриц
+        results = self.results[:, columns]
+        encoded = [
+            (results == value).astype(np.int32)
+            for value in VOTED_RESULTS
+        ]
+        voted = sum(encoded)
+
+        same = sum(matrix[indexes].dot(matrix.T) for matrix in encoded)
+        both = voted[indexes].dot(voted.T)
+
+        return same, both
+
+    def get_deputy_agreement(self, index: int) -> dict:
+        """
+        Процент одинаковых голосов остальных депутатов с указанным
+        депутатом среди голосований, в которых приняли участие оба
+        """
+        same, both = self.get_agreement([index])
+        same, both = same[0], both[0]
+
+        result = {}
+        for other, full_name in enumerate(self.full_names):
+            if other == index:
+                continue
+            if both[other]:
+                result[full_name] = float(same[other] * 100 / both[other])
+            else:
+                result[full_name] = 0.0
+        return result
+
+
+class AgreementMatrix:
+    """
+    Попарная статистика депутаты × депутаты, просуммированная по
+    сохранённой статистике сессий: количество голосований, в которых
+    оба депутата проголосовали, и в которых они проголосовали одинаково
+    (см. AgreementHistory.get_matrix)
+    """
+    def __init__(self, deputy_ids: np.ndarray, full_names: list,
+                 same: np.ndarray, both: np.ndarray):
+        self.deputy_ids = deputy_ids
+        self.full_names = full_names
+        self.same = same
+        self.both = both
+
+    def get_deputy_index(self, deputy_id: int) -> int:
+        """
+        Получаем номер строки депутата
+        """
+        return get_index(self.deputy_ids, deputy_id)
+
+    def get_percent(self) -> np.ndarray:
+        """
+        Процент одинаковых голосов для всех пар депутатов
+        (0, если общих голосований нет)
+        """
+        percent = np.zeros(self.same.shape)
+        np.divide(
+            self.same * 100, self.both, out=percent, where=self.both > 0
+        )
+        return percent
+
+    def get_top(self, index: int, k: int) -> tuple:
+        """
+        Получаем k депутатов, которые чаще и реже всего голосуют одинаково
+        с указанным депутатом ([(ФИО, процент)], [(ФИО, процент)]).
+        Депутаты без общих голосований не учитываются.
+        """
+        percent = self.get_percent()[index]
+        others = np.flatnonzero(self.both[index])
+        others = others[others != index]
+
+        # Устойчивая сортировка: при равном проценте - по id депутата
+        def get_rows(order):
+            return [
+                (self.full_names[other], float(percent[other]))
+                for other in others[order][:k]
+            ]
+        return (
+            get_rows(np.argsort(-percent[others], kind='mergesort')),
+            get_rows(np.argsort(percent[others], kind='mergesort'))
+        )
+
+    def get_blocs(self, threshold: float = BLOC_THRESHOLD) -> list:
+        """
+        Разбиваем депутатов на блоки иерархической кластеризацией со
+        средней связью: блоки объединяются, пока средний процент
+        одинаковых голосов между ними не ниже порога. Депутаты, которые
+        не голосовали, не учитываются. Блоки упорядочены по размеру.
+        """
+        active = np.flatnonzero(np.diagonal(self.both))
+        blocs = [[index] for index in active]
+        sizes = np.ones(len(active))
+        similarity = self.get_percent()[np.ix_(active, active)]
+        np.fill_diagonal(similarity, -np.inf)
+
+        while len(blocs) > 1:
+            first, second = np.unravel_index(
+                np.argmax(similarity), similarity.shape
+            )
+            if similarity[first, second] < threshold:
+                break
+
+            # Средний процент нового блока с остальными взвешен по размеру
+            # объединяемых блоков
+            merged = (
+                similarity[first] * sizes[first] +
+                similarity[second] * sizes[second]
+            ) / (sizes[first] + sizes[second])
+            similarity[first] = merged
+            similarity[:, first] = merged
+            similarity[first, first] = -np.inf
+            sizes[first] += sizes[second]
+            blocs[first] += blocs[second]
+
+            similarity = np.delete(
+                np.delete(similarity, second, axis=0), second, axis=1
+            )
+            sizes = np.delete(sizes, second)
+            del blocs[second]
+
+        blocs.sort(key=lambda bloc: (-len(bloc), min(bloc)))
+        return [
+            [self.full_names[index] for index in sorted(bloc)]
+            for bloc in blocs
+        ]
+
+
+@transaction.atomic
+def refresh_agreement(sessions: Optional[Iterable[int]] = None):
+    """
+    Пересчитываем сохранённую попарную статистику голосов депутатов
+    по всем сессиям или только по указанным
+    """
+    agreements = Agreement.objects.all()
+    votes = Vote.objects.all()
+    if sessions is not None:
+        sessions = list(sessions)
+        agreements = agreements.filter(session__in=sessions)
+        votes = votes.filter(session__in=sessions)
+    agreements.delete()
+
+    matrix = VoteMatrix.from_db(votes)
+    objects = []
+    for council_id, session_id, columns in matrix.iter_blocks():
+        same, both = matrix.get_agreement(slice(None), columns)
+        # Сохраняем только пары депутатов, которые голосовали вместе
+        for row, column in zip(*np.nonzero(both)):
+            objects.append(Agreement(
+                council_id=council_id,
+                session_id=session_id,
+                deputy_id=int(matrix.deputy_ids[row]),
+                other_id=int(matrix.deputy_ids[column]),
+                both=int(both[row, column]),
+                same=int(same[row, column])
+            ))
+    Agreement.objects.bulk_create(objects, batch_size=1000)
+    bump_agreement_version()
+    dataset_changed()
+
+
+def bump_agreement_version():
+    """
+    Меняем версию сохранённой статистики в текущей транзакции
+    """
+    version = uuid.uuid4().hex
+    if not AgreementVersion.objects.filter(pk=1).update(version=version):
+        AgreementVersion.objects.update_or_create(
+            pk=1, defaults={'version': version}
+        )
+
+
+class AgreementHistory:
+    """
+    Сохранённая попарная статистика по сессиям городских советов,
+    упорядоченным по дате, с накопленными суммами. Сумма за любой период
+    - разность двух накопленных сумм, поэтому строка депутата за период
+    получается за O(количество депутатов).
+    """
+    # Размер кеша накопленных сумм в размерах статистики
+    cumulative_cache_ratio = 4
+
+    def __init__(self, deputy_ids: np.ndarray, full_names: list,
+                 council_ids: np.ndarray, session_ids: np.ndarray,
+                 dates: np.ndarray, same: np.ndarray, both: np.ndarray,
+                 version: str = None):
+        self.deputy_ids = deputy_ids
+        self.full_names = full_names
+        self.council_ids = council_ids
+        self.session_ids = session_ids
+        self.dates = dates
+        self.same = same
+        self.both = both
+        self.version = version
+        # Накопленные суммы по выборкам сессий {(совет, сессия): суммы}.
+        # Выборок много (советы и сессии), поэтому давно не
+        # использовавшиеся суммы вытесняются
+        self.cumulative = ResponseCache(
+            self.cumulative_cache_ratio * (same.nbytes + both.nbytes)
+        )
+
+    @staticmethod
+    def get_version() -> str:
+        """
+        Версия сохранённой статистики одним запросом по первичному ключу
+        """
+        return AgreementVersion.objects.filter(pk=1).values_list(
+            'version', flat=True
+        ).first() or ''
+
+    @classmethod
+    def from_db(cls, version: str = None) -> 'AgreementHistory':
+        """
+        Загружаем сохранённую статистику из базы данных
+        """
+        deputy_ids, full_names = get_deputies()
+        rows = list(
+            Agreement.objects.order_by()
+                             .values_list('council', 'session',
+                                          'session__date', 'deputy',
+                                          'other', 'same', 'both')
+        )
+
+        blocks = sorted({
+            (session_date, session, council)
+            for council, session, session_date, *_ in rows
+        })
+        positions = {
+            (council, session): position
+            for position, (_, session, council) in enumerate(blocks)
+        }
+
+        size = len(deputy_ids)
+        same = np.zeros((len(blocks), size, size), dtype=np.int32)
+        both = np.zeros_like(same)
+        if rows:
+            values = np.array([
+                (positions[row[0], row[1]],) + row[3:] for row in rows
+            ], dtype=np.int64)
+            blocks_index = values[:, 0]
+            rows_index = np.searchsorted(deputy_ids, values[:, 1])
+            columns_index = np.searchsorted(deputy_ids, values[:, 2])
+            same[blocks_index, rows_index, columns_index] = values[:, 3]
+            both[blocks_index, rows_index, columns_index] = values[:, 4]
+
+        return cls(
+            deputy_ids,
+            full_names,
+            np.array([council for *_, council in blocks], dtype=np.int64),
+            np.array([session for _, session, _ in blocks], dtype=np.int64),
+            np.array(
+                [session_date for session_date, *_ in blocks],
+                dtype='datetime64[D]'
+            ),
+            same,
+            both,
+            version
+        )
+
+    def get_deputy_index(self, deputy_id: int) -> int:
+        """
+        Получаем номер строки депутата
+        """
+        return get_index(self.deputy_ids, deputy_id)
+
+    def get_cumulative(self, council: Optional[int] = None,
+                       session: Optional[int] = None) -> tuple:
+        """
+        Получаем номера сессий выборки и их накопленные суммы
+        (первая сумма нулевая)
+        """
+        key = (council, session)
+        cumulative = self.cumulative.get(key)
+        if cumulative is None:
+            blocks = np.ones(len(self.dates), dtype=bool)
+            if council is not None:
+                blocks &= self.council_ids == council
+            if session is not None:
+                blocks &= self.session_ids == session
+
+            def get_cumsum(values):
+                values = values[blocks]
+                cumsum = np.zeros(
+                    (len(values) + 1,) + values.shape[1:], dtype=np.int64
+                )
+                np.cumsum(values, axis=0, out=cumsum[1:])
+                return cumsum
+
+            cumulative = (
+                np.flatnonzero(blocks), get_cumsum(self.same),
+                get_cumsum(self.both)
+            )
+            self.cumulative.set(
+                key, cumulative, sum(x.nbytes for x in cumulative)
+            )
+        return cumulative
+
+    @staticmethod
+    def get_range(dates: np.ndarray, date_from: Optional[date] = None,
+                  date_to: Optional[date] = None) -> tuple:
+        """
+        Получаем границы сессий периода (даты включительно)
+        в упорядоченных датах сессий
+        """
+        start, stop = 0, len(dates)
+        if date_from is not None:
+            start = int(
+                np.searchsorted(dates, np.datetime64(date_from, 'D'))
+            )
+        if date_to is not None:
+            stop = int(np.searchsorted(
+                dates, np.datetime64(date_to, 'D'), side='right'
+            ))
+        return start, max(start, stop)
+
+    def get_sums(self, index: Union[int, slice] = slice(None),
+                 council: Optional[int] = None,
+                 session: Optional[int] = None,
+                 date_from: Optional[date] = None,
+                 date_to: Optional[date] = None) -> tuple:
+        """
+        Суммируем статистику для строк указанных депутатов по сессиям
+        городского совета, сессии и периоду (даты включительно)
+        """
+        blocks, same, both = self.get_cumulative(council, session)
+        start, stop = self.get_range(self.dates[blocks], date_from, date_to)
+        return (
+            same[stop, index] - same[start, index],
+            both[stop, index] - both[start, index]
+        )
+
+    def get_matrix(self, **filters) -> AgreementMatrix:
+        """
+        Получаем попарную статистику всех депутатов за выборку сессий
+        """
+        same, both = self.get_sums(**filters)
+        return AgreementMatrix(self.deputy_ids, self.full_names, same, both)
+
+    def get_deputy_agreement(self, index: int, **filters) -> dict:
+        """
+        Процент одинаковых голосов остальных депутатов с указанным
+        депутатом за выборку сессий
+        """
+        return self.get_deputies_agreement([index], **filters)[0]
+
+    def get_deputies_agreement(self, indexes: list, **filters) -> list:
+        """
+        Процент одинаковых голосов остальных депутатов с каждым из
+        указанных депутатов за выборку сессий (строки всех депутатов
+        получаем одной выборкой из накопленных сумм)
+        """
+        same, both = self.get_sums(indexes, **filters)
+        percent = np.zeros(same.shape)
+        np.divide(same * 100, both, out=percent, where=both > 0)
+
+        return [
+            {
+                full_name: float(value)
+                for other, (full_name, value) in enumerate(
+                    zip(self.full_names, row)
+                )
+                if other != index
+            }
+            for index, row in zip(indexes, percent)
+        ]
+
+    def get_trend(self, index: int, other: int, window: int,
+                  council: Optional[int] = None,
+                  date_from: Optional[date] = None,
+                  date_to: Optional[date] = None) -> list:
+        """
+        Получаем процент одинаковых голосов двух депутатов по сессиям и
+        за скользящее окно window дней, заканчивающееся датой сессии
+        (None, если общих голосований нет)
+        """
+        blocks, same, both = self.get_cumulative(council)
+        same, both = same[:, index, other], both[:, index, other]
+        dates = self.dates[blocks]
+        start, stop = self.get_range(dates, date_from, date_to)
+
+        # Накопленные суммы после последней части каждой сессии
+        sessions = self.session_ids[blocks][start:stop]
+        ends = np.flatnonzero(
+            np.append(sessions[1:] != sessions[:-1], True)
+        )[:len(sessions)] + start + 1
+        begins = np.append(start, ends[:-1]).astype(np.int64)
+        window_begins = np.maximum(np.searchsorted(
+            dates, dates[ends - 1] - np.timedelta64(window - 1, 'D')
+        ), start)
+
+        def get_percent(begins):
+            return [
+                float(value * 100 / count) if count else None
+                for value, count in zip(
+                    same[ends] - same[begins], both[ends] - both[begins]
+                )
+            ]
+
+        return [
+            {
+                'session': int(self.session_ids[blocks[end - 1]]),
+                'date': dates[end - 1].item(),
+                'both': int(both[end] - both[begin]),
+                'same': int(same[end] - same[begin]),
+                'agreement': agreement,
+                'window_agreement': window_agreement,
+            }
+            for end, begin, agreement, window_agreement in zip(
+                ends, begins, get_percent(begins), get_percent(window_begins)
+            )
+        ]
+
+
+# Статистика, загруженная процессом
+loaded_history = None
+
+
+def get_agreement_history() -> AgreementHistory:
+    """
+    Получаем сохранённую статистику, загружая её заново, только если
+    она была пересчитана
+    """
+    global loaded_history
+    version = AgreementHistory.get_version()
+    if loaded_history is None or loaded_history.version != version:
+        loaded_history = AgreementHistory.from_db(version)
+    return loaded_history
@@ -0,0 +1,17 @@
+from rest_framework.filters import BaseFilterBackend
+
+from ..search import search_votes
+
+
+class VoteSearchFilter(BaseFilterBackend):
+    """
+    Поиск голосований по названию GET параметром "search",
+    результаты упорядочены по релевантности
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_votes(queryset, text)
@@ -0,0 +1,153 @@
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from collections import OrderedDict
+from datetime import datetime, date
+import base64
+import json
+
+
+class VoteCursorPagination(BasePagination):
+    """
+    Постраничный вывод голосований по курсору: голосования упорядочены по
+    дате сессии и id, курсор - дата сессии и id последнего голосования
+    страницы. Дата сессии продублирована в голосовании, поэтому страница
+    читается по индексу (session_date, id) без OFFSET и сортировки.
+    Результаты поиска упорядочены по релевантности (аннотации search_rank
+    и search_similarity) и id, курсор для них - значения релевантности и
+    id последнего голосования страницы.
+    """
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('session_date', 'id')
+
+    request = None
+    next_position = None
+
+    @staticmethod
+    def encode_cursor(position: tuple) -> str:
+        """
+        Кодируем позицию (значения полей сортировки) в курсор
+        """
+        value = json.dumps([
+            x.isoformat() if isinstance(x, date) else x for x in position
+        ])
+        return base64.urlsafe_b64encode(value.encode('ascii')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str, ordering: tuple) -> tuple:
+        """
+        Получаем позицию (значения полей сортировки) из курсора
+        """
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode('ascii'))
+            position = json.loads(value.decode('ascii'))
+            if not isinstance(position, list) or \
+                    len(position) != len(ordering):
+                raise ValueError
+            result = []
+            for field, x in zip(ordering, position):
+                name = field.lstrip('-')
+                if name == 'session_date':
+                    x = datetime.strptime(x, '%Y-%m-%d').date()
+                elif type(x) not in ((int,) if name == 'id' else
+                                     (int, float)):
+                    raise ValueError
+                result.append(x)
+            return tuple(result)
+        except (TypeError, ValueError, UnicodeError):
+            raise ParseError('Неверный курсор')
+
+    def get_ordering(self, queryset: QuerySet) -> tuple:
+        """
+        Поля сортировки голосований ("-" - по убыванию)
+        """
+        if 'search_rank' not in queryset.query.annotations:
+            return self.ordering
+        return tuple(
+            '-id' if field == '-pk' else 'id' if field == 'pk' else field
+            for field in queryset.query.order_by
+        )
+
+    def get_position_fields(self, queryset: QuerySet) -> set:
+        """
+        Поля, которые нужны в values() для курсора
+        """
+        return {field.lstrip('-') for field in self.get_ordering(queryset)}
+
+    @staticmethod
+    def get_position(item, ordering: tuple) -> tuple:
+        """
+        Позиция голосования (модели или словаря из values)
+        """
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(item, dict):
+            return tuple(item[field] for field in fields)
+        return tuple(getattr(item, field) for field in fields)
+
+    @staticmethod
+    def get_seek_filter(ordering: tuple, position: tuple) -> Q:
+        """
+        Условие на голосования после позиции. Условие на первое поле
+        задаёт начало чтения индекса, остальное отсекает голосования
+        с тем же значением до курсора.
+        """
+        after = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = '{}__{}'.format(name, 'lt' if field[0] == '-' else 'gt')
+            after |= Q(**dict(equal, **{lookup: value}))
+            equal[name] = value
+
+        first = ordering[0]
+        lookup = '{}__{}'.format(
+            first.lstrip('-'), 'lte' if first[0] == '-' else 'gte'
+        )
+        return Q(**{lookup: position[0]}) & after
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.next_position = None
+        ordering = self.get_ordering(queryset)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            position = self.decode_cursor(cursor, ordering)
+            queryset = queryset.filter(
+                self.get_seek_filter(ordering, position)
+            )
+
+        # Лишнее голосование показывает, есть ли следующая страница
+        page = list(queryset.order_by(*ordering)[:page_size + 1])
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = self.get_position(page[-1], ordering)
+        return page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
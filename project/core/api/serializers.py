@@ -50,36 +50,37 @@ class VoteDetailSerializer(
     serializers.HyperlinkedModelSerializer
 ):
     """
-    Сериализатор деталей модели Vote
+    Сериализатор деталей модели Vote.
+    Голоса депутатов получаем одним запросом вместе с ФИО депутатов.
+    При GET параметре "voices=compact" голоса отдаются параллельными
+    списками id депутатов и значений Voice.RESULT.
     """
     voices = serializers.SerializerMethodField()
 
     class Meta:
         model = Vote
-        fields = '__all__'
-
-    @staticmethod
-    def get_voices(obj):
-        voices = Voice.objects.filter(vote=obj)
-        serializer = VoiceSerializer(voices, many=True)
-        return serializer.data
-
-
-class VoiceSerializer(serializers.ModelSerializer):
-    """
-    Сериализатор модели Voice
-    """
-    result_display = serializers.SerializerMethodField()
-    deputy_display = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Voice
-        fields = ('result_display', 'deputy_display')
-
-    @staticmethod
-    def get_result_display(obj):
-        return obj.get_result_display()
-
-    @staticmethod
-    def get_deputy_display(obj):
-        return obj.deputy.full_name
+        # Дата сессии дублируется для постраничного вывода
+        exclude = ('session_date',)
+
+    def get_voices(self, obj):
+        voices = Voice.objects.filter(vote=obj).order_by('pk')
+
+        request = self.context.get('request')
+        if request is not None and \
+                request.query_params.get('voices') == 'compact':
+            voices = list(voices.values_list('deputy_id', 'result'))
+            return {
+                'deputies': [deputy for deputy, _ in voices],
+                'results': [result for _, result in voices],
+            }
+
+        result_display = dict(Voice.RESULT)
+        return [
+            {
+                'result_display': result_display.get(result, result),
+                'deputy_display': full_name,
+            }
+            for full_name, result in voices.values_list(
+                'deputy__full_name', 'result'
+            )
+        ]
@@ -2,7 +2,9 @@ from rest_framework import routers
 
 from .views import (
     CouncilViewSet, SessionViewSet, DeputyViewSet, VoteViewSet,
-    StatisticByDeputyViewSet
+    StatisticByDeputyViewSet, DeputySimilarityViewSet, AgreementTrendViewSet,
+    DeputyAttendanceViewSet, SessionSummaryViewSet, CouncilSummaryViewSet,
+    ExportViewSet, RequestTimingViewSet
 )
 
 
@@ -17,6 +19,34 @@ router.register(
     StatisticByDeputyViewSet,
     base_name='statistic-deputy'
 )
+router.register(
+    r'statistic-similarity',
+    DeputySimilarityViewSet,
+    base_name='statistic-similarity'
+)
+router.register(
+    r'statistic-trend',
+    AgreementTrendViewSet,
+    base_name='statistic-trend'
+)
+
+router.register(
+    r'statistic-attendance',
+    DeputyAttendanceViewSet,
+    base_name='statistic-attendance'
+)
+router.register(
+    r'statistic-session',
+    SessionSummaryViewSet,
+    base_name='statistic-session'
+)
+router.register(
+    r'statistic-council',
+    CouncilSummaryViewSet,
+    base_name='statistic-council'
+)
+router.register(r'export', ExportViewSet, base_name='export')
+router.register(r'timing', RequestTimingViewSet, base_name='timing')
 
 
 urlpatterns = router.urls
@@ -1,12 +1,26 @@
+from django.http import StreamingHttpResponse
+from django.utils.cache import add_never_cache_headers
+
 from rest_framework import viewsets
+from rest_framework.permissions import IsAdminUser
 from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
+from .pagination import VoteCursorPagination
+from .filters import VoteSearchFilter
 from .serializers import (
     CouncilSerializer, SessionSerializer, DeputySerializer, VoteListSerializer,
     VoteDetailSerializer
 )
-from ..models import Council, Session, Deputy, Vote, Voice
+from ..models import Council, Session, Deputy, Vote
+from ..agreement import BLOC_THRESHOLD, get_agreement_history
+from ..statistics import (
+    get_deputy_attendance, get_session_summary, get_council_summary
+)
+from ..timing import timing_stats
+from ..export import (
+    EXPORT_FORMATS, check_export_format, get_export_rows, iter_export
+)
 
 from datetime import datetime
 
@@ -37,10 +51,43 @@ class DeputyViewSet(viewsets.ReadOnlyModelViewSet):
 
 class VoteViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    API точка позволяющая просматривать голосования
+    API точка позволяющая просматривать голосования.
+    Список выводится постранично по курсору (GET параметры "cursor" и
+    "page_size"). GET параметром "fields" можно указать через запятую
+    нужные поля голосования (council и session - id), тогда голосования
+    отдаются без ссылок:
+        - id, title, types, result, council, session, agree, disagree,
+          abstained, did_not_participate, absent
+    Поиск по названию - GET параметр "search" (результаты по
+    релевантности, тоже постранично по курсору).
     """
     queryset = Vote.objects.select_related('council', 'session')
     serializer_class = VoteListSerializer
+    pagination_class = VoteCursorPagination
+    filter_backends = (VoteSearchFilter,)
+    # Поля голосования, доступные в списке без ссылок
+    slim_fields = (
+        'id', 'title', 'types', 'result', 'council', 'session', 'agree',
+        'disagree', 'abstained', 'did_not_participate', 'absent'
+    )
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('fields'):
+            return super().list(request, *args, **kwargs)
+
+        fields = request.query_params['fields'].split(',')
+        for field in fields:
+            if field not in self.slim_fields:
+                raise ParseError('Неизвестное поле {}'.format(field))
+
+        # Словари значений полей без сериализатора и построения ссылок
+        queryset = self.filter_queryset(Vote.objects.all())
+        page = self.paginate_queryset(queryset.values(
+            *self.paginator.get_position_fields(queryset).union(fields)
+        ))
+        return self.get_paginated_response([
+            {field: row[field] for field in fields} for row in page
+        ])
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -53,11 +100,18 @@ class VoteViewSet(viewsets.ReadOnlyModelViewSet):
 class StatisticByDeputyViewSet(viewsets.GenericViewSet):
     """
     Статистика в процентах по депутатам, которые раще голосуют одинаково
-    односительно заданного депутата.
+    односительно заданного депутата. Процент считается среди голосований,
+    в которых оба депутата проголосовали (за, против или воздержались).
     ФИО депутата необходимо задать GET параметром "q".
+    Для статистики по нескольким депутатам GET параметр "q" повторяется,
+    для всех депутатов - "q=all" (ответ - статистика по ФИО каждого
+    депутата).
     Для фильрации данных по дате необходимо задать GET параметр "date"
         - опционально
         - формат: dd-mm-YYYY
+    Для фильтрации данных по периоду, городскому совету и сессии:
+        - "date_from" и "date_to" - формат: dd-mm-YYYY
+        - "council" и "session" - id городского совета и сессии
     """
     @staticmethod
     def list(request, *args, **kwargs):
@@ -66,38 +120,271 @@ class StatisticByDeputyViewSet(viewsets.GenericViewSet):
                 detail='Необходимо указать GET параметр "q" с ФИО депутата'
             )
 
-        date = None
-        if request.GET.get('date'):
+        filters = get_agreement_filters(request)
+        date = get_date_param(request, 'date')
+        if date is not None:
+            filters['date_from'] = max(filters['date_from'] or date, date)
+            filters['date_to'] = min(filters['date_to'] or date, date)
+
+        full_names = request.GET.getlist('q')
+        batch = len(full_names) > 1 or full_names == ['all']
+        if full_names == ['all']:
+            deputies = None
+        else:
+            deputies = dict(
+                Deputy.objects.filter(full_name__in=full_names)
+                              .values_list('full_name', 'pk')
+            )
+            for full_name in full_names:
+                if full_name not in deputies:
+                    raise ParseError(
+                        detail='Депутат {} не найден'.format(full_name)
+                    )
+
+        # Статистика пересчитывается после загрузки данных, здесь
+        # только вычитаем её накопленные суммы
+        history = get_agreement_history()
+        if deputies is None:
+            indexes = list(range(len(history.deputy_ids)))
+        else:
+            indexes = [
+                history.get_deputy_index(deputies[full_name])
+                for full_name in full_names
+            ]
+        results = history.get_deputies_agreement(indexes, **filters)
+
+        if not batch:
+            return Response(results[0])
+        return Response({
+            history.full_names[index]: result
+            for index, result in zip(indexes, results)
+        })
+
+
+def get_date_param(request, name: str):
+    """
+    Получаем дату из GET параметра в формате dd-mm-YYYY
+    """
+    if not request.GET.get(name):
+        return None
+    try:
+        return datetime.strptime(request.GET[name], "%d-%m-%Y").date()
+    except ValueError:
+        raise ParseError('Формат даты не соответствует dd-mm-YYYY')
+
+
+def get_number_param(request, name: str, default=None, number_type=int):
+    """
+    Получаем число из GET параметра
+    """
+    if not request.GET.get(name):
+        return default
+    try:
+        return number_type(request.GET[name])
+    except ValueError:
+        raise ParseError(
+            'Параметр "{}" должен быть числом'.format(name)
+        )
+
+
+def get_agreement_filters(request) -> dict:
+    """
+    Получаем выборку сессий для статистики по депутатам из GET параметров
+    council, session (id), date_from и date_to (dd-mm-YYYY)
+    """
+    return {
+        'council': get_number_param(request, 'council'),
+        'session': get_number_param(request, 'session'),
+        'date_from': get_date_param(request, 'date_from'),
+        'date_to': get_date_param(request, 'date_to'),
+    }
+
+
+class DeputySimilarityViewSet(viewsets.GenericViewSet):
+    """
+    Депутаты, которые чаще и реже всего голосуют одинаково с заданным
+    депутатом, и разбиение всех депутатов на блоки, голосующие схожим
+    образом.
+    ФИО депутата можно задать GET параметром "q", количество депутатов -
+    GET параметром "k" (по умолчанию 5).
+    Минимальный средний процент одинаковых голосов депутатов одного блока
+    задаётся GET параметром "threshold" (по умолчанию 80).
+    Для фильтрации данных:
+        - "council" и "session" - id городского совета и сессии
+        - "date_from" и "date_to" - период, формат: dd-mm-YYYY
+    """
+    @staticmethod
+    def list(request, *args, **kwargs):
+        k = get_number_param(request, 'k', 5)
+        if k < 1:
+            raise ParseError('Параметр "k" должен быть не меньше 1')
+        threshold = get_number_param(
+            request, 'threshold', BLOC_THRESHOLD, float
+        )
+        # Сравнения с nan всегда ложны, поэтому он тоже не проходит
+        if not 0 <= threshold <= 100:
+            raise ParseError('Параметр "threshold" должен быть от 0 до 100')
+        filters = get_agreement_filters(request)
+
+        search_deputy = None
+        if request.GET.get('q'):
             try:
-                date = datetime.strptime(
-                    request.GET['date'], "%d-%m-%Y"
-                ).date()
-            except ValueError:
-                raise ParseError('Формат даты не соответствует dd-mm-YYYY')
+                search_deputy = Deputy.objects.get(full_name=request.GET['q'])
+            except Deputy.DoesNotExist:
+                raise ParseError(
+                    detail='Депутат {} не найден'.format(request.GET['q'])
+                )
 
-        try:
-            search_deputy = Deputy.objects.get(full_name=request.GET['q'])
-        except Deputy.DoesNotExist:
-            raise ParseError(
-                detail='Депутат {} не найден'.format(request.GET['q'])
+        matrix = get_agreement_history().get_matrix(**filters)
+        data = {'blocs': matrix.get_blocs(threshold)}
+        if search_deputy is not None:
+            most, least = matrix.get_top(
+                matrix.get_deputy_index(search_deputy.pk), k
             )
+            data['most_aligned'] = [
+                {'full_name': full_name, 'agreement': percent}
+                for full_name, percent in most
+            ]
+            data['least_aligned'] = [
+                {'full_name': full_name, 'agreement': percent}
+                for full_name, percent in least
+            ]
+        return Response(data)
 
-        search_deputy_voices = Voice.objects.filter(deputy=search_deputy)\
-                                            .values_list('result', flat=True)
-        if date is not None:
-            search_deputy_voices = search_deputy_voices.filter(
-                vote__session__date=date
+
+class AgreementTrendViewSet(viewsets.GenericViewSet):
+    """
+    Процент одинаковых голосов двух депутатов по сессиям и за скользящее
+    окно, заканчивающееся датой сессии.
+    ФИО депутатов необходимо задать GET параметрами "q" и "other",
+    размер окна в днях - GET параметром "window" (по умолчанию 90).
+    Для фильтрации данных:
+        - "council" - id городского совета
+        - "date_from" и "date_to" - период, формат: dd-mm-YYYY
+    """
+    @staticmethod
+    def list(request, *args, **kwargs):
+        if not request.GET.get('q') or not request.GET.get('other'):
+            raise ParseError(
+                detail='Необходимо указать GET параметры "q" и "other" '
+                       'с ФИО депутатов'
             )
 
-        result = {}
-        vote_count = Vote.objects.count()
+        window = get_number_param(request, 'window', 90)
+        if window < 1:
+            raise ParseError('Размер окна должен быть не меньше 1 дня')
+        filters = get_agreement_filters(request)
+        del filters['session']
+
+        deputies = []
+        for name in ('q', 'other'):
+            try:
+                deputies.append(
+                    Deputy.objects.get(full_name=request.GET[name])
+                )
+            except Deputy.DoesNotExist:
+                raise ParseError(
+                    detail='Депутат {} не найден'.format(request.GET[name])
+                )
+
+        history = get_agreement_history()
+        return Response(history.get_trend(
+            history.get_deputy_index(deputies[0].pk),
+            history.get_deputy_index(deputies[1].pk),
+            window,
+            **filters
+        ))
+
+
+class DeputyAttendanceViewSet(viewsets.GenericViewSet):
+    """
+    Посещаемость депутатов (процент голосований, на которых депутат
+    присутствовал) и количество голосов депутатов по результатам:
+    agree, disagree, abstained, did_not_participate, absent.
+    Для фильтрации данных:
+        - "council" и "session" - id городского совета и сессии
+        - "date_from" и "date_to" - период, формат: dd-mm-YYYY
+    """
+    @staticmethod
+    def list(request, *args, **kwargs):
+        return Response(
+            get_deputy_attendance(**get_agreement_filters(request))
+        )
+
+
+class SessionSummaryViewSet(viewsets.GenericViewSet):
+    """
+    Итоги голосований по сессиям: количество голосований, принятых и
+    непринятых решений, процент принятых решений и сумма голосов депутатов
+    по результатам.
+    Для фильтрации данных:
+        - "council" и "session" - id городского совета и сессии
+        - "date_from" и "date_to" - период, формат: dd-mm-YYYY
+    """
+    @staticmethod
+    def list(request, *args, **kwargs):
+        return Response(get_session_summary(**get_agreement_filters(request)))
+
+
+class CouncilSummaryViewSet(viewsets.GenericViewSet):
+    """
+    Итоги голосований по городским советам: количество сессий и
+    голосований, принятых и непринятых решений, процент принятых решений и
+    сумма голосов депутатов по результатам.
+    Для фильтрации данных:
+        - "council" и "session" - id городского совета и сессии
+        - "date_from" и "date_to" - период, формат: dd-mm-YYYY
+    """
+    @staticmethod
+    def list(request, *args, **kwargs):
+        return Response(get_council_summary(**get_agreement_filters(request)))
+
 
-        for deputy in Deputy.objects.exclude(pk=search_deputy.pk):
-            v = Voice.objects.filter(deputy=deputy)\
-                             .values_list('result', flat=True)
-            if date is not None:
-                v = v.filter(vote__session__date=date)
-            q = len([i for i, j in zip(search_deputy_voices, v) if i == j])
-            result[deputy.full_name] = q * 100 / vote_count
+class ExportViewSet(viewsets.GenericViewSet):
+    """
+    Выгрузка голосов депутатов по голосованиям файлом, который отдаётся
+    частями по мере чтения из базы данных.
+    Формат задаётся GET параметром "type": csv (по умолчанию), ndjson или
+    parquet (если установлен pyarrow).
+    Для фильтрации данных:
+        - "council" - id городского совета
+        - "date_from" и "date_to" - период, формат: dd-mm-YYYY
+    """
+    @staticmethod
+    def list(request, *args, **kwargs):
+        export_format = request.GET.get('type') or 'csv'
+        try:
+            check_export_format(export_format)
+        except ValueError as e:
+            raise ParseError(str(e))
+
+        rows = get_export_rows(
+            council=get_number_param(request, 'council'),
+            date_from=get_date_param(request, 'date_from'),
+            date_to=get_date_param(request, 'date_to')
+        )
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            iter_export(export_format, rows), content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="votes.{}"'.format(extension)
+        return response
+
+
+class RequestTimingViewSet(viewsets.GenericViewSet):
+    """
+    Сводные замеры запросов процесса по представлениям (только для
+    администраторов): количество запросов, суммы и максимумы количества
+    SQL запросов и времени (мс), гистограмма общего времени ответа -
+    количество запросов по верхним границам интервалов (мс).
+    Замеряется доля запросов, заданная настройкой
+    REQUEST_TIMING_SAMPLE_RATE.
+    """
+    permission_classes = (IsAdminUser,)
 
-        return Response(result)
+    def list(self, request, *args, **kwargs):
+        response = Response(timing_stats.get())
+        # Замеры меняются с каждым запросом, кешировать их нельзя
+        add_never_cache_headers(response)
+        return response
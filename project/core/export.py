@@ -0,0 +1,184 @@
+from .models import Voice
+
+from typing import Optional, Iterable, Iterator
+from datetime import date
+import io
+import importlib.util
+import csv
+import json
+
+
+# Колонки выгрузки: имя и поле голоса депутата
+EXPORT_COLUMNS = (
+    ('council', 'vote__council__title'),
+    ('session', 'vote__session__title'),
+    ('session_date', 'vote__session__date'),
+    ('vote', 'vote_id'),
+    ('title', 'vote__title'),
+    ('types', 'vote__types'),
+    ('vote_result', 'vote__result'),
+    ('deputy', 'deputy__full_name'),
+    ('result', 'result'),
+)
+
+# Форматы выгрузки: тип содержимого и расширение файла
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+    'parquet': ('application/octet-stream', 'parquet'),
+}
+
+# Количество строк, которые записываются за раз
+BATCH_SIZE = 10000
+
+
+def check_export_format(name: str):
+    """
+    Проверяем, что выгрузка в формате возможна
+    """
+    if name not in EXPORT_FORMATS:
+        raise ValueError('Неизвестный формат {}'.format(name))
+    if name == 'parquet':
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ValueError('Для формата parquet необходим pyarrow')
+
+
+def get_export_rows(council: Optional[int] = None,
+                    date_from: Optional[date] = None,
+                    date_to: Optional[date] = None) -> Iterator[tuple]:
+    """
+    Голоса депутатов вместе с голосованием, сессией и городским советом.
+    Строки читаются курсором на стороне сервера, поэтому память не
+    зависит от размера архива.
+    """
+    voices = Voice.objects.all()
+    if council is not None:
+        voices = voices.filter(vote__council=council)
+    if date_from is not None:
+        voices = voices.filter(vote__session__date__gte=date_from)
+    if date_to is not None:
+        voices = voices.filter(vote__session__date__lte=date_to)
+
+    return voices.order_by(
+        'vote__session__date', 'vote__session_id', 'vote_id', 'deputy_id'
+    ).values_list(*[field for _, field in EXPORT_COLUMNS]).iterator()
+
+
+def iter_batches(rows: Iterable[tuple], size: int = BATCH_SIZE) \
+        -> Iterator[list]:
+    """
+    Делим строки на пачки
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Выгрузка в CSV с заголовком
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for batch in iter_batches(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Выгрузка в NDJSON: объект JSON на строку
+    """
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for batch in iter_batches(rows):
+        yield ''.join(
+            json.dumps(dict(zip(names, row)), ensure_ascii=False,
+                       default=str) + '\n'
+            for row in batch
+        )
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    Файл, записанные данные которого забираются частями
+    """
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(rows: Iterable[tuple]) -> Iterator[bytes]:
+    """
+    Выгрузка в Parquet: пачка строк записывается группой строк,
+    готовые части файла отдаются сразу
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        pa.field('council', pa.string()),
+        pa.field('session', pa.string()),
+        pa.field('session_date', pa.date32()),
+        pa.field('vote', pa.int64()),
+        pa.field('title', pa.string()),
+        pa.field('types', pa.int16()),
+        pa.field('vote_result', pa.int16()),
+        pa.field('deputy', pa.string()),
+        pa.field('result', pa.int16()),
+    ])
+
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for batch in iter_batches(rows):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [
+                pa.array(list(values), type=field.type)
+                for values, field in zip(columns, schema)
+            ],
+            schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# Функции выгрузки по форматам
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+    'parquet': iter_parquet,
+}
+
+
+def iter_export(export_format: str, rows: Iterable[tuple]) -> Iterator:
+    """
+    Выгрузка строк в указанном формате частями
+    """
+    return EXPORT_WRITERS[export_format](rows)
@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.db import transaction
+
+from contextlib import contextmanager
+import os
+import fcntl
+import logging
+import tempfile
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Состояние потока: читалось ли поколение после последнего увеличения,
+# отложенные до фиксации вызовы on_commit_once
+_local = threading.local()
+
+
+def get_generation() -> int:
+    """
+    Получаем поколение данных: счётчик, который увеличивается при каждом
+    изменении данных голосований. Хранится в файле, поэтому общий для
+    всех процессов, а чтение не обращается к базе данных.
+    Файл заменяется целиком, поэтому блокировка при чтении не нужна.
+    """
+    _local.read = True
+    try:
+        with open(settings.DATASET_GENERATION_FILE) as infile:
+            return int(infile.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_generation() -> int:
+    """
+    Увеличиваем поколение данных, возвращаем новое значение
+    """
+    path = settings.DATASET_GENERATION_FILE
+    dirname = os.path.dirname(path)
+    os.makedirs(dirname, exist_ok=True)
+
+    # Блокировка отдельного файла, чтобы одновременные изменения не
+    # потерялись; новое значение пишется во временный файл и заменяет
+    # старый, чтобы читатели не увидели пустой файл
+    with open(path + '.lock', 'a') as lockfile:
+        fcntl.flock(lockfile, fcntl.LOCK_EX)
+        generation = get_generation() + 1
+        with tempfile.NamedTemporaryFile(
+            'w', dir=dirname, delete=False
+        ) as outfile:
+            outfile.write(str(generation))
+        os.replace(outfile.name, path)
+    _local.read = False
+    return generation
+
+
+def on_commit_once(func, values=()) -> bool:
+    """
+    Вызываем func с множеством значений один раз после фиксации текущей
+    транзакции (вне транзакции - сразу). Значения всех вызовов внутри
+    одной транзакции объединяются. Возвращаем True, если вызов
+    зарегистрирован первым в транзакции.
+    """
+    if not hasattr(_local, 'pending'):
+        _local.pending = {}
+    pending = _local.pending
+    key = (transaction.get_connection().alias, func)
+
+    # При откате транзакции Django отбрасывает обработчик, и слабая
+    # ссылка на него перестаёт действовать
+    entry = pending.get(key)
+    if entry is not None and entry[0]() is not None:
+        entry[1].update(values)
+        return False
+
+    callback_values = set(values)
+
+    def callback():
+        del pending[key]
+        func(callback_values)
+    pending[key] = (weakref.ref(callback), callback_values)
+    transaction.on_commit(callback)
+    return True
+
+
+def try_bump_generation():
+    """
+    Увеличиваем поколение данных, ошибка записи файла не прерывает
+    изменение данных
+    """
+    try:
+        bump_generation()
+    except OSError:
+        logger.exception('Не удалось увеличить поколение данных')
+
+
+def _bump_on_commit(values):
+    try_bump_generation()
+
+
+def dataset_changed():
+    """
+    Отмечаем изменение данных: поколение увеличивается один раз после
+    фиксации транзакции, чтобы ответы, закешированные по старым данным до
+    фиксации, устарели. Внутри транзакции поколение увеличивается сразу,
+    если его читали после прошлого увеличения: соединение этого потока
+    уже видит новые данные.
+    """
+    if getattr(_local, 'deferred', 0):
+        _local.deferred_changed = True
+        return
+
+    first = on_commit_once(_bump_on_commit)
+    if not transaction.get_autocommit() and \
+            (first or getattr(_local, 'read', True)):
+        try_bump_generation()
+
+
+@contextmanager
+def defer_dataset_changes():
+    """
+    Изменения данных внутри блока (например, загрузка голосований через
+    ORM) увеличивают поколение один раз при выходе из блока, а не при
+    каждом сохранении
+    """
+    depth = getattr(_local, 'deferred', 0)
+    if not depth:
+        _local.deferred_changed = False
+    _local.deferred = depth + 1
+    try:
+        yield
+    finally:
+        _local.deferred = depth
+        if not depth and _local.deferred_changed:
+            dataset_changed()
@@ -0,0 +1,37 @@
+/*
+ * Долгоживущий процесс tabula.
+ * Читает из stdin строки с JSON массивом аргументов командной строки
+ * tabula-java и на каждую отвечает строкой с JSON объектом
+ * {"output": "..."} или {"error": "..."}.
+ *
+ * Запуск: java -cp tabula.jar jdk.nashorn.tools.Shell tabula_worker.js
+ *
+ * Использует внутренние классы tabula-java (CommandLineApp), проверено
+ * с tabula-0.9.2-jar-with-dependencies.jar из tabula-py 0.5.0.
+ */
+var CommandLineApp = Java.type('technology.tabula.CommandLineApp');
+var GnuParser = Java.type('org.apache.commons.cli.GnuParser');
+var StringBuilder = Java.type('java.lang.StringBuilder');
+var BufferedReader = Java.type('java.io.BufferedReader');
+var InputStreamReader = Java.type('java.io.InputStreamReader');
+var PrintStream = Java.type('java.io.PrintStream');
+var System = Java.type('java.lang.System');
+
+var input = new BufferedReader(new InputStreamReader(System['in'], 'UTF-8'));
+var output = new PrintStream(System.out, true, 'UTF-8');
+var options = CommandLineApp.buildOptions();
+
+var line;
+while ((line = input.readLine()) !== null) {
+    var response;
+    try {
+        var args = Java.to(JSON.parse(line), 'java.lang.String[]');
+        var commandLine = new GnuParser().parse(options, args);
+        var result = new StringBuilder();
+        new CommandLineApp(result, commandLine).extractTables(commandLine);
+        response = {output: String(result.toString())};
+    } catch (e) {
+        response = {error: String(e)};
+    }
+    output.println(JSON.stringify(response));
+}
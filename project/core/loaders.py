@@ -0,0 +1,364 @@
+from django.db import connection, transaction, IntegrityError
+
+from .models import Council, Session, Vote, Deputy, Voice
+from .utils import set_vote_results, recalc_vote_results, recalc_votes_sql
+from .generation import defer_dataset_changes
+
+from typing import Optional
+from datetime import date
+from collections import namedtuple
+from io import StringIO
+import csv
+
+
+# Данные голосования со страницы pdf файла.
+# voices - список голосов депутатов (ФИО, значение Voice.RESULT)
+VoteRecord = namedtuple(
+    'VoteRecord',
+    ('council', 'session', 'session_date', 'title', 'types', 'voices')
+)
+
+
+class VoteLoader:
+    """
+    Пакетная запись результатов голосований в базу данных.
+    Советы, сессии и депутаты кешируются на время загрузки,
+    голоса депутатов пишутся одной пачкой на голосование.
+    """
+    def __init__(self):
+        self.clear()
+        self.deferred_changes = None
+
+    def __enter__(self):
+        # Поколение данных увеличивается один раз в конце загрузки
+        self.deferred_changes = defer_dataset_changes()
+        self.deferred_changes.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.deferred_changes.__exit__(exc_type, exc_val, exc_tb)
+
+    def add(self, record: VoteRecord):
+        """
+        Сохраняем данные голосования
+        """
+        council = self.get_council(record.council)
+        session = self.get_session(record.session, record.session_date)
+        vote = self.get_vote(record.title, record.types, council, session)
+
+        if record.voices:
+            # Сохраняем голоса и результаты голосования одной пачкой
+            self.save_voices(vote, record.voices)
+        else:
+            # Пересчитываем результаты голосования
+            recalc_vote_results(vote)
+
+    def flush(self):
+        """
+        Данные сохраняются сразу, дописывать нечего
+        """
+
+    def clear(self):
+        """
+        Сбрасываем кеши, например после отката транзакции
+        """
+        self.councils = {}
+        self.sessions = {}
+        self.deputies = {}
+
+    def get_council(self, title: str) -> Council:
+        """
+        Получаем городской совет
+        """
+        if title not in self.councils:
+            self.councils[title], created = Council.objects.get_or_create(
+                title=title
+            )
+        return self.councils[title]
+
+    def get_session(self, title: str, session_date: date) -> Session:
+        """
+        Получаем сессию
+        """
+        key = (title, session_date)
+        if key not in self.sessions:
+            self.sessions[key], created = Session.objects.get_or_create(
+                title=title, date=session_date
+            )
+        return self.sessions[key]
+
+    @staticmethod
+    def get_vote(
+            title: str, types: Optional[int], council: Council,
+            session: Session
+    ) -> Vote:
+        """
+        Получаем голосование.
+        Части одного документа обрабатываются параллельно, поэтому
+        блокируем сессию, чтобы повторное голосование не создалось дважды.
+        """
+        with transaction.atomic():
+            Session.objects.select_for_update().filter(pk=session.pk)\
+                           .values_list('pk').get()
+            vote, created = Vote.objects.get_or_create(
+                title=title,
+                types=types,
+                council=council,
+                session=session
+            )
+        return vote
+
+    def get_deputies(self, full_names: list) -> dict:
+        """
+        Получаем id депутатов по ФИО, создавая недостающих одним запросом
+        """
+        missing = set(full_names) - set(self.deputies)
+        if missing:
+            self.deputies.update(
+                Deputy.objects.filter(full_name__in=missing)
+                              .values_list('full_name', 'pk')
+            )
+            missing -= set(self.deputies)
+
+        if missing:
+            try:
+                with transaction.atomic():
+                    Deputy.objects.bulk_create(
+                        Deputy(full_name=full_name) for full_name in missing
+                    )
+            except IntegrityError:
+                # Депутата успел создать параллельный процесс
+                for full_name in missing:
+                    Deputy.objects.get_or_create(full_name=full_name)
+
+            self.deputies.update(
+                Deputy.objects.filter(full_name__in=missing)
+                              .values_list('full_name', 'pk')
+            )
+
+        return {
+            full_name: self.deputies[full_name] for full_name in full_names
+        }
+
+    @transaction.atomic
+    def save_voices(self, vote: Vote, voices: list):
+        """
+        Сохраняем голоса депутатов (ФИО, значение Voice.RESULT)
+        и результаты голосования
+        """
+        deputies = self.get_deputies([full_name for full_name, _ in voices])
+        results = {
+            deputies[full_name]: result for full_name, result in voices
+        }
+
+        existing = dict(
+            Voice.objects.filter(vote=vote).values_list('deputy', 'result')
+        )
+
+        # Возможно сменился состав депутатов. Удаляем которых больше нет
+        stale = set(existing) - set(results)
+        if stale:
+            Voice.objects.filter(vote=vote, deputy__in=stale).delete()
+
+        Voice.objects.bulk_create(
+            Voice(deputy_id=deputy, vote=vote, result=result)
+            for deputy, result in results.items() if deputy not in existing
+        )
+
+        # Изменившиеся голоса обновляем по одному запросу на значение
+        changed = {}
+        for deputy, result in results.items():
+            if deputy in existing and existing[deputy] != result:
+                changed.setdefault(result, []).append(deputy)
+        for result, deputy_ids in changed.items():
+            Voice.objects.filter(vote=vote, deputy__in=deputy_ids)\
+                         .update(result=result)
+
+        # Результаты голосования считаем по тем же данным
+        set_vote_results(vote, results.values())
+        vote.save()
+
+
+class CopyVoteLoader(VoteLoader):
+    """
+    Загрузка результатов голосований через COPY (только PostgreSQL).
+    Голоса копятся в памяти, а при сбросе копируются во временную
+    таблицу и переносятся в Council/Session/Vote/Deputy/Voice
+    несколькими запросами над множествами строк.
+    """
+    staging_columns = (
+        'position', 'council', 'session', 'session_date', 'title', 'types',
+        'full_name', 'result'
+    )
+
+    create_staging_sql = """
+        CREATE TEMPORARY TABLE voice_staging (
+            position integer NOT NULL,
+            council varchar(100) NOT NULL,
+            session varchar(100) NOT NULL,
+            session_date date NOT NULL,
+            title text NOT NULL,
+            types smallint,
+            full_name varchar(100),
+            result smallint
+        )
+    """
+
+    merge_sql = (
+        # Городские советы, сессии и депутаты
+        """
+        INSERT INTO core_council (title)
+        SELECT DISTINCT council FROM voice_staging
+        ON CONFLICT (title) DO NOTHING
+        """,
+        """
+        INSERT INTO core_session (title, date)
+        SELECT DISTINCT ON (session) session, session_date
+        FROM voice_staging
+        ORDER BY session, position
+        ON CONFLICT (title) DO NOTHING
+        """,
+        """
+        INSERT INTO core_deputy (full_name)
+        SELECT DISTINCT full_name FROM voice_staging
+        WHERE full_name IS NOT NULL
+        ON CONFLICT (full_name) DO NOTHING
+        """,
+        # Голосования. Одно голосование может встречаться в документе
+        # несколько раз, голоса берём с последней страницы с таблицей
+        """
+        CREATE TEMPORARY TABLE vote_staging AS
+        SELECT s.title, s.types, c.id AS council_id, ss.id AS session_id,
+               max(s.position) FILTER (WHERE s.full_name IS NOT NULL)
+                   AS position,
+               NULL::integer AS vote_id
+        FROM voice_staging s
+        JOIN core_council c ON c.title = s.council
+        JOIN core_session ss ON ss.title = s.session
+        GROUP BY s.title, s.types, c.id, ss.id
+        """,
+        # Части одного документа загружаются параллельно: блокируем
+        # сессии, чтобы не создать одно голосование дважды
+        """
+        SELECT 1 FROM core_session
+        WHERE id IN (SELECT session_id FROM vote_staging)
+        ORDER BY id
+        FOR UPDATE
+        """,
+        """
+        INSERT INTO core_vote (
+            title, types, council_id, session_id, session_date,
+            agree, disagree, abstained, did_not_participate, absent
+        )
+        SELECT vs.title, vs.types, vs.council_id, vs.session_id, ss.date,
+               0, 0, 0, 0, 0
+        FROM vote_staging vs
+        JOIN core_session ss ON ss.id = vs.session_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM core_vote v
+            WHERE v.title = vs.title
+              AND v.types IS NOT DISTINCT FROM vs.types
+              AND v.council_id = vs.council_id
+              AND v.session_id = vs.session_id
+        )
+        """,
+        """
+        UPDATE vote_staging vs SET vote_id = v.id
+        FROM core_vote v
+        WHERE v.title = vs.title
+          AND v.types IS NOT DISTINCT FROM vs.types
+          AND v.council_id = vs.council_id
+          AND v.session_id = vs.session_id
+        """,
+        # Голоса депутатов
+        """
+        CREATE TEMPORARY TABLE voice_merge AS
+        SELECT DISTINCT ON (vs.vote_id, d.id)
+               vs.vote_id, d.id AS deputy_id, s.result
+        FROM voice_staging s
+        JOIN core_council c ON c.title = s.council
+        JOIN core_session ss ON ss.title = s.session
+        JOIN vote_staging vs
+          ON vs.title = s.title
+         AND vs.types IS NOT DISTINCT FROM s.types
+         AND vs.council_id = c.id
+         AND vs.session_id = ss.id
+         AND vs.position = s.position
+        JOIN core_deputy d ON d.full_name = s.full_name
+        ORDER BY vs.vote_id, d.id
+        """,
+        # Возможно сменился состав депутатов. Удаляем которых больше нет
+        """
+        DELETE FROM core_voice cv
+        WHERE cv.vote_id IN (SELECT vote_id FROM voice_merge)
+          AND NOT EXISTS (
+              SELECT 1 FROM voice_merge m
+              WHERE m.vote_id = cv.vote_id AND m.deputy_id = cv.deputy_id
+          )
+        """,
+        """
+        INSERT INTO core_voice (deputy_id, vote_id, result)
+        SELECT deputy_id, vote_id, result FROM voice_merge
+        ON CONFLICT (deputy_id, vote_id) DO UPDATE
+        SET result = EXCLUDED.result
+        WHERE core_voice.result <> EXCLUDED.result
+        """,
+        # Результаты голосований одним запросом
+        recalc_votes_sql.format(
+            where='WHERE vv.id IN (SELECT vote_id FROM vote_staging)'
+        ),
+        """
+        DROP TABLE voice_staging, vote_staging, voice_merge
+        """,
+    )
+
+    def clear(self):
+        """
+        Сбрасываем кеши и накопленные голоса
+        """
+        super().clear()
+        self.rows = []
+        self.position = 0
+
+    def add(self, record: VoteRecord):
+        """
+        Откладываем данные голосования до сброса
+        """
+        self.position += 1
+        head = (
+            self.position, record.council, record.session,
+            record.session_date.isoformat(), record.title, record.types
+        )
+        # Голосование без таблицы: только пересчитываем результаты
+        for full_name, result in record.voices or [(None, None)]:
+            self.rows.append(head + (full_name, result))
+
+    @transaction.atomic
+    def flush(self):
+        """
+        Копируем накопленные голоса и переносим их в основные таблицы
+        """
+        # Накопленные голоса сбрасываются один раз, даже при ошибке
+        rows, self.rows = self.rows, []
+        if not rows:
+            return
+
+        data = StringIO()
+        csv.writer(data).writerows(rows)
+        data.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(self.create_staging_sql)
+            # Пустая строка в CSV - это NULL, кроме обязательных колонок
+            cursor.copy_expert(
+                'COPY voice_staging ({}) FROM STDIN WITH '
+                '(FORMAT csv, FORCE_NOT_NULL (council, session, title))'
+                .format(', '.join(self.staging_columns)),
+                data
+            )
+            for sql in self.merge_sql:
+                cursor.execute(sql)
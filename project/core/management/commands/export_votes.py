@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...export import check_export_format, get_export_rows, iter_export
+
+from datetime import datetime
+
+
+def parse_date(value: str):
+    """
+    Дата аргумента команды в формате dd-mm-YYYY
+    """
+    try:
+        return datetime.strptime(value, '%d-%m-%Y').date()
+    except ValueError:
+        raise CommandError('Формат даты не соответствует dd-mm-YYYY')
+
+
+class Command(BaseCommand):
+    """
+    Команда для выгрузки голосов депутатов по голосованиям в файл
+    """
+    help = 'Выгрузка голосов депутатов в CSV, NDJSON или Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'ndjson', 'parquet'),
+            default='csv',
+            help='Формат выгрузки (parquet - при установленном pyarrow)'
+        )
+        parser.add_argument(
+            '--council',
+            type=int,
+            help='id городского совета'
+        )
+        parser.add_argument(
+            '--date-from',
+            help='Начало периода по дате сессии, формат: dd-mm-YYYY'
+        )
+        parser.add_argument(
+            '--date-to',
+            help='Конец периода по дате сессии, формат: dd-mm-YYYY'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки (по умолчанию - стандартный вывод, '
+                 'кроме формата parquet)'
+        )
+
+    def handle(self, *args, **options):
+        export_format = options['format']
+        try:
+            check_export_format(export_format)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if export_format == 'parquet' and not options['output']:
+            raise CommandError(
+                'Для формата parquet необходимо указать --output'
+            )
+
+        date_from = date_to = None
+        if options['date_from']:
+            date_from = parse_date(options['date_from'])
+        if options['date_to']:
+            date_to = parse_date(options['date_to'])
+        rows = get_export_rows(
+            council=options['council'], date_from=date_from, date_to=date_to
+        )
+
+        if not options['output']:
+            for chunk in iter_export(export_format, rows):
+                self.stdout.write(chunk, ending='')
+            return
+
+        if export_format == 'parquet':
+            outfile = open(options['output'], 'wb')
+        else:
+            outfile = open(options['output'], 'w', encoding='utf-8',
+                           newline='')
+        with outfile:
+            for chunk in iter_export(export_format, rows):
+                outfile.write(chunk)
@@ -1,143 +1,612 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-
-from ...models import Council, Session, Vote, Deputy, Voice
-from ...utils import recalc_vote_results, read_pdf_table
-
-from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-from pdfminer.pdfpage import PDFPage
-from pdfminer.converter import TextConverter
-from pdfminer.layout import LAParams
-from pandas.core.series import Series
+from django.db import connections, transaction
+
+from ...models import Session, Vote, Voice, ParsedPage
+from ...loaders import VoteRecord, VoteLoader, CopyVoteLoader
+from ...utils import TabulaWorker, get_tabula_vote_table
+from ...page_cache import PageCache
+from ...agreement import refresh_agreement
+from ...metrics import StageMetrics, IngestMetrics
+from ...staging import (
+    StagedPage, get_staging_file_path, write_staging_file, read_staging_file
+)
+from ...pdf import (
+    PARSER_VERSION, get_file_hash, get_pdf_pages_count, get_pdf_page_hashes,
+    get_page_ranges, iter_pdf_pages, get_layout_vote_table
+)
+
+from pdfminer.layout import LTPage
 import tqdm
 
-from typing import Optional
-from io import FileIO, StringIO
+from typing import Optional, Iterable, Iterator
+from io import FileIO
 import re
 from datetime import datetime, date
 import os
-from multiprocessing import Process, Queue
+import traceback
+from multiprocessing import Pool
+
+
+# Команда, части документов которой обрабатывает процесс пула
+worker_command = None
+
+
+def init_worker(command: BaseCommand):
+    """
+    Инициализация процесса пула
+    """
+    global worker_command
+    worker_command = command
+
+
+def parse_shard(shard: tuple) -> tuple:
+    """
+    Извлекаем данные страниц документа (файл, SHA-256 файла,
+    {страница: SHA-256 содержимого}) в промежуточный файл в процессе пула.
+    Ошибка не прерывает работу пула и других частей, а возвращается
+    вместе с частью документа. Замеры этапов части и id процесса
+    передаются родительскому процессу одним сообщением с результатом.
+    """
+    metrics = StageMetrics()
+    try:
+        staging_file_path = worker_command.extract_pages(
+            *shard, metrics=metrics
+        )
+    except Exception:
+        return shard, None, traceback.format_exc(), metrics, os.getpid()
+    return shard, staging_file_path, None, metrics, os.getpid()
 
 
 class Command(BaseCommand):
     """
     Команда для парсинга данных из pdf файла и сохранения данных в базу данных
     """
-    queue = Queue()
     pdf_files = []
     pbars = []
+    tables = 'tabula'
+    loader = 'orm'
+    stage = 'all'
+    staging_path = settings.PDF_STAGING_PATH
+    force = False
+    retry_quarantined = False
+    use_cache = True
+    loaded_sessions = set()
+    metrics = IngestMetrics()
+    # Заголовок страницы, с которой начинается голосование
+    vote_header = 'Система поіменного голосування "Рада Голос"'
+    loaders = {
+        'orm': VoteLoader,
+        'copy': CopyVoteLoader,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables',
+            choices=('tabula', 'layout'),
+            default='tabula',
+            help='Способ извлечения таблиц: через tabula (java) или по '
+                 'разметке страницы, полученной pdfminer'
+        )
+        parser.add_argument(
+            '--loader',
+            choices=sorted(self.loaders),
+            default='orm',
+            help='Способ записи в базу данных: пачками через ORM или '
+                 'через COPY во временную таблицу (только PostgreSQL, '
+                 'для полной перезагрузки архива)'
+        )
+        parser.add_argument(
+            '--stage',
+            choices=('all', 'extract', 'load'),
+            default='all',
+            help='Этап обработки: extract - извлечь данные из pdf файлов '
+                 'в промежуточные файлы (без базы данных), load - загрузить '
+                 'промежуточные файлы в базу данных, all - оба этапа '
+                 'параллельно'
+        )
+        parser.add_argument(
+            '--staging-path',
+            default=settings.PDF_STAGING_PATH,
+            help='Каталог промежуточных файлов'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов для обработки документов '
+                 '(по умолчанию по количеству процессоров)'
+        )
+        parser.add_argument(
+            '--shard-size',
+            type=int,
+            default=25,
+            help='Количество страниц документа, обрабатываемых '
+                 'одним процессом за раз'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_false',
+            dest='use_cache',
+            default=True,
+            help='Не использовать кеш текста и таблиц страниц'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            default=False,
+            help='Разобрать все страницы заново, даже если они не '
+                 'изменились с прошлого запуска'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            default=False,
+            help='Продолжить прерванный запуск: сначала загрузить '
+                 'оставшиеся промежуточные файлы, затем разобрать '
+                 'страницы, которые ещё не загружены'
+        )
+        parser.add_argument(
+            '--retry-quarantined',
+            action='store_true',
+            default=False,
+            help='Разобрать заново страницы в карантине'
+        )
+        parser.add_argument(
+            '--metrics-file',
+            default=settings.PDF_METRICS_FILE,
+            help='JSON файл сводки замеров запуска: время этапов и '
+                 'скорость обработки по документам и процессам'
+        )
 
     def handle(self, *args, **options):
-        for x in os.listdir(settings.PDF_FILES_PATH):
-            if x.endswith('.pdf'):
-                self.pdf_files.append(os.path.join(settings.PDF_FILES_PATH, x))
-
-        procs = []
-        for file_path in self.pdf_files:
-            infile = open(file_path, 'rb')
-            pdf_pages_count = len(list(PDFPage.get_pages(infile)))
-
-            proc = Process(
-                target=self.get_vote_results_data,
-                kwargs={
-                    'file_path': file_path,
-                    'infile': infile,
-                    'pdf_pages_count': pdf_pages_count
-                }
+        for name in ('workers', 'shard_size'):
+            if options[name] < 1:
+                raise CommandError('Параметр --{} должен быть больше 0'.format(
+                    name.replace('_', '-')
+                ))
+
+        self.tables = options['tables']
+        self.loader = options['loader']
+        self.stage = options['stage']
+        self.staging_path = options['staging_path']
+        self.force = options['force']
+        self.retry_quarantined = options['retry_quarantined']
+        self.use_cache = options['use_cache']
+        self.pdf_files = []
+        self.pbars = []
+        self.loaded_sessions = set()
+        self.metrics = IngestMetrics()
+
+        try:
+            self.parse(options)
+        finally:
+            # Статистику по депутатам пересчитываем только для сессий,
+            # голосования которых загружены (в том числе до ошибки)
+            if self.loaded_sessions:
+                refresh_agreement(
+                    Session.objects.filter(title__in=self.loaded_sessions)
+                                   .values_list('pk', flat=True)
+                )
+            # Ошибка записи сводки не прерывает команду и не скрывает
+            # ошибку разбора
+            try:
+                self.metrics.write(
+                    options['metrics_file'],
+                    stage=self.stage, tables=self.tables, loader=self.loader,
+                    workers=options['workers'],
+                    shard_size=options['shard_size']
+                )
+            except Exception:
+                self.stderr.write('Ошибка записи сводки {}:\n{}'.format(
+                    options['metrics_file'], traceback.format_exc()
+                ))
+
+    def parse(self, options: dict):
+        """
+        Извлекаем данные из pdf файлов и загружаем их в базу данных
+        """
+        errors = []
+        if self.stage == 'load' or \
+                self.stage == 'all' and options['resume']:
+            # Части, извлечённые, но не загруженные прерванным запуском,
+            # загружаем без повторного разбора
+            errors += self.load_staging_files(
+                self.get_staging_file_paths(),
+                remove=self.stage == 'all'
             )
-            self.pbars.append(tqdm.tqdm(total=pdf_pages_count))
-            proc.start()
-            procs.append(proc)
+            if self.stage == 'load':
+                if errors:
+                    raise CommandError(
+                        'Не загружено промежуточных файлов: {}'.format(
+                            len(errors)
+                        )
+                    )
+                return
+
+        file_paths = [
+            os.path.join(settings.PDF_FILES_PATH, x)
+            for x in sorted(os.listdir(settings.PDF_FILES_PATH))
+            if x.endswith('.pdf')
+        ]
+
+        # Большие документы делим на части, чтобы они обрабатывались
+        # параллельно на всех процессорах
+        shards = []
+        for file_path in file_paths:
+            file_hash = get_file_hash(file_path)
+            with open(file_path, 'rb') as infile:
+                pdf_pages_count = get_pdf_pages_count(infile)
+                page_hashes = self.get_pending_pages(
+                    file_path, file_hash, infile, pdf_pages_count
+                )
+
+            # Файл не изменился с прошлого запуска
+            if not page_hashes:
+                continue
 
-        listener = Process(target=self.listener)
-        listener.start()
+            self.pdf_files.append(file_path)
+            self.pbars.append(tqdm.tqdm(total=len(page_hashes)))
+            for start, stop in get_page_ranges(
+                    pdf_pages_count, options['shard_size']
+            ):
+                pages = {
+                    page: content_hash
+                    for page, content_hash in page_hashes.items()
+                    if start <= page < stop
+                }
+                if pages:
+                    shards.append((file_path, file_hash, pages))
+
+        self.stdout.write('Файлов без изменений: {} из {}'.format(
+            len(file_paths) - len(self.pdf_files), len(file_paths)
+        ))
+        if not shards:
+            if errors:
+                raise CommandError(
+                    'Не обработано частей документов: {}'.format(len(errors))
+                )
+            return
 
-        for proc in procs:
-            proc.join()
+        # Процессы пула не должны использовать соединение с базой данных
+        # родительского процесса
+        connections.close_all()
 
-        self.queue.put(None)
-        listener.join()
+        with Pool(
+                options['workers'], initializer=init_worker,
+                initargs=(self,)
+        ) as pool:
+            staging_file_paths = self.iter_extracted_shards(
+                pool.imap(parse_shard, shards), errors
+            )
+            if self.stage == 'all':
+                # Пока загружается одна часть, пул извлекает следующие
+                errors += self.load_staging_files(
+                    staging_file_paths, remove=True
+                )
+            else:
+                staging_file_paths = list(staging_file_paths)
+                self.stdout.write(
+                    'Промежуточных файлов: {} в {}'.format(
+                        len(staging_file_paths), self.staging_path
+                    )
+                )
+
+        if self.use_cache:
+            PageCache().evict()
+
+        if errors:
+            raise CommandError(
+                'Не обработано частей документов: {}'.format(len(errors))
+            )
 
-    def listener(self):
+    def get_staging_file_paths(self) -> list:
         """
-        Обновляем прогресс у прогресс-бара
+        Получаем промежуточные файлы в порядке документов и страниц
         """
-        for index in iter(self.queue.get, None):
-            if index is None:
-                continue
-            self.pbars[index].update()
+        if not os.path.isdir(self.staging_path):
+            return []
+        return sorted(
+            os.path.join(self.staging_path, x)
+            for x in os.listdir(self.staging_path)
+            if x.endswith('.ndjson')
+        )
 
-    def get_vote_results_data(
-            self, file_path: str, infile: FileIO, pdf_pages_count: int
-    ):
+    def iter_extracted_shards(
+            self, results: Iterator[tuple], errors: list
+    ) -> Iterator[str]:
         """
-        Информационные данные о голосовании
+        Последовательно отдаём промежуточные файлы извлечённых частей
+        документов. Части с ошибками добавляем в список ошибок.
+        Прогресс и замеры обновляются по частям документов.
         """
-        for page in range(pdf_pages_count):
-            index = self.pdf_files.index(file_path)
-            self.queue.put(index)
-            text = self.get_pdf_page_text(infile, page)
-            data = text.split('\n')
-
-            # Голосование растянуто на две страницы и мы сейчас на второй стр
-            if 'Система поіменного голосування "Рада Голос"' not in text:
+        for shard, staging_file_path, error, metrics, worker in results:
+            self.pbars[self.pdf_files.index(shard[0])].update(len(shard[2]))
+            self.metrics.add(metrics, os.path.basename(shard[0]), worker)
+            if error is None:
+                yield staging_file_path
                 continue
 
-            # Городской совет (например: Броварська міська рада)
-            council_title = self.get_council_title(data)
-            council, created = Council.objects.get_or_create(
-                title=council_title
-            )
-
-            # Сессия (например: 18 чергова сесія)
-            session_title = self.get_session_title(data)
-            # Дата сессии (например: 22.09.16)
-            session_date = self.get_session_date(session_title)
-
-            session, created = Session.objects.get_or_create(
-                title=session_title, date=session_date
-            )
-
-            # Название голосования (например: Про затвердження порядку денного)
-            vote_title = self.get_vote_title(text)
-            # Тип голосования (например: За основу)
-            vote_type = self.get_vote_type(text)
-
-            # Сохраняем данные голосования
-            vote, created = Vote.objects.get_or_create(
-                title=vote_title,
-                types=vote_type,
-                council=council,
-                session=session
+            errors.append(shard)
+            self.stderr.write(
+                'Ошибка обработки {}, страницы {}-{}:\n{}'.format(
+                    os.path.basename(shard[0]), min(shard[2]) + 1,
+                    max(shard[2]) + 1, error
+                )
             )
 
-            # Обрабатываем данные с таблиц
-            self.get_vote_result_table(vote, page, file_path)
-
-            # Пересчитываем результаты голосования
-            recalc_vote_results(vote)
+    def load_staging_files(
+            self, staging_file_paths: Iterable[str], remove: bool = False
+    ) -> list:
+        """
+        Загружаем промежуточные файлы в базу данных.
+        Возвращаем список файлов, которые не удалось загрузить.
+        """
+        errors = []
+        with self.loaders[self.loader]() as loader:
+            for staging_file_path in staging_file_paths:
+                metrics = StageMetrics()
+                try:
+                    with metrics.measure('load'):
+                        pages = self.load_staging_file(
+                            staging_file_path, loader
+                        )
+                except Exception:
+                    # Транзакция откатилась, закешированные объекты могли
+                    # не сохраниться
+                    loader.clear()
+                    errors.append(staging_file_path)
+                    self.stderr.write('Ошибка загрузки {}:\n{}'.format(
+                        staging_file_path, traceback.format_exc()
+                    ))
+                    continue
+
+                metrics.count('loaded_pages', len(pages))
+                metrics.count('loaded_votes', sum(
+                    1 for page in pages if page.vote is not None
+                ))
+                if pages:
+                    self.metrics.add(metrics, pages[0].file_name)
+
+                if remove:
+                    os.remove(staging_file_path)
+
+        return errors
+
+    @transaction.atomic
+    def load_staging_file(
+            self, staging_file_path: str, loader: VoteLoader
+    ) -> list:
+        """
+        Загружаем промежуточный файл части документа в базу данных.
+        Данные и отметки о разобранных страницах в манифесте сохраняются
+        в одной транзакции, поэтому прерванный запуск продолжается
+        со следующей незагруженной части. Возвращаем загруженные страницы.
+        """
+        pages = list(read_staging_file(staging_file_path))
+        for page in pages:
+            if page.vote is not None:
+                loader.add(page.vote)
+                self.loaded_sessions.add(page.vote.session)
+        loader.flush()
+
+        for page in pages:
+            if page.error is not None:
+                self.stderr.write(
+                    'Страница {} файла {} в карантине:\n{}'.format(
+                        page.page + 1, page.file_name, page.error
+                    )
+                )
+
+        if pages:
+            self.save_parsed_pages(pages[0].file_name, pages[0].file_hash, {
+                page.page: page.content_hash for page in pages
+            }, {
+                page.page: page.error for page in pages
+                if page.error is not None
+            })
+        return pages
+
+    def get_pending_pages(
+            self, file_path: str, file_hash: str, infile: FileIO,
+            pdf_pages_count: int
+    ) -> dict:
+        """
+        Получаем страницы документа, которые нужно разобрать
+        {номер страницы: SHA-256 содержимого}.
+        Страницы, содержимое которых уже разобрано текущей версией
+        парсера (в том числе в другой версии файла), пропускаем.
+        """
+        # Без базы данных (только извлечение) манифест недоступен
+        use_manifest = not self.force and self.stage == 'all'
+        parsed = ParsedPage.objects.filter(parser_version=PARSER_VERSION)
+        if self.retry_quarantined:
+            parsed = parsed.filter(error='')
+
+        if use_manifest and \
+                parsed.filter(file_hash=file_hash).count() == pdf_pages_count:
+            return {}
+
+        page_hashes = dict(enumerate(get_pdf_page_hashes(infile)))
+        if not use_manifest:
+            return page_hashes
+
+        known = set(
+            parsed.filter(content_hash__in=page_hashes.values())
+                  .values_list('content_hash', flat=True)
+        )
+        # Запоминаем уже разобранные страницы для новой версии файла
+        self.save_parsed_pages(os.path.basename(file_path), file_hash, {
+            page: content_hash for page, content_hash in page_hashes.items()
+            if content_hash in known
+        })
+        return {
+            page: content_hash for page, content_hash in page_hashes.items()
+            if content_hash not in known
+        }
 
     @staticmethod
-    def get_pdf_page_text(infile: FileIO, page: int) -> str:
+    @transaction.atomic
+    def save_parsed_pages(
+            file_name: str, file_hash: str, page_hashes: dict,
+            errors: Optional[dict] = None
+    ):
         """
-        Получаем текстовое содержимое указанного файла на указанной странице
+        Сохраняем разобранные страницы документа в манифест.
+        Страницы с ошибками разбора {страница: ошибка} попадают в карантин.
         """
-        output = StringIO()
-        manager = PDFResourceManager()
-        converter = TextConverter(manager, output, laparams=LAParams())
-        interpreter = PDFPageInterpreter(manager, converter)
-
-        for current_page in PDFPage.get_pages(infile, [page]):
-            interpreter.process_page(current_page)
+        errors = errors or {}
+        ParsedPage.objects.filter(file_hash=file_hash, page__in=page_hashes)\
+                          .delete()
+        ParsedPage.objects.bulk_create(
+            ParsedPage(
+                file_name=file_name,
+                file_hash=file_hash,
+                page=page,
+                content_hash=content_hash,
+                parser_version=PARSER_VERSION,
+                error=errors.get(page, '')
+            )
+            for page, content_hash in page_hashes.items()
+        )
 
-        # Получаем текст из StringIO
-        text = output.getvalue()
+    def extract_pages(
+            self, file_path: str, file_hash: str, page_hashes: dict,
+            metrics: Optional[StageMetrics] = None
+    ) -> str:
+        """
+        Извлекаем данные голосований страниц документа в промежуточный
+        файл. База данных не используется. Время этапов и счётчики
+        добавляются в metrics.
+        """
+        if metrics is None:
+            metrics = StageMetrics()
+        file_name = os.path.basename(file_path)
+        staging_file_path = get_staging_file_path(
+            self.staging_path, file_hash, min(page_hashes)
+        )
 
-        # Очищаем данные
-        converter.close()
-        output.close()
+        pages = []
+        # Один процесс tabula на часть документа
+        with open(file_path, 'rb') as infile, TabulaWorker() as tabula:
+            for page, text, voices, error in self.iter_pages_data(
+                    file_path, file_hash, infile, sorted(page_hashes), tabula,
+                    metrics
+            ):
+                # Ошибка разбора страницы не прерывает обработку документа,
+                # страница попадает в карантин
+                vote = None
+                if error is None:
+                    try:
+                        with metrics.measure('parse'):
+                            vote = self.get_vote_record(text, voices)
+                    except Exception:
+                        error = traceback.format_exc()
+
+                metrics.count('pages')
+                if vote is not None:
+                    metrics.count('votes')
+                if error is not None:
+                    metrics.count('errors')
+
+                pages.append(StagedPage(
+                    file_name=file_name,
+                    file_hash=file_hash,
+                    page=page,
+                    content_hash=page_hashes[page],
+                    vote=vote,
+                    error=error
+                ))
+
+        with metrics.measure('staging'):
+            write_staging_file(staging_file_path, pages)
+        return staging_file_path
+
+    def get_vote_record(
+            self, text: str, voices: Optional[list]
+    ) -> Optional[VoteRecord]:
+        """
+        Информационные данные о голосовании
+        """
+        data = text.split('\n')
+
+        # Голосование растянуто на две страницы и мы сейчас на второй стр
+        if voices is None:
+            return None
+
+        # Городской совет (например: Броварська міська рада)
+        council_title = self.get_council_title(data)
+
+        # Сессия (например: 18 чергова сесія)
+        session_title = self.get_session_title(data)
+        # Дата сессии (например: 22.09.16)
+        session_date = self.get_session_date(session_title)
+
+        # Название голосования (например: Про затвердження порядку денного)
+        vote_title = self.get_vote_title(text)
+        # Тип голосования (например: За основу)
+        vote_type = self.get_vote_type(text)
+
+        return VoteRecord(
+            council=council_title,
+            session=session_title,
+            session_date=session_date,
+            title=vote_title,
+            types=vote_type,
+            voices=self.get_voices(voices)
+        )
 
-        return text
+    def iter_pages_data(
+            self, file_path: str, file_hash: str, infile: FileIO,
+            page_numbers: list, tabula: TabulaWorker,
+            metrics: Optional[StageMetrics] = None
+    ) -> Iterator[tuple]:
+        """
+        Последовательно отдаём номер, текст, таблицу голосования страниц
+        документа и ошибку извлечения таблицы. Таблица None, если на
+        странице нет голосования или её не удалось извлечь.
+        Страницы из кеша не разбираются повторно.
+        Время извлечения текста и таблиц добавляется в metrics.
+        """
+        if metrics is None:
+            metrics = StageMetrics()
+        cache = PageCache() if self.use_cache else None
+
+        cached = {}
+        if cache is not None:
+            for page in page_numbers:
+                page_data = cache.get(file_hash, page, self.tables)
+                if page_data is not None:
+                    cached[page] = page_data
+        metrics.count('cached_pages', len(cached))
+
+        # Документ разбирается один раз, страницы отдаются по порядку
+        pages = iter_pdf_pages(
+            infile, [page for page in page_numbers if page not in cached]
+        )
+        for page in page_numbers:
+            error = None
+            if page in cached:
+                text, voices = cached[page]
+            else:
+                with metrics.measure('text'):
+                    page, text, layout = next(pages)
+                # На части страниц слова разделены неразрывными пробелами
+                text = text.replace('\xa0', ' ')
+                voices = None
+                if self.vote_header in text:
+                    # Обрабатываем данные с таблиц
+                    try:
+                        with metrics.measure('tables'):
+                            voices = self.get_vote_result_table(
+                                page, file_path, tabula, layout
+                            )
+                    except Exception:
+                        error = traceback.format_exc()
+                if cache is not None and error is None:
+                    cache.set(file_hash, page, self.tables, text, voices)
+
+            yield page, text, voices, error
 
     @staticmethod
     def get_council_title(data: list) -> str:
@@ -194,80 +663,38 @@ class Command(BaseCommand):
             )[0]
         return None
 
-    def get_vote_result_table(self, vote: Vote, page: int, file_path: str):
+    def get_vote_result_table(
+            self, page: int, file_path: str, tabula: TabulaWorker,
+            layout: LTPage
+    ) -> list:
         """
         Обрабатываем данные с таблиц
         """
-        df = read_pdf_table(
-            file_path, **{'pages': page, 'silent': True}
-        )
-
-        # На странице может не быть таблиц
-        if df is None:
-            return
-
-        head = list(df.head())
-        active_deputies = []
-
-        # Таблица слева
-        full_name1 = df[head[1]].fillna('')
-        if len(head) == 8:
-            vote_result1 = df[head[3]].fillna('')
-        else:
-            vote_result1 = df[head[2]].fillna('')
-
-        active_deputies += self.create_voice(vote, full_name1, vote_result1)
+        if self.tables == 'layout':
+            # Таблицы по разметке, уже полученной pdfminer
+            return get_layout_vote_table(layout)
 
-        # Таблица справа
-        if len(head) == 8:
-            full_name2 = df[head[5]].fillna('')
-            vote_result2 = df[head[7]].fillna('')
-        else:
-            full_name2 = df[head[4]].fillna('')
-            vote_result2 = df[head[5]].fillna('')
-
-        active_deputies += self.create_voice(vote, full_name2, vote_result2)
-
-        # Возможно сменился состав депутатов. Удаляем которых больше нет
-        Voice.objects.filter(vote=vote)\
-                     .exclude(deputy__in=active_deputies)\
-                     .delete()
+        # Страницы у tabula нумеруются с единицы
+        df = tabula.read_pdf_table(
+            file_path, **{'pages': page + 1, 'silent': True}
+        )
+        return get_tabula_vote_table(df)
 
     @staticmethod
-    def create_voice(
-            vote: Vote, full_name: Series, vote_result: Series
-    ) -> list:
+    def get_voices(voices: list) -> list:
         """
-        Сохраняем данные таблиц
+        Получаем значения Voice.RESULT для результатов голосования депутатов
         """
-        active_deputies = []
-
-        for i in range(1, len(full_name)):
-            # Если не указано значение голосования - из-за длинного имени
-            # ячейка занимает 2 строки
-            if not vote_result[i]:
-                if i + 1 < len(full_name):
-                    full_name[i + 1] = '{} {}'.format(full_name[i],
-                                                      full_name[i + 1])
-                continue
-
-            # Получаем депутата
-            deputy, created = Deputy.objects.get_or_create(
-                full_name=full_name[i].strip()
-            )
-            active_deputies.append(deputy.pk)
+        result = []
 
-            if full_name[i].strip() == '2':
+        for full_name, vote_result in voices:
+            if full_name == '2':
                 raise AssertionError
 
             # Получаем значение голосования
             voice_result = next(
-                filter(lambda x: x[1] == vote_result[i], Voice.RESULT)
-            )
-
-            # Сохраняем результаты
-            Voice.objects.get_or_create(
-                deputy=deputy, vote=vote, result=voice_result[0]
+                filter(lambda x: x[1] == vote_result, Voice.RESULT)
             )
+            result.append((full_name, voice_result[0]))
 
-        return active_deputies
+        return result
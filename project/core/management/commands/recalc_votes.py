@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Vote
+from ...utils import recalc_votes_results
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчёта результатов голосований по голосам депутатов
+    """
+    help = 'Пересчёт результатов голосований одним запросом'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vote',
+            type=int,
+            action='append',
+            help='id голосования (можно повторять)'
+        )
+        parser.add_argument(
+            '--session',
+            type=int,
+            action='append',
+            help='id сессии, голосования которой пересчитываются '
+                 '(можно повторять)'
+        )
+
+    def handle(self, *args, **options):
+        votes = None
+        if options['vote'] or options['session']:
+            votes = set(options['vote'] or [])
+            if options['session']:
+                votes.update(
+                    Vote.objects.filter(session__in=options['session'])
+                                .values_list('pk', flat=True)
+                )
+
+        count = recalc_votes_results(votes)
+        self.stdout.write('Изменено голосований: {}'.format(count))
@@ -0,0 +1,143 @@
+from typing import Optional
+from contextlib import contextmanager
+from datetime import datetime
+import os
+import json
+import tempfile
+import time
+
+
+# Этапы обработки документов: извлечение текста (pdfminer), таблиц
+# (tabula или разметка страницы), разбор данных голосования, запись
+# промежуточного файла и загрузка в базу данных
+STAGES = ('text', 'tables', 'parse', 'staging', 'load')
+# Этапы извлечения данных, которые выполняются в процессах пула
+EXTRACT_STAGES = ('text', 'tables', 'parse', 'staging')
+# Счётчики: извлечённые страницы и голосования, страницы из кеша,
+# страницы в карантине, загруженные страницы и голосования
+COUNTERS = (
+    'pages', 'votes', 'cached_pages', 'errors', 'loaded_pages',
+    'loaded_votes'
+)
+
+
+class StageMetrics:
+    """
+    Время этапов обработки (в секундах) и счётчики части документа,
+    документа или процесса. Части собираются в процессах пула и
+    передаются родительскому процессу вместе с результатом части.
+    """
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """
+        Замеряем время этапа
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - started
+
+    def count(self, counter: str, value: int = 1):
+        self.counters[counter] += value
+
+    def add(self, other: 'StageMetrics'):
+        """
+        Добавляем замеры другой части
+        """
+        for stage, seconds in other.seconds.items():
+            self.seconds[stage] += seconds
+        for counter, value in other.counters.items():
+            self.counters[counter] += value
+
+    def as_dict(self, elapsed: Optional[float] = None) -> dict:
+        """
+        Замеры со скоростью обработки: страниц и голосований в секунду
+        за время elapsed (по умолчанию - суммарное время извлечения) и
+        загруженных голосований в секунду загрузки
+        """
+        if elapsed is None:
+            elapsed = sum(self.seconds[stage] for stage in EXTRACT_STAGES)
+
+        def get_rate(count: int, seconds: float) -> Optional[float]:
+            return count / seconds if seconds else None
+
+        return dict(
+            self.counters,
+            seconds=dict(self.seconds),
+            elapsed=elapsed,
+            pages_per_second=get_rate(self.counters['pages'], elapsed),
+            votes_per_second=get_rate(self.counters['votes'], elapsed),
+            load_votes_per_second=get_rate(
+                self.counters['loaded_votes'], self.seconds['load']
+            )
+        )
+
+
+class IngestMetrics:
+    """
+    Замеры запуска parse_pdf по документам и процессам
+    """
+    def __init__(self):
+        self.started = datetime.now()
+        self.started_time = time.perf_counter()
+        self.total = StageMetrics()
+        self.documents = {}
+        self.workers = {}
+
+    def add(self, metrics: StageMetrics, document: str,
+            worker: Optional[int] = None):
+        """
+        Добавляем замеры части документа, обработанной процессом worker
+        (None - родительским процессом)
+        """
+        self.total.add(metrics)
+        self.documents.setdefault(document, StageMetrics()).add(metrics)
+        if worker is not None:
+            self.workers.setdefault(worker, StageMetrics()).add(metrics)
+
+    def get_summary(self, **options) -> dict:
+        """
+        Сводка запуска. Скорость обработки в целом считается по времени
+        запуска, документов и процессов - по времени извлечения.
+        """
+        return {
+            'started': self.started.isoformat(),
+            'options': options,
+            'total': self.total.as_dict(
+                time.perf_counter() - self.started_time
+            ),
+            'documents': {
+                document: metrics.as_dict()
+                for document, metrics in sorted(self.documents.items())
+            },
+            'workers': {
+                str(worker): metrics.as_dict()
+                for worker, metrics in sorted(self.workers.items())
+            },
+        }
+
+    def write(self, path: str, **options):
+        """
+        Записываем сводку запуска в JSON файл.
+        Файл появляется только после полной записи.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path))
+        )
+        try:
+            with open(fd, 'w', encoding='utf-8') as outfile:
+                json.dump(
+                    self.get_summary(**options), outfile,
+                    ensure_ascii=False, indent=2
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,164 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from .generation import get_generation
+from .response_cache import ResponseCache
+from .timing import RequestTiming, timing_stats
+
+import hashlib
+import logging
+import random
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ApiCacheMiddleware:
+    """
+    Кеш ответов API. Данные меняются только при загрузке pdf файлов и
+    изменении в административной части, поэтому ключ кеша включает
+    поколение данных, а старые ответы вытесняются сами.
+    Ответы отдаются со strong ETag (SHA-1 содержимого), при совпадении
+    If-None-Match с ETag ответа из кеша возвращается 304 без обращения
+    к базе данных.
+    """
+    path_prefix = '/api/'
+    # Кешируются только ответы в JSON, а не страницы веб интерфейса API
+    content_type = 'application/json'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cache = ResponseCache(settings.API_CACHE_SIZE)
+
+    def __call__(self, request):
+        if request.method != 'GET' or \
+                not request.path.startswith(self.path_prefix) or \
+                not settings.API_CACHE_SIZE:
+            return self.get_response(request)
+
+        key = (
+            get_generation(), request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', '')
+        )
+        entry = self.cache.get(key)
+        if entry is None:
+            response = self.get_response(request)
+            if response.status_code != 200 or response.streaming or \
+                    not response.get('Content-Type', '').startswith(
+                        self.content_type
+                    ) or \
+                    'no-store' in response.get('Cache-Control', ''):
+                return response
+
+            response['ETag'] = '"{}"'.format(
+                hashlib.sha1(response.content).hexdigest()
+            )
+            entry = (response.content, list(response.items()))
+            self.cache.set(key, entry, len(response.content))
+        else:
+            response = HttpResponse(entry[0])
+            for header, value in entry[1]:
+                response[header] = value
+
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if response['ETag'] in etags or '*' in etags:
+            return self.get_not_modified(response)
+        return response
+
+    @staticmethod
+    def get_not_modified(response: HttpResponse) -> HttpResponse:
+        """
+        Ответ 304 с заголовками кешируемого ответа
+        """
+        not_modified = HttpResponseNotModified()
+        for header in ('ETag', 'Vary', 'Cache-Control'):
+            if header in response:
+                not_modified[header] = response[header]
+        return not_modified
+
+
+class RequestTimingMiddleware:
+    """
+    Замеры запросов на реальном трафике: количество и время SQL запросов,
+    время отрисовки ответа и общее время. Замеряется доля запросов
+    REQUEST_TIMING_SAMPLE_RATE (при 0 middleware отключается целиком),
+    замеры отдаются в заголовке Server-Timing, пишутся в лог и
+    добавляются к сводным замерам по представлениям (DRF представления -
+    класс и действие, например VoteViewSet.retrieve). Ответы из кеша
+    API не доходят до представления и в сводные замеры не попадают.
+    """
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        request.timing = RequestTiming()
+        request.timing_view = None
+        started = time.perf_counter()
+        # SQL запросы с их временем пишутся в queries_log соединения
+        debug_cursors = {}
+        for connection in connections.all():
+            debug_cursors[connection] = connection.force_debug_cursor
+            connection.force_debug_cursor = True
+            connection.queries_log.clear()
+        try:
+            response = self.get_response(request)
+        finally:
+            for connection, force_debug_cursor in debug_cursors.items():
+                connection.force_debug_cursor = force_debug_cursor
+                request.timing.queries += len(connection.queries_log)
+                request.timing.db += 1000 * sum(
+                    float(query['time']) for query in connection.queries_log
+                )
+
+        timing = request.timing
+        timing.total = 1000 * (time.perf_counter() - started)
+        response['Server-Timing'] = timing.get_server_timing()
+        if request.timing_view is not None:
+            timing_stats.add(request.timing_view, timing)
+        logger.info(
+            '%s %s %s queries=%d db=%.1fms render=%.1fms total=%.1fms',
+            request.method, request.path, response.status_code,
+            timing.queries, timing.db, timing.render, timing.total
+        )
+        return response
+
+    @staticmethod
+    def process_view(request, view_func, view_args, view_kwargs):
+        if not hasattr(request, 'timing'):
+            return None
+        # Представления DRF: класс и действие для метода запроса
+        view_class = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None) or {}
+        if view_class is not None:
+            request.timing_view = '{}.{}'.format(
+                view_class.__name__,
+                actions.get(request.method.lower(), request.method.lower())
+            )
+        else:
+            request.timing_view = '{}.{}'.format(
+                view_func.__module__, view_func.__name__
+            )
+        return None
+
+    @staticmethod
+    def process_template_response(request, response):
+        if not hasattr(request, 'timing'):
+            return response
+        # Ответы DRF отрисовываются (сериализуются в JSON) после
+        # представления
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.timing.render = 1000 * (time.perf_counter() - started)
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 10:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_auto_20170502_1521'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParsedPage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, verbose_name='файл')),
+                ('file_hash', models.CharField(max_length=64, verbose_name='SHA-256 файла')),
+                ('page', models.PositiveIntegerField(verbose_name='страница')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='SHA-256 содержимого страницы')),
+                ('parser_version', models.PositiveSmallIntegerField(verbose_name='версия парсера')),
+                ('parsed', models.DateTimeField(auto_now=True, verbose_name='дата разбора')),
+            ],
+            options={
+                'verbose_name': 'разобранная страница',
+                'verbose_name_plural': 'разобранные страницы',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='parsedpage',
+            unique_together=set([('file_hash', 'page')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='parsedpage',
+            index_together=set([('content_hash', 'parser_version')]),
+        ),
+    ]
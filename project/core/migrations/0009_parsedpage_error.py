@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 11:26
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_auto_20261018_1040'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsedpage',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='ошибка'),
+        ),
+    ]
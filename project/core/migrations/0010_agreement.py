@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 11:34
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_parsedpage_error'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Agreement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('both', models.PositiveIntegerField(verbose_name='голосовали оба')),
+                ('same', models.PositiveIntegerField(verbose_name='голосовали одинаково')),
+                ('council', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Council', verbose_name='городской совет')),
+                ('deputy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.Deputy', verbose_name='депутат')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.Deputy', verbose_name='другой депутат')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Session', verbose_name='сессия')),
+            ],
+            options={
+                'verbose_name': 'совпадение голосов',
+                'verbose_name_plural': 'совпадения голосов',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='agreement',
+            unique_together=set([('council', 'session', 'deputy', 'other')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='agreement',
+            index_together=set([('deputy', 'session')]),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 11:46
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_agreement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='date',
+            field=models.DateField(db_index=True, verbose_name='дата'),
+        ),
+        migrations.AlterIndexTogether(
+            name='vote',
+            index_together=set([('session', 'id')]),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:05
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Триграммный индекс для поиска подстроки в названии голосования
+    (в том числе icontains в административной части). Создаётся, только
+    если расширение pg_trgm доступно в PostgreSQL.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute(
+            'CREATE INDEX core_vote_title_trgm ON core_vote '
+            'USING gin (UPPER(title) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP INDEX IF EXISTS core_vote_title_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_vote_cursor_index'),
+    ]
+
+    operations = [
+        # Выражение индекса совпадает с SearchVector('title', config='simple')
+        migrations.RunSQL(
+            "CREATE INDEX core_vote_title_search ON core_vote USING gin "
+            "(to_tsvector('simple'::regconfig, COALESCE(title, '')))",
+            'DROP INDEX core_vote_title_search'
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
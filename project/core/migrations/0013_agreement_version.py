@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:19
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+import uuid
+
+
+def create_version(apps, schema_editor):
+    apps.get_model('core', 'AgreementVersion').objects.create(
+        pk=1, version=uuid.uuid4().hex
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_vote_title_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgreementVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=32, verbose_name='версия')),
+            ],
+            options={
+                'verbose_name': 'версия статистики',
+                'verbose_name_plural': 'версия статистики',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_agreement_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='session_date',
+            field=models.DateField(editable=False, null=True, verbose_name='дата сессии'),
+        ),
+        migrations.RunSQL(
+            'UPDATE core_vote v SET session_date = s.date '
+            'FROM core_session s WHERE s.id = v.session_id',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='session_date',
+            field=models.DateField(editable=False, verbose_name='дата сессии'),
+        ),
+        migrations.AlterIndexTogether(
+            name='vote',
+            index_together=set([('session_date', 'id')]),
+        ),
+    ]
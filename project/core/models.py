@@ -21,7 +21,7 @@ class Session(models.Model):
     Модель сессии созыва
     """
     title = models.CharField('название', max_length=100, unique=True)
-    date = models.DateField('дата')
+    date = models.DateField('дата', db_index=True)
 
     class Meta:
         verbose_name = 'сессию'
@@ -31,6 +31,12 @@ class Session(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Дата сессии продублирована в голосованиях
+        Vote.objects.filter(session=self).exclude(session_date=self.date)\
+                    .update(session_date=self.date)
+
 
 class Vote(models.Model):
     """
@@ -55,6 +61,9 @@ class Vote(models.Model):
     )
     council = models.ForeignKey(Council, verbose_name='городской совет')
     session = models.ForeignKey(Session, verbose_name='сессия')
+    # Дата сессии: постраничный вывод упорядочен по ней и id голосования
+    # по индексу без соединения с сессиями
+    session_date = models.DateField('дата сессии', editable=False)
     # Результаты голосования
     agree = models.SmallIntegerField('за', default=0)
     disagree = models.SmallIntegerField('против', default=0)
@@ -74,10 +83,16 @@ class Vote(models.Model):
     class Meta:
         verbose_name = 'голосование'
         verbose_name_plural = 'голосования'
+        # Постраничный вывод по дате сессии и id
+        index_together = ('session_date', 'id')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.session_date = self.session.date
+        super().save(*args, **kwargs)
+
 
 class Deputy(models.Model):
     """
@@ -119,3 +134,86 @@ class Voice(models.Model):
             self.vote.__str__(),
             self.get_result_display()
         )
+
+
+class ParsedPage(models.Model):
+    """
+    Модель манифеста разобранных страниц pdf файлов.
+    Неизменившиеся файлы и страницы при повторном запуске не разбираются.
+    """
+    file_name = models.CharField('файл', max_length=255)
+    file_hash = models.CharField('SHA-256 файла', max_length=64)
+    page = models.PositiveIntegerField('страница')
+    content_hash = models.CharField(
+        'SHA-256 содержимого страницы',
+        max_length=64
+    )
+    parser_version = models.PositiveSmallIntegerField('версия парсера')
+    # Страница с ошибкой разбора в карантине: данных голосования нет,
+    # при следующих запусках она пропускается
+    error = models.TextField('ошибка', blank=True)
+    parsed = models.DateTimeField('дата разбора', auto_now=True)
+
+    class Meta:
+        verbose_name = 'разобранная страница'
+        verbose_name_plural = 'разобранные страницы'
+        unique_together = ('file_hash', 'page')
+        index_together = ('content_hash', 'parser_version')
+
+    def __str__(self):
+        return '{} - {}'.format(self.file_name, self.page + 1)
+
+
+class Agreement(models.Model):
+    """
+    Модель сохранённой попарной статистики голосов депутатов по сессиям.
+    Пересчитывается после загрузки данных и изменения голосов в
+    административной части, статистика по депутатам читается из неё.
+    """
+    council = models.ForeignKey(Council, verbose_name='городской совет')
+    session = models.ForeignKey(Session, verbose_name='сессия')
+    deputy = models.ForeignKey(
+        Deputy,
+        verbose_name='депутат',
+        related_name='+'
+    )
+    other = models.ForeignKey(
+        Deputy,
+        verbose_name='другой депутат',
+        related_name='+'
+    )
+    # Количество голосований, в которых оба депутата проголосовали
+    # (за, против или воздержались), и в которых они проголосовали одинаково
+    both = models.PositiveIntegerField('голосовали оба')
+    same = models.PositiveIntegerField('голосовали одинаково')
+
+    class Meta:
+        verbose_name = 'совпадение голосов'
+        verbose_name_plural = 'совпадения голосов'
+        unique_together = ('council', 'session', 'deputy', 'other')
+        index_together = ('deputy', 'session')
+
+    def __str__(self):
+        return '{} - {} - {}'.format(
+            self.deputy.__str__(),
+            self.other.__str__(),
+            self.session.__str__()
+        )
+
+
+class AgreementVersion(models.Model):
+    """
+    Модель версии сохранённой попарной статистики (одна строка).
+    Меняется на новое случайное значение при пересчёте статистики и
+    изменении депутатов (в том числе после отката транзакции значение
+    не повторяется), статистика в памяти процесса загружается заново
+    при смене версии.
+    """
+    version = models.CharField('версия', max_length=32)
+
+    class Meta:
+        verbose_name = 'версия статистики'
+        verbose_name_plural = 'версия статистики'
+
+    def __str__(self):
+        return str(self.version)
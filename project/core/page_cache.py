@@ -0,0 +1,102 @@
+from django.conf import settings
+
+from .pdf import EXTRACTOR_VERSION
+
+from typing import Optional
+import os
+import gzip
+import json
+import tempfile
+
+
+class PageCache:
+    """
+    Кеш текста и таблиц страниц pdf файлов на диске.
+    Каждая страница хранится в отдельном сжатом файле, ключ - SHA-256
+    файла, номер страницы, способ извлечения таблиц и версия извлечения.
+    Запись атомарная, поэтому кешем могут пользоваться несколько
+    процессов одновременно.
+    """
+    def __init__(self, path: Optional[str] = None,
+                 max_size: Optional[int] = None):
+        self.path = path or settings.PDF_CACHE_PATH
+        self.max_size = settings.PDF_CACHE_SIZE if max_size is None \
+            else max_size
+
+    def get_path(self, file_hash: str, page: int, tables: str) -> str:
+        """
+        Получаем путь к файлу страницы в кеше
+        """
+        return os.path.join(
+            self.path, file_hash,
+            '{}-{}-{}.json.gz'.format(page, tables, EXTRACTOR_VERSION)
+        )
+
+    def get(self, file_hash: str, page: int, tables: str) -> Optional[tuple]:
+        """
+        Получаем текст и таблицу голосования страницы.
+        None, если страницы нет в кеше.
+        """
+        path = self.get_path(file_hash, page, tables)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as infile:
+                data = json.load(infile)
+            # Время изменения используется для вытеснения давно
+            # не использовавшихся страниц
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        voices = data['voices']
+        if voices is not None:
+            voices = [tuple(voice) for voice in voices]
+        return data['text'], voices
+
+    def set(
+            self, file_hash: str, page: int, tables: str, text: str,
+            voices: Optional[list]
+    ):
+        """
+        Сохраняем текст и таблицу голосования страницы
+        """
+        path = self.get_path(file_hash, page, tables)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as raw, \
+                    gzip.open(raw, 'wt', encoding='utf-8') as outfile:
+                json.dump({'text': text, 'voices': voices}, outfile)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def evict(self) -> int:
+        """
+        Удаляем давно не использовавшиеся страницы, пока размер кеша
+        больше допустимого. Возвращаем количество удалённых страниц.
+        """
+        entries = []
+        for root, dirs, files in os.walk(self.path):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        removed = 0
+        for mtime, file_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
+            removed += 1
+
+        return removed
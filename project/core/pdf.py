@@ -0,0 +1,269 @@
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import (
+    LAParams, LTPage, LTContainer, LTText, LTTextBox, LTTextLine, LTChar
+)
+
+from typing import Iterable, Iterator, Optional
+from io import FileIO
+from collections import namedtuple
+import hashlib
+
+
+# Версия разбора страниц. Увеличивается при изменениях в извлечении
+# данных, чтобы уже разобранные страницы обработались заново
+PARSER_VERSION = 2
+# Версия извлечения текста и таблиц страниц. Увеличивается при изменениях
+# в извлечении, чтобы не использовать устаревший кеш страниц
+EXTRACTOR_VERSION = 2
+
+# Отступ между словами, как в LAParams.word_margin
+WORD_MARGIN = 0.1
+# Допустимое смещение текста относительно заголовка колонки таблицы
+COLUMN_MARGIN = 3
+# Допустимое смещение символов одной строки таблицы по высоте
+ROW_MARGIN = 2
+
+# Содержимое страницы pdf файла: номер страницы (с нуля), текст и
+# результат анализа разметки pdfminer
+PDFPageContent = namedtuple('PDFPageContent', ('number', 'text', 'layout'))
+
+
+def get_pdf_pages_count(infile: FileIO) -> int:
+    """
+    Получаем количество страниц из каталога документа, не обходя
+    дерево страниц
+    """
+    document = PDFDocument(PDFParser(infile))
+    return resolve1(resolve1(document.catalog['Pages'])['Count'])
+
+
+def get_file_hash(file_path: str) -> str:
+    """
+    Получаем SHA-256 файла
+    """
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_pdf_page_hashes(infile: FileIO) -> list:
+    """
+    Получаем SHA-256 содержимого каждой страницы pdf файла.
+    Хешируются потоки команд страницы, без анализа разметки, поэтому
+    это намного быстрее разбора страниц.
+    """
+    hashes = []
+    for page in PDFPage.create_pages(PDFDocument(PDFParser(infile))):
+        page_hash = hashlib.sha256()
+        for stream in page.contents:
+            page_hash.update(resolve1(stream).get_data())
+        hashes.append(page_hash.hexdigest())
+    return hashes
+
+
+def get_page_ranges(pages_count: int, size: int) -> list:
+    """
+    Делим страницы документа на диапазоны (начало, конец) не больше
+    указанного размера
+    """
+    return [
+        (start, min(start + size, pages_count))
+        for start in range(0, pages_count, size)
+    ]
+
+
+def iter_pdf_pages(
+        infile: FileIO, page_numbers: Optional[Iterable[int]] = None
+) -> Iterator[PDFPageContent]:
+    """
+    Последовательно отдаём страницы pdf файла.
+    Документ разбирается один раз, менеджер ресурсов (шрифты и т.д.)
+    и интерпретатор общие для всех страниц.
+    """
+    if page_numbers is not None:
+        page_numbers = set(page_numbers)
+
+    document = PDFDocument(PDFParser(infile))
+    manager = PDFResourceManager()
+    device = PDFPageAggregator(manager, laparams=LAParams())
+    interpreter = PDFPageInterpreter(manager, device)
+
+    for number, page in enumerate(PDFPage.create_pages(document)):
+        if page_numbers is not None:
+            if number not in page_numbers:
+                continue
+            page_numbers.discard(number)
+
+        interpreter.process_page(page)
+        layout = device.get_result()
+        yield PDFPageContent(number, get_layout_text(layout), layout)
+
+        # Все запрошенные страницы обработаны
+        if page_numbers is not None and not page_numbers:
+            break
+
+
+def get_layout_text(layout: LTPage) -> str:
+    """
+    Получаем текст страницы из результата анализа разметки.
+    Повторяет вывод TextConverter, чтобы не разбирать страницу повторно.
+    """
+    chunks = []
+
+    def render(item):
+        if isinstance(item, LTContainer):
+            for child in item:
+                render(child)
+        elif isinstance(item, LTText):
+            chunks.append(item.get_text())
+        if isinstance(item, LTTextBox):
+            chunks.append('\n')
+
+    render(layout)
+    chunks.append('\f')
+
+    return ''.join(chunks)
+
+
+def get_layout_lines(layout: LTContainer) -> list:
+    """
+    Получаем все строки текста из результата анализа разметки
+    """
+    lines = []
+    for item in layout:
+        if isinstance(item, LTTextLine):
+            lines.append(item)
+        elif isinstance(item, LTContainer):
+            lines += get_layout_lines(item)
+    return lines
+
+
+def get_cell_text(chars: list) -> str:
+    """
+    Собираем текст ячейки из символов.
+    Пробелы между словами расставляются так же, как это делает pdfminer.
+    """
+    text = ''
+    previous = None
+    for char in sorted(chars, key=lambda x: x.x0):
+        if previous is not None and \
+                previous.x1 < char.x0 - WORD_MARGIN * max(char.width,
+                                                          char.height):
+            text += ' '
+        text += char.get_text()
+        previous = char
+
+    # Переходы на новую строку, неразрывные и множественные пробелы
+    # заменяем на один пробел
+    return ' '.join(text.split())
+
+
+def get_layout_vote_table(layout: LTPage) -> list:
+    """
+    Получаем строки таблиц с результатами голосования депутатов
+    (ФИО, результат) по координатам символов страницы.
+    Таблиц на странице две (слева и справа), границы колонок определяем
+    по заголовкам таблиц: "№ п/п", "Результат голосування".
+    """
+    lines = get_layout_lines(layout)
+    texts = [(line, line.get_text().strip()) for line in lines]
+
+    numbers = sorted(
+        (line for line, text in texts if text == '№'), key=lambda x: x.x0
+    )
+    # На странице нет таблиц
+    if not numbers:
+        return []
+
+    counters = [line for line, text in texts if text == 'п/п']
+    names = [
+        line for line, text in texts
+        if text.startswith(('Прізвище', 'по-батькові'))
+    ]
+    results = [
+        line for line, text in texts if text in ('Результат', 'голосування')
+    ]
+    summaries = [
+        line for line, text in texts if text.startswith('ПІДСУМКИ')
+    ]
+    top = min(line.y0 for line in numbers + counters + names + results)
+    bottom = max(line.y1 for line in summaries) if summaries else layout.y0
+
+    # Границы колонок: начало таблицы, ФИО, результат, конец таблицы
+    tables = []
+    for i, number in enumerate(numbers):
+        start = number.x0 - COLUMN_MARGIN
+        if i + 1 < len(numbers):
+            end = numbers[i + 1].x0 - COLUMN_MARGIN
+        else:
+            end = layout.x1
+        header = [line for line in results if start <= line.x0 < end]
+        if not header:
+            return []
+        name_start = max(
+            line.x1 for line in numbers + counters if start <= line.x0 < end
+        )
+        result_start = min(line.x0 for line in header) - COLUMN_MARGIN
+        tables.append((start, name_start, result_start, end))
+
+    # Раскладываем символы по таблицам, строкам и колонкам
+    rows = [{} for _ in tables]
+    for line in lines:
+        if not bottom < line.y0 < top:
+            continue
+        for char in line:
+            if not isinstance(char, LTChar):
+                continue
+            center = (char.x0 + char.x1) / 2
+            for index, (start, name_start, result_start, end) in \
+                    enumerate(tables):
+                if not start <= center < end:
+                    continue
+                if center < name_start:
+                    column = 0
+                elif center < result_start:
+                    column = 1
+                else:
+                    column = 2
+                y = get_row_position(rows[index], char.y0)
+                rows[index].setdefault(y, ([], [], []))[column].append(char)
+                break
+
+    voices = []
+    for table in rows:
+        full_name = []
+        # Строки идут сверху вниз
+        for y in sorted(table, reverse=True):
+            name = get_cell_text(table[y][1])
+            vote_result = get_cell_text(table[y][2])
+
+            # Если не указано значение голосования - из-за длинного имени
+            # ячейка занимает несколько строк
+            if not vote_result:
+                if name:
+                    full_name.append(name)
+                continue
+
+            full_name.append(name)
+            voices.append((' '.join(full_name), vote_result))
+            full_name = []
+
+    return voices
+
+
+def get_row_position(rows: dict, y: float) -> float:
+    """
+    Символы одной строки таблицы могут немного отличаться по высоте,
+    поэтому ищем уже известную строку рядом с указанной координатой
+    """
+    for position in rows:
+        if abs(position - y) < ROW_MARGIN:
+            return position
+    return y
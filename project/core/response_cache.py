@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class ResponseCache:
+    """
+    Кеш готовых ответов API в памяти процесса с вытеснением давно
+    не использовавшихся ответов (LRU) при превышении размера в байтах
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        """
+        Получаем ответ по ключу, None - если ответа нет в кеше
+        """
+        with self.lock:
+            try:
+                entry = self.entries.pop(key)
+            except KeyError:
+                return None
+            # Последний использованный ответ перемещается в конец
+            self.entries[key] = entry
+            return entry[1]
+
+    def set(self, key, value, size: int):
+        """
+        Сохраняем ответ размером size байт
+        """
+        if size > self.max_size:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[0]
+            self.entries[key] = (size, value)
+            self.size += size
+
+            while self.size > self.max_size:
+                _, (old_size, _) = self.entries.popitem(last=False)
+                self.size -= old_size
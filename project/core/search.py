@@ -0,0 +1,83 @@
+from django.contrib.postgres.search import (
+    SearchVector, SearchQueryField, SearchRank, TrigramSimilarity
+)
+from django.db import connection
+from django.db.models import Q, QuerySet, FloatField, Func, Value
+from django.db.models.functions import Cast
+
+import re
+
+
+# Конфигурация полнотекстового поиска: в PostgreSQL нет словаря для
+# украинского языка, поэтому слова не приводятся к основе, а совпадают
+# по началу (см. PrefixSearchQuery)
+SEARCH_CONFIG = 'simple'
+
+# Установлено ли расширение pg_trgm (проверяется один раз на процесс)
+trigram_installed = None
+
+
+class PrefixSearchQuery(Func):
+    """
+    Поисковый запрос to_tsquery, в котором все слова должны совпадать по
+    началу: "бюджет" находит и "бюджету", и "бюджетної". Из слов
+    остаются только буквы и цифры, поэтому операторы tsquery в тексте
+    пользователя не действуют.
+    """
+    function = 'to_tsquery'
+    _output_field = SearchQueryField()
+
+    def __init__(self, words: list, config: str = SEARCH_CONFIG):
+        terms = [re.sub(r'\W+', '', word) for word in words]
+        query = ' & '.join("'{}':*".format(term) for term in terms if term)
+        super().__init__(
+            Func(Value(config), template='%(expressions)s::regconfig'),
+            Value(query)
+        )
+
+
+def has_trigram() -> bool:
+    """
+    Проверяем, установлено ли расширение pg_trgm
+    """
+    global trigram_installed
+    if trigram_installed is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            trigram_installed = cursor.fetchone() is not None
+    return trigram_installed
+
+
+def search_votes(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    Ищем голосования по названию: полнотекстовый поиск по индексу
+    to_tsvector названия и, если есть pg_trgm, поиск подстроки по
+    триграммному индексу. Результаты упорядочены по релевантности
+    (аннотация search_rank).
+    """
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return queryset.none()
+
+    vector = SearchVector('title', config=SEARCH_CONFIG)
+    query = PrefixSearchQuery(words)
+    # Релевантность приводится к double precision, чтобы значение из
+    # курсора постраничного вывода точно совпадало со значением в базе
+    queryset = queryset.annotate(
+        search=vector,
+        search_rank=Cast(SearchRank(vector, query), FloatField())
+    )
+    if not has_trigram():
+        return queryset.filter(search=query).order_by('-search_rank', 'pk')
+
+    # Подстрока внутри слова находится по триграммному индексу
+    # UPPER(title), который используется и для icontains
+    return queryset.annotate(
+        search_similarity=Cast(
+            TrigramSimilarity('title', text), FloatField()
+        )
+    ).filter(
+        Q(search=query) | Q(title__icontains=text)
+    ).order_by('-search_rank', '-search_similarity', 'pk')
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Council, Session, Vote, Deputy, Voice
+from .generation import dataset_changed, on_commit_once
+from .agreement import refresh_agreement, bump_agreement_version
+
+
+# Модели, изменение которых меняет данные API
+DATASET_MODELS = (Council, Session, Vote, Deputy, Voice)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def on_dataset_change(sender, **kwargs):
+    """
+    Увеличиваем поколение данных при изменении через ORM (пакетная
+    загрузка увеличивает его сама после пересчёта статистики)
+    """
+    if sender in DATASET_MODELS:
+        dataset_changed()
+
+
+@receiver(post_delete, sender=Vote)
+def on_vote_delete(sender, instance, **kwargs):
+    """
+    Пересчитываем статистику по депутатам для сессий удалённых
+    голосований (в том числе при удалении списком в административной
+    части) один раз после фиксации транзакции
+    """
+    on_commit_once(refresh_agreement, [instance.session_id])
+
+
+@receiver(post_save, sender=Deputy)
+@receiver(post_delete, sender=Deputy)
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=Council)
+@receiver(post_delete, sender=Council)
+def on_agreement_source_change(sender, **kwargs):
+    """
+    ФИО и список депутатов, даты сессий и id советов хранятся в
+    статистике в памяти процесса, поэтому при их изменении она
+    загружается заново
+    """
+    bump_agreement_version()
@@ -0,0 +1,68 @@
+from .loaders import VoteRecord
+
+from typing import Iterable, Iterator
+from datetime import datetime
+from collections import namedtuple
+import os
+import json
+import tempfile
+
+
+# Страница документа в промежуточном файле: имя и SHA-256 файла,
+# номер страницы, SHA-256 содержимого страницы, данные голосования
+# (VoteRecord или None, если на странице нет голосования) и ошибка
+# разбора (None, если страница разобрана)
+StagedPage = namedtuple(
+    'StagedPage',
+    ('file_name', 'file_hash', 'page', 'content_hash', 'vote', 'error')
+)
+
+
+def get_staging_file_path(staging_path: str, file_hash: str, page: int) -> str:
+    """
+    Получаем путь к промежуточному файлу части документа,
+    начинающейся с указанной страницы
+    """
+    return os.path.join(
+        staging_path, '{}.{:05d}.ndjson'.format(file_hash, page)
+    )
+
+
+def write_staging_file(path: str, pages: Iterable[StagedPage]):
+    """
+    Записываем страницы в промежуточный файл (NDJSON, страница на строку).
+    Файл появляется только после полной записи.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with open(fd, 'w', encoding='utf-8') as outfile:
+            for page in pages:
+                data = page._asdict()
+                if page.vote is not None:
+                    data['vote'] = page.vote._asdict()
+                    data['vote']['session_date'] = \
+                        page.vote.session_date.isoformat()
+                outfile.write(json.dumps(data, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def read_staging_file(path: str) -> Iterator[StagedPage]:
+    """
+    Последовательно читаем страницы из промежуточного файла
+    """
+    with open(path, encoding='utf-8') as infile:
+        for line in infile:
+            data = json.loads(line)
+            if data['vote'] is not None:
+                vote = data['vote']
+                vote['session_date'] = datetime.strptime(
+                    vote['session_date'], '%Y-%m-%d'
+                ).date()
+                vote['voices'] = [tuple(voice) for voice in vote['voices']]
+                data['vote'] = VoteRecord(**vote)
+            yield StagedPage(**data)
@@ -0,0 +1,146 @@
+from django.db.models import QuerySet, Count, Sum
+
+from .models import Vote, Voice
+from .utils import VOTE_RESULT_FIELDS, count_if
+
+from typing import Optional
+from datetime import date
+
+
+def get_percent(part: int, total: int) -> Optional[float]:
+    """
+    Процент от общего количества (None, если его нет)
+    """
+    if not total:
+        return None
+    return part * 100 / total
+
+
+def filter_votes(queryset: QuerySet, prefix: str = '',
+                 council: Optional[int] = None,
+                 session: Optional[int] = None,
+                 date_from: Optional[date] = None,
+                 date_to: Optional[date] = None) -> QuerySet:
+    """
+    Выборка голосований (или связанных с ними строк через prefix)
+    по городскому совету, сессии и периоду
+    """
+    if council is not None:
+        queryset = queryset.filter(**{prefix + 'council': council})
+    if session is not None:
+        queryset = queryset.filter(**{prefix + 'session': session})
+    if date_from is not None:
+        queryset = queryset.filter(
+            **{prefix + 'session__date__gte': date_from}
+        )
+    if date_to is not None:
+        queryset = queryset.filter(
+            **{prefix + 'session__date__lte': date_to}
+        )
+    return queryset
+
+
+def get_deputy_attendance(**filters) -> list:
+    """
+    Посещаемость и распределение голосов депутатов одним запросом с
+    группировкой голосов по депутатам. Посещаемость - процент
+    голосований, на которых депутат присутствовал.
+    """
+    rows = filter_votes(Voice.objects.all(), 'vote__', **filters).values(
+        'deputy_id', 'deputy__full_name'
+    ).annotate(
+        votes=Count('pk'),
+        **{
+            name: count_if('result', result)
+            for result, name in VOTE_RESULT_FIELDS
+        }
+    ).order_by('deputy__full_name')
+
+    return [
+        dict(
+            {
+                'deputy': row['deputy_id'],
+                'full_name': row['deputy__full_name'],
+                'votes': row['votes'],
+                'attendance': get_percent(
+                    row['votes'] - row['absent'], row['votes']
+                ),
+            },
+            **{name: row[name] for _, name in VOTE_RESULT_FIELDS}
+        )
+        for row in rows
+    ]
+
+
+def get_vote_totals(group_by: tuple, **filters) -> QuerySet:
+    """
+    Количество принятых и непринятых голосований и сумма голосов
+    депутатов с группировкой голосований по полям
+    """
+    return filter_votes(Vote.objects.all(), **filters).values(
+        *group_by
+    ).annotate(
+        votes=Count('pk'),
+        passed=count_if('result', 1),
+        failed=count_if('result', 2),
+        **{name: Sum(name) for _, name in VOTE_RESULT_FIELDS}
+    )
+
+
+def get_totals(row: dict) -> dict:
+    """
+    Итоги группы голосований
+    """
+    return dict(
+        {
+            'votes': row['votes'],
+            'passed': row['passed'],
+            'failed': row['failed'],
+            'pass_rate': get_percent(row['passed'], row['votes']),
+        },
+        **{name: row[name] for _, name in VOTE_RESULT_FIELDS}
+    )
+
+
+def get_session_summary(**filters) -> list:
+    """
+    Итоги голосований по сессиям одним запросом
+    """
+    rows = get_vote_totals(
+        ('session_id', 'session__title', 'session__date'), **filters
+    ).order_by('session__date', 'session_id')
+
+    return [
+        dict(
+            {
+                'session': row['session_id'],
+                'title': row['session__title'],
+                'date': row['session__date'],
+            },
+            **get_totals(row)
+        )
+        for row in rows
+    ]
+
+
+def get_council_summary(**filters) -> list:
+    """
+    Итоги голосований по городским советам одним запросом
+    """
+    rows = get_vote_totals(
+        ('council_id', 'council__title'), **filters
+    ).annotate(
+        sessions=Count('session', distinct=True)
+    ).order_by('council__title')
+
+    return [
+        dict(
+            {
+                'council': row['council_id'],
+                'title': row['council__title'],
+                'sessions': row['sessions'],
+            },
+            **get_totals(row)
+        )
+        for row in rows
+    ]
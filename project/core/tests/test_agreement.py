@@ -0,0 +1,355 @@
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from ..models import Council, Session, Deputy, Vote, Voice, Agreement
+from ..agreement import (
+    VoteMatrix, AgreementHistory, refresh_agreement, get_agreement_history
+)
+
+from datetime import date
+from unittest import mock
+
+
+class VoteMatrixTest(TestCase):
+    """
+    Тесты для матрицы голосов депутатов
+    """
+    def setUp(self):
+        council = Council.objects.create(title='Броварська міська рада')
+        session1 = Session.objects.create(
+            title='19 чергова сесія', date='2016-10-20'
+        )
+        session2 = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        # Голосования созданы не в порядке дат
+        self.votes = [
+            Vote.objects.create(council=council, session=session1),
+            Vote.objects.create(council=council, session=session2),
+            Vote.objects.create(council=council, session=session2),
+        ]
+        self.deputies = [
+            Deputy.objects.create(full_name='Іваненко Валерій Іванович'),
+            Deputy.objects.create(full_name='Веремчук Ірина Сергіївна'),
+            Deputy.objects.create(full_name='Батюк Сергій Іванович'),
+        ]
+
+    def add_voices(self, deputy: Deputy, results: list):
+        for vote, result in zip(self.votes, results):
+            if result is not None:
+                Voice.objects.create(deputy=deputy, vote=vote, result=result)
+
+    def test_from_db(self):
+        # Второй депутат пропустил первое голосование, поэтому его голоса
+        # нельзя сопоставлять с голосами первого депутата по порядку
+        self.add_voices(self.deputies[0], [1, 2, 1])
+        self.add_voices(self.deputies[1], [None, 2, 1])
+
+        with self.assertNumQueries(3):
+            matrix = VoteMatrix.from_db()
+
+        self.assertEqual(
+            list(matrix.vote_ids),
+            [self.votes[1].pk, self.votes[2].pk, self.votes[0].pk]
+        )
+        self.assertEqual(
+            matrix.results.tolist(), [[2, 1, 1], [2, 1, 0], [0, 0, 0]]
+        )
+        self.assertEqual(matrix.get_deputy_index(self.deputies[1].pk), 1)
+        with self.assertRaises(KeyError):
+            matrix.get_deputy_index(0)
+
+    def test_get_deputy_agreement(self):
+        # Не голосовал и отсутствовал - не учитываются в знаменателе
+        self.add_voices(self.deputies[0], [1, 1, 2])
+        self.add_voices(self.deputies[1], [1, 4, 1])
+        self.add_voices(self.deputies[2], [5, None, None])
+
+        matrix = VoteMatrix.from_db()
+        self.assertEqual(
+            matrix.get_deputy_agreement(
+                matrix.get_deputy_index(self.deputies[0].pk)
+            ),
+            {
+                self.deputies[1].full_name: 50.0,
+                self.deputies[2].full_name: 0.0,
+            }
+        )
+
+        matrix = VoteMatrix.from_db(
+            Vote.objects.filter(pk=self.votes[0].pk)
+        )
+        self.assertEqual(matrix.vote_ids.tolist(), [self.votes[0].pk])
+        self.assertEqual(
+            matrix.get_deputy_agreement(0)[self.deputies[1].full_name], 100.0
+        )
+
+    def get_deputy_agreement(self, deputy: Deputy, **filters) -> dict:
+        history = AgreementHistory.from_db()
+        return history.get_deputy_agreement(
+            history.get_deputy_index(deputy.pk), **filters
+        )
+
+    def test_refresh_agreement(self):
+        self.add_voices(self.deputies[0], [1, 1, 2])
+        self.add_voices(self.deputies[1], [1, 4, 2])
+        refresh_agreement()
+
+        self.assertEqual(
+            self.get_deputy_agreement(self.deputies[0]),
+            {
+                self.deputies[1].full_name: 100.0,
+                self.deputies[2].full_name: 0.0,
+            }
+        )
+        # Пары депутатов по сессиям, включая самого депутата
+        self.assertEqual(Agreement.objects.count(), 4 + 4)
+
+        # Пересчёт только одной сессии не затрагивает остальные
+        Voice.objects.filter(
+            deputy=self.deputies[1], vote=self.votes[2]
+        ).update(result=1)
+        other = Agreement.objects.filter(session=self.votes[0].session)\
+                                 .values_list('pk', flat=True)
+        refresh_agreement([self.votes[2].session_id])
+
+        self.assertEqual(
+            set(other),
+            set(Agreement.objects.filter(session=self.votes[0].session)
+                                 .values_list('pk', flat=True))
+        )
+        self.assertEqual(
+            self.get_deputy_agreement(self.deputies[0]),
+            {
+                self.deputies[1].full_name: 50.0,
+                self.deputies[2].full_name: 0.0,
+            }
+        )
+        self.assertEqual(
+            self.get_deputy_agreement(
+                self.deputies[0], session=self.votes[0].session_id
+            )[self.deputies[1].full_name],
+            100.0
+        )
+
+    def test_history(self):
+        # Сессии: 22.09.2016 (голосования 1 и 2), 20.10.2016 (голосование 0)
+        self.add_voices(self.deputies[0], [1, 1, 2])
+        self.add_voices(self.deputies[1], [1, 2, 2])
+        self.add_voices(self.deputies[2], [2, 1, 3])
+        refresh_agreement()
+
+        with self.assertNumQueries(3):
+            history = get_agreement_history()
+        # Статистика не пересчитывалась: только запрос версии
+        with self.assertNumQueries(1):
+            self.assertIs(get_agreement_history(), history)
+
+        self.assertEqual(
+            history.dates.tolist(), [date(2016, 9, 22), date(2016, 10, 20)]
+        )
+        index = history.get_deputy_index(self.deputies[0].pk)
+
+        same, both = history.get_sums(index)
+        self.assertEqual(
+            (same.tolist(), both.tolist()), ([3, 2, 1], [3, 3, 3])
+        )
+
+        for filters, expected in (
+                ({'date_to': date(2016, 9, 30)}, ([2, 1, 1], [2, 2, 2])),
+                ({'date_from': date(2016, 10, 20)}, ([1, 1, 0], [1, 1, 1])),
+                ({'date_from': date(2016, 10, 21)}, ([0, 0, 0], [0, 0, 0])),
+                ({'date_from': date(2016, 10, 1),
+                  'date_to': date(2016, 9, 1)}, ([0, 0, 0], [0, 0, 0])),
+                ({'session': self.votes[0].session_id},
+                 ([1, 1, 0], [1, 1, 1])),
+                ({'council': self.votes[0].council_id},
+                 ([3, 2, 1], [3, 3, 3])),
+                ({'council': 0}, ([0, 0, 0], [0, 0, 0])),
+        ):
+            same, both = history.get_sums(index, **filters)
+            self.assertEqual(
+                (same.tolist(), both.tolist()), expected, filters
+            )
+        # Давно не использовавшиеся накопленные суммы вытесняются
+        history.cumulative.max_size = history.cumulative.size
+        history.get_sums(index, session=self.votes[1].session_id)
+        self.assertLessEqual(
+            history.cumulative.size, history.cumulative.max_size
+        )
+        self.assertNotIn((None, None), history.cumulative.entries)
+        same, both = history.get_sums(index)
+        self.assertEqual(
+            (same.tolist(), both.tolist()), ([3, 2, 1], [3, 3, 3])
+        )
+
+        # Пересчёт статистики загружает её заново
+        Voice.objects.filter(deputy=self.deputies[2]).delete()
+        refresh_agreement()
+        history = get_agreement_history()
+        same, both = history.get_sums(index)
+        self.assertEqual(
+            (same.tolist(), both.tolist()), ([3, 2, 0], [3, 3, 0])
+        )
+
+        # Изменение ФИО депутата тоже загружает статистику заново
+        self.deputies[1].full_name = 'Веремчук Ірина'
+        self.deputies[1].save()
+        history = get_agreement_history()
+        self.assertIn('Веремчук Ірина', history.full_names)
+
+        # Как и изменение даты сессии
+        session = self.votes[0].session
+        session.date = date(2016, 11, 17)
+        session.save()
+        history = get_agreement_history()
+        same, both = history.get_sums(index, date_from=date(2016, 11, 1))
+        self.assertEqual(
+            (same.tolist(), both.tolist()), ([1, 1, 0], [1, 1, 0])
+        )
+
+    def test_get_trend(self):
+        session = Session.objects.create(
+            title='20 чергова сесія', date='2016-12-22'
+        )
+        self.votes.append(Vote.objects.create(
+            council=self.votes[0].council, session=session
+        ))
+        self.add_voices(self.deputies[0], [1, 1, 2, 1])
+        self.add_voices(self.deputies[1], [2, 1, 2, None])
+        refresh_agreement()
+
+        history = AgreementHistory.from_db()
+        first, second = [
+            history.get_deputy_index(deputy.pk)
+            for deputy in self.deputies[:2]
+        ]
+        trend = history.get_trend(first, second, 30)
+        self.assertEqual(
+            [(row['date'], row['both'], row['same']) for row in trend],
+            [
+                (date(2016, 9, 22), 2, 2),
+                (date(2016, 10, 20), 1, 0),
+                (date(2016, 12, 22), 0, 0),
+            ]
+        )
+        self.assertEqual(
+            [row['agreement'] for row in trend], [100.0, 0.0, None]
+        )
+        # Окно 30 дней захватывает предыдущую сессию только для 20.10.2016
+        self.assertEqual(
+            [row['window_agreement'] for row in trend],
+            [100.0, 200 / 3, None]
+        )
+
+        trend = history.get_trend(
+            first, second, 30, date_from=date(2016, 10, 1)
+        )
+        self.assertEqual(
+            [row['session'] for row in trend],
+            [self.votes[0].session_id, session.pk]
+        )
+        self.assertEqual(trend[0]['window_agreement'], 0.0)
+        self.assertEqual(
+            history.get_trend(first, second, 30, date_to=date(2016, 1, 1)),
+            []
+        )
+
+
+class AgreementMatrixTest(TestCase):
+    """
+    Тесты для попарной статистики депутатов
+    """
+    def setUp(self):
+        council = Council.objects.create(title='Броварська міська рада')
+        session = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        votes = [
+            Vote.objects.create(council=council, session=session)
+            for _ in range(4)
+        ]
+        # Два блока депутатов, последний депутат не голосовал
+        results = [
+            [1, 1, 2, 1],
+            [1, 1, 2, 2],
+            [2, 2, 1, 2],
+            [2, 2, 1, 1],
+            [5, 5, 5, 5],
+        ]
+        self.deputies = []
+        for number, deputy_results in enumerate(results):
+            deputy = Deputy.objects.create(
+                full_name='Депутат {}'.format(number)
+            )
+            self.deputies.append(deputy)
+            for vote, result in zip(votes, deputy_results):
+                Voice.objects.create(deputy=deputy, vote=vote, result=result)
+        refresh_agreement()
+
+    def test_get_top(self):
+        matrix = AgreementHistory.from_db().get_matrix()
+        most, least = matrix.get_top(
+            matrix.get_deputy_index(self.deputies[0].pk), 2
+        )
+        self.assertEqual(most, [('Депутат 1', 75.0), ('Депутат 3', 25.0)])
+        self.assertEqual(least, [('Депутат 2', 0.0), ('Депутат 3', 25.0)])
+
+    def test_get_blocs(self):
+        matrix = AgreementHistory.from_db().get_matrix()
+        self.assertEqual(
+            matrix.get_blocs(),
+            [['Депутат 0'], ['Депутат 1'], ['Депутат 2'], ['Депутат 3']]
+        )
+        self.assertEqual(
+            matrix.get_blocs(70),
+            [['Депутат 0', 'Депутат 1'], ['Депутат 2', 'Депутат 3']]
+        )
+        self.assertEqual(
+            matrix.get_blocs(0),
+            [['Депутат 0', 'Депутат 1', 'Депутат 2', 'Депутат 3']]
+        )
+
+
+class RefreshOnDeleteTest(TransactionTestCase):
+    """
+    Тесты для пересчёта статистики по депутатам при удалении голосований
+    """
+    def test_delete_votes(self):
+        council = Council.objects.create(title='Броварська міська рада')
+        session = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        votes = [
+            Vote.objects.create(council=council, session=session)
+            for _ in range(3)
+        ]
+        deputies = [
+            Deputy.objects.create(full_name='Іваненко Валерій Іванович'),
+            Deputy.objects.create(full_name='Веремчук Ірина Сергіївна'),
+        ]
+        for vote in votes:
+            for deputy in deputies:
+                Voice.objects.create(deputy=deputy, vote=vote, result=1)
+        refresh_agreement()
+        self.assertEqual(
+            set(Agreement.objects.values_list('both', flat=True)), {3}
+        )
+
+        # Удаление списком, как действием административной части:
+        # статистика пересчитывается один раз после фиксации транзакции
+        with mock.patch(
+                'core.signals.refresh_agreement', wraps=refresh_agreement
+        ) as refresh:
+            with transaction.atomic():
+                Vote.objects.filter(
+                    pk__in=[votes[0].pk, votes[1].pk]
+                ).delete()
+                refresh.assert_not_called()
+        refresh.assert_called_once_with({session.pk})
+        self.assertEqual(
+            set(Agreement.objects.values_list('both', flat=True)), {1}
+        )
+
+        votes[2].delete()
+        self.assertFalse(Agreement.objects.exists())
@@ -1,8 +1,13 @@
+from django.test import override_settings
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 
 from ..models import Council, Session, Deputy, Vote, Voice
+from ..agreement import refresh_agreement
+
+from urllib.parse import urlencode
+import json
 
 
 class TestListMixin:
@@ -12,10 +17,12 @@ class TestListMixin:
     def test_list(self):
         response = self.client.get(self.url_list)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), self.list_response_count)
-        self.assertEqual(
-            tuple(next(iter(response.data)).keys()), self.list_fields
-        )
+        results = response.data
+        if 'results' in results:
+            # Постраничный вывод
+            results = results['results']
+        self.assertEqual(len(results), self.list_response_count)
+        self.assertEqual(tuple(next(iter(results)).keys()), self.list_fields)
 
 
 class CouncilViewSetTest(TestListMixin, APITestCase):
@@ -94,6 +101,133 @@ class VoteViewSetTest(TestListMixin, APITestCase):
         voices_keys = tuple(next(iter(response.data['voices'])).keys())
         self.assertEqual(voices_keys, voices_fields)
         self.assertEqual(len(response.data['voices']), 2)
+        self.assertEqual(response.data['voices'][0], {
+            'result_display': 'За',
+            'deputy_display': self.deputy1.full_name
+        })
+
+    def test_retrieve_queries(self):
+        deputy = Deputy.objects.create(full_name='Батюк Сергій Іванович')
+        Voice.objects.create(deputy=deputy, vote=self.vote, result=5)
+
+        # Голосование и голоса с ФИО депутатов
+        url = reverse('vote-detail', args=[self.vote.pk])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['voices']), 3)
+        self.assertEqual(
+            response.data['voices'][2]['result_display'], 'Відсутній'
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'voices': 'compact'})
+        self.assertEqual(response.data['voices'], {
+            'deputies': [self.deputy1.pk, self.deputy2.pk, deputy.pk],
+            'results': [1, 1, 5],
+        })
+
+    def test_list_cursor(self):
+        council = self.vote.council
+        session = Session.objects.create(
+            title='17 чергова сесія', date='2016-08-04'
+        )
+        votes = [
+            Vote.objects.create(council=council, session=session)
+            for _ in range(2)
+        ]
+        votes.append(self.vote)
+
+        pks = []
+        url = '{}?page_size=2&fields=id,title'.format(self.url_list)
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pks += [row['id'] for row in response.data['results']]
+            self.assertEqual(
+                set(response.data['results'][0].keys()), {'id', 'title'}
+            )
+            url = response.data['next']
+        # Голосования упорядочены по дате сессии и id
+        self.assertEqual(pks, [vote.pk for vote in votes])
+
+        response = self.client.get(self.url_list, {'page_size': 2})
+        self.assertEqual(
+            [row['url'].rsplit('/', 2)[-2] for row in
+             response.data['results']],
+            [str(vote.pk) for vote in votes[:2]]
+        )
+
+        # Перенос сессии меняет порядок её голосований
+        session.date = '2016-10-04'
+        session.save()
+        response = self.client.get(self.url_list, {'fields': 'id'})
+        self.assertEqual(
+            [row['id'] for row in response.data['results']],
+            [vote.pk for vote in votes[2:] + votes[:2]]
+        )
+
+        response = self.client.get(self.url_list, {'fields': 'id,voices'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'Неизвестное поле voices')
+
+        response = self.client.get(self.url_list, {'cursor': 'test'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'Неверный курсор')
+
+    def test_list_search(self):
+        Vote.objects.create(
+            council=self.vote.council, session=self.vote.session,
+            title='Про затвердження порядку денного'
+        )
+        response = self.client.get(
+            self.url_list, {'search': 'порядок', 'fields': 'title'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+        response = self.client.get(
+            self.url_list, {'search': 'порядку', 'fields': 'title'}
+        )
+        self.assertEqual(response.data['results'], [
+            {'title': 'Про затвердження порядку денного'}
+        ])
+        self.assertIsNone(response.data['next'])
+
+    def test_list_search_cursor(self):
+        # Более релевантное голосование первое, при равной
+        # релевантности - по id
+        titles = (
+            'Про бюджет міста',
+            'Про бюджет, зміни до бюджету та виконання бюджету',
+            'Про бюджет міста',
+        )
+        votes = [
+            Vote.objects.create(
+                council=self.vote.council, session=self.vote.session,
+                title=title
+            )
+            for title in titles
+        ]
+        expected = [votes[1].pk, votes[0].pk, votes[2].pk]
+
+        for fields in ('id', None):
+            params = {'search': 'бюджет', 'page_size': 1}
+            if fields:
+                params['fields'] = fields
+            pks = []
+            url = '{}?{}'.format(self.url_list, urlencode(params))
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), 1)
+                row = response.data['results'][0]
+                pks.append(
+                    row['id'] if fields else
+                    int(row['url'].rsplit('/', 2)[-2])
+                )
+                url = response.data['next']
+            self.assertEqual(pks, expected)
 
 
 class StatisticByDeputyViewSetTest(APITestCase):
@@ -116,6 +250,7 @@ class StatisticByDeputyViewSetTest(APITestCase):
 
         Voice.objects.create(deputy=deputy1, vote=vote, result=1)
         Voice.objects.create(deputy=deputy2, vote=vote, result=1)
+        refresh_agreement()
 
     def test_list(self):
         response = self.client.get(self.url_list)
@@ -150,3 +285,309 @@ class StatisticByDeputyViewSetTest(APITestCase):
             '{}?q={}&date=22-09-2016'.format(self.url_list, self.deputy_name1)
         )
         self.assertEqual(response.data, {self.deputy_name2: 100.0})
+
+    @override_settings(API_CACHE_SIZE=0)
+    def test_list_queries(self):
+        # Количество запросов не зависит от количества депутатов
+        vote = Vote.objects.get()
+        for number in range(5):
+            deputy = Deputy.objects.create(
+                full_name='Депутат {}'.format(number)
+            )
+            Voice.objects.create(deputy=deputy, vote=vote, result=2)
+        refresh_agreement()
+        self.client.get('{}?q={}'.format(self.url_list, self.deputy_name1))
+
+        # ФИО депутата и версия загруженной процессом статистики
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                '{}?q={}'.format(self.url_list, self.deputy_name1)
+            )
+        self.assertEqual(response.data['Депутат 0'], 0.0)
+        self.assertEqual(response.data[self.deputy_name2], 100.0)
+
+    def test_list_filters(self):
+        session = Session.objects.create(
+            title='19 чергова сесія', date='2016-10-20'
+        )
+        vote = Vote.objects.create(
+            council=Council.objects.get(), session=session
+        )
+        Voice.objects.create(
+            deputy=Deputy.objects.get(full_name=self.deputy_name1),
+            vote=vote, result=1
+        )
+        Voice.objects.create(
+            deputy=Deputy.objects.get(full_name=self.deputy_name2),
+            vote=vote, result=2
+        )
+        refresh_agreement()
+
+        for params, expected in (
+                ({}, 50.0),
+                ({'date_from': '01-10-2016'}, 0.0),
+                ({'date_to': '01-10-2016'}, 100.0),
+                ({'date_from': '22-09-2016', 'date_to': '20-10-2016'}, 50.0),
+                ({'date_from': '01-10-2016', 'date': '22-09-2016'}, 0.0),
+                ({'session': session.pk}, 0.0),
+                ({'council': vote.council_id}, 50.0),
+        ):
+            params['q'] = self.deputy_name1
+            response = self.client.get(self.url_list, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                response.data, {self.deputy_name2: expected}, params
+            )
+
+    def test_list_batch(self):
+        deputy3 = Deputy.objects.create(full_name='Батюк Сергій Іванович')
+        Voice.objects.create(deputy=deputy3, vote=Vote.objects.get(), result=2)
+        refresh_agreement()
+
+        response = self.client.get(
+            self.url_list, {'q': [self.deputy_name2, self.deputy_name1]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            self.deputy_name2: {
+                self.deputy_name1: 100.0, deputy3.full_name: 0.0
+            },
+            self.deputy_name1: {
+                self.deputy_name2: 100.0, deputy3.full_name: 0.0
+            },
+        })
+
+        # Количество запросов не зависит от количества депутатов
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url_list, {'q': 'all'})
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(
+            response.data[deputy3.full_name],
+            {self.deputy_name1: 0.0, self.deputy_name2: 0.0}
+        )
+
+        response = self.client.get(
+            self.url_list, {'q': [self.deputy_name1, 'Test']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'Депутат Test не найден')
+
+
+class TestAgreementMixin:
+    """
+    Mixin класс с голосами трёх депутатов в двух сессиях для тестов
+    статистики по депутатам
+    """
+    deputy_name1 = StatisticByDeputyViewSetTest.deputy_name1
+    deputy_name2 = StatisticByDeputyViewSetTest.deputy_name2
+    deputy_name3 = 'Батюк Сергій Іванович'
+
+    def setUp(self):
+        self.council = Council.objects.create(title='Броварська міська рада')
+        session1 = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        session2 = Session.objects.create(
+            title='19 чергова сесія', date='2016-10-20'
+        )
+        vote1 = Vote.objects.create(council=self.council, session=session1)
+        vote2 = Vote.objects.create(council=self.council, session=session2)
+
+        deputy1 = Deputy.objects.create(full_name=self.deputy_name1)
+        deputy2 = Deputy.objects.create(full_name=self.deputy_name2)
+        deputy3 = Deputy.objects.create(full_name=self.deputy_name3)
+
+        Voice.objects.create(deputy=deputy1, vote=vote1, result=1)
+        Voice.objects.create(deputy=deputy2, vote=vote1, result=1)
+        Voice.objects.create(deputy=deputy3, vote=vote1, result=2)
+        Voice.objects.create(deputy=deputy1, vote=vote2, result=1)
+        Voice.objects.create(deputy=deputy2, vote=vote2, result=2)
+        Voice.objects.create(deputy=deputy3, vote=vote2, result=2)
+        refresh_agreement()
+
+
+class DeputySimilarityViewSetTest(TestAgreementMixin, APITestCase):
+    """
+    Тестирование представления DeputySimilarityViewSet
+    """
+    url_list = reverse('statistic-similarity-list')
+
+    def test_list(self):
+        response = self.client.get(
+            self.url_list, {'q': self.deputy_name1, 'k': 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['most_aligned'], [
+            {'full_name': self.deputy_name2, 'agreement': 50.0}
+        ])
+        self.assertEqual(response.data['least_aligned'], [
+            {'full_name': self.deputy_name3, 'agreement': 0.0}
+        ])
+        self.assertEqual(response.data['blocs'], [
+            [self.deputy_name1], [self.deputy_name2], [self.deputy_name3]
+        ])
+
+        # Только первая сессия
+        response = self.client.get(self.url_list, {
+            'council': self.council.pk, 'date_to': '30-09-2016'
+        })
+        self.assertNotIn('most_aligned', response.data)
+        self.assertEqual(response.data['blocs'], [
+            [self.deputy_name1, self.deputy_name2], [self.deputy_name3]
+        ])
+
+    def test_list_errors(self):
+        response = self.client.get(self.url_list, {'q': 'Test'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'Депутат Test не найден')
+
+        response = self.client.get(self.url_list, {'date_from': 'd'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['detail'], 'Формат даты не соответствует dd-mm-YYYY'
+        )
+
+        response = self.client.get(self.url_list, {'k': 'k'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['detail'], 'Параметр "k" должен быть числом'
+        )
+
+        for k in ('0', '-1'):
+            response = self.client.get(self.url_list, {'k': k})
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+        for threshold in ('nan', 'inf', '-1', '101'):
+            response = self.client.get(
+                self.url_list, {'threshold': threshold}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+            self.assertEqual(
+                response.data['detail'],
+                'Параметр "threshold" должен быть от 0 до 100'
+            )
+
+
+class AgreementTrendViewSetTest(TestAgreementMixin, APITestCase):
+    """
+    Тестирование представления AgreementTrendViewSet
+    """
+    url_list = reverse('statistic-trend-list')
+
+    def test_list(self):
+        response = self.client.get(self.url_list, {'q': self.deputy_name1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['detail'],
+            'Необходимо указать GET параметры "q" и "other" с ФИО депутатов'
+        )
+
+        response = self.client.get(
+            self.url_list, {'q': self.deputy_name1, 'other': 'Test'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'Депутат Test не найден')
+
+        response = self.client.get(self.url_list, {
+            'q': self.deputy_name1, 'other': self.deputy_name2, 'window': 365
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['agreement'] for row in response.data], [100.0, 0.0]
+        )
+        self.assertEqual(
+            [row['window_agreement'] for row in response.data], [100.0, 50.0]
+        )
+
+
+class ExportViewSetTest(APITestCase):
+    """
+    Тестирование представления ExportViewSet
+    """
+    url_list = reverse('export-list')
+
+    def setUp(self):
+        council = Council.objects.create(title='Броварська міська рада')
+        session = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        vote = Vote.objects.create(
+            council=council, session=session, title='Порядок денний'
+        )
+        deputy = Deputy.objects.create(full_name='Іваненко Валерій Іванович')
+        Voice.objects.create(vote=vote, deputy=deputy, result=1)
+
+    def test_list(self):
+        response = self.client.get(self.url_list)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="votes.csv"'
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('Броварська міська рада'))
+
+    def test_ndjson(self):
+        response = self.client.get(self.url_list, {'type': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(
+            json.loads(lines[0])['deputy'], 'Іваненко Валерій Іванович'
+        )
+
+    def test_filters(self):
+        response = self.client.get(
+            self.url_list, {'type': 'ndjson', 'date_from': '23-09-2016'}
+        )
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+        response = self.client.get(self.url_list, {'type': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url_list, {'date_to': '2016-09-22'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SummaryViewSetsTest(APITestCase):
+    """
+    Тестирование представлений DeputyAttendanceViewSet,
+    SessionSummaryViewSet и CouncilSummaryViewSet
+    """
+    def setUp(self):
+        self.council = Council.objects.create(title='Броварська міська рада')
+        session = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        vote = Vote.objects.create(
+            council=self.council, session=session, result=1, agree=1
+        )
+        deputy = Deputy.objects.create(full_name='Іваненко Валерій Іванович')
+        Voice.objects.create(deputy=deputy, vote=vote, result=1)
+
+    @override_settings(API_CACHE_SIZE=0)
+    def test_list(self):
+        for name, key in (('statistic-attendance', 'attendance'),
+                          ('statistic-session', 'pass_rate'),
+                          ('statistic-council', 'pass_rate')):
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('{}-list'.format(name)))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data), 1)
+            self.assertEqual(response.data[0][key], 100.0)
+
+            response = self.client.get(
+                reverse('{}-list'.format(name)), {'date_from': '23-09-2016'}
+            )
+            self.assertEqual(response.data, [])
+
+            response = self.client.get(
+                reverse('{}-list'.format(name)), {'council': 'c'}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
@@ -0,0 +1,350 @@
+from django.conf import settings
+from django.core.management import call_command, CommandError
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, \
+    override_settings
+
+from ..models import Vote, ParsedPage
+from ..loaders import VoteLoader
+from ..pdf import PARSER_VERSION, get_file_hash, get_pdf_page_hashes
+from ..staging import get_staging_file_path, read_staging_file
+from ..metrics import StageMetrics
+from ..management.commands.parse_pdf import Command
+
+from unittest import mock
+from io import StringIO
+import os
+import json
+import shutil
+import tempfile
+
+
+class ParsePdfManifestTest(TestCase):
+    """
+    Тесты для пропуска уже разобранных страниц в parse_pdf
+    """
+    file_path = os.path.join(
+        settings.PDF_FILES_PATH,
+        'Результат поіменного голосування_11.11.2016.pdf'
+    )
+
+    def setUp(self):
+        self.command = Command()
+        self.file_hash = get_file_hash(self.file_path)
+        with open(self.file_path, 'rb') as infile:
+            self.page_hashes = dict(enumerate(get_pdf_page_hashes(infile)))
+
+    def get_pending_pages(self) -> dict:
+        with open(self.file_path, 'rb') as infile:
+            return self.command.get_pending_pages(
+                self.file_path, self.file_hash, infile, len(self.page_hashes)
+            )
+
+    def test_new_file(self):
+        self.assertEqual(self.get_pending_pages(), self.page_hashes)
+        self.assertFalse(ParsedPage.objects.exists())
+
+    def test_parsed_file(self):
+        self.command.save_parsed_pages(
+            self.file_path, self.file_hash, self.page_hashes
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_pending_pages(), {})
+
+        self.command.force = True
+        self.assertEqual(self.get_pending_pages(), self.page_hashes)
+
+    def test_changed_file(self):
+        # Другая версия файла, в которой изменилась первая страница
+        self.file_hash = 'a' * 64
+        self.command.save_parsed_pages(
+            self.file_path, 'b' * 64,
+            {page: content_hash
+             for page, content_hash in self.page_hashes.items() if page}
+        )
+
+        self.assertEqual(self.get_pending_pages(), {0: self.page_hashes[0]})
+        # Неизменившиеся страницы записаны для новой версии файла
+        self.assertEqual(
+            ParsedPage.objects.filter(file_hash=self.file_hash).count(),
+            len(self.page_hashes) - 1
+        )
+
+    def test_parser_version(self):
+        ParsedPage.objects.bulk_create(
+            ParsedPage(
+                file_name=os.path.basename(self.file_path),
+                file_hash=self.file_hash,
+                page=page,
+                content_hash=content_hash,
+                parser_version=PARSER_VERSION - 1
+            )
+            for page, content_hash in self.page_hashes.items()
+        )
+        self.assertEqual(self.get_pending_pages(), self.page_hashes)
+
+
+class ParsePdfCacheTest(SimpleTestCase):
+    """
+    Тесты для чтения страниц через кеш в parse_pdf
+    """
+    file_path = ParsePdfManifestTest.file_path
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.command = Command()
+        self.command.tables = 'layout'
+        self.file_hash = get_file_hash(self.file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def iter_pages_data(self, infile) -> list:
+        with override_settings(PDF_CACHE_PATH=self.path):
+            return list(self.command.iter_pages_data(
+                self.file_path, self.file_hash, infile, [0, 2], None
+            ))
+
+    def test_iter_pages_data(self):
+        with open(self.file_path, 'rb') as infile:
+            pages = self.iter_pages_data(infile)
+        self.assertEqual(
+            [page for page, text, voices, error in pages], [0, 2]
+        )
+        for page, text, voices, error in pages:
+            self.assertIn(self.command.vote_header, text)
+            self.assertTrue(voices)
+            self.assertIsNone(error)
+
+        # Страницы берутся из кеша, pdf файл не читается
+        self.assertEqual(self.iter_pages_data(None), pages)
+
+
+class ParsePdfStagingTest(TestCase):
+    """
+    Тесты для извлечения в промежуточные файлы и их загрузки в parse_pdf
+    """
+    file_path = ParsePdfManifestTest.file_path
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.command = Command(stderr=StringIO())
+        self.command.tables = 'layout'
+        self.command.use_cache = False
+        self.command.staging_path = self.path
+        self.command.pdf_files = [self.file_path]
+        self.command.loaded_sessions = set()
+        self.file_hash = get_file_hash(self.file_path)
+        with open(self.file_path, 'rb') as infile:
+            self.page_hashes = dict(enumerate(get_pdf_page_hashes(infile)))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_extract_load(self):
+        metrics = StageMetrics()
+        with self.assertNumQueries(0):
+            staging_file_path = self.command.extract_pages(
+                self.file_path, self.file_hash, self.page_hashes, metrics
+            )
+        self.assertEqual(
+            staging_file_path,
+            get_staging_file_path(self.path, self.file_hash, 0)
+        )
+
+        pages = list(read_staging_file(staging_file_path))
+        self.assertEqual(
+            [page.page for page in pages], sorted(self.page_hashes)
+        )
+        for page in pages:
+            self.assertEqual(page.vote.council, 'Броварська міська рада')
+
+        # Замеры этапов извлечения части документа
+        self.assertEqual(metrics.counters['pages'], len(pages))
+        self.assertEqual(metrics.counters['votes'], len(pages))
+        self.assertEqual(metrics.counters['errors'], 0)
+        for stage in ('text', 'tables', 'parse', 'staging'):
+            self.assertGreater(metrics.seconds[stage], 0)
+        self.assertEqual(metrics.seconds['load'], 0)
+
+        with VoteLoader() as loader:
+            self.command.load_staging_file(staging_file_path, loader)
+
+        self.assertEqual(Vote.objects.count(), len(pages))
+        self.assertEqual(
+            dict(ParsedPage.objects.values_list('page', 'content_hash')),
+            self.page_hashes
+        )
+        # Сессии, для которых нужно пересчитать статистику по депутатам
+        self.assertEqual(
+            self.command.loaded_sessions, {page.vote.session for page in pages}
+        )
+
+    def test_quarantine(self):
+        get_vote_record = self.command.get_vote_record
+
+        def broken_get_vote_record(text, voices):
+            if 'Про затвердження порядку денного' in text:
+                raise AssertionError
+            return get_vote_record(text, voices)
+
+        with mock.patch.object(
+                self.command, 'get_vote_record', broken_get_vote_record
+        ):
+            staging_file_path = self.command.extract_pages(
+                self.file_path, self.file_hash, self.page_hashes
+            )
+
+        pages = list(read_staging_file(staging_file_path))
+        quarantined = [page.page for page in pages if page.error]
+        self.assertTrue(quarantined)
+        self.assertLess(len(quarantined), len(pages))
+
+        with VoteLoader() as loader:
+            self.command.load_staging_file(staging_file_path, loader)
+
+        # Остальные страницы загружены, страницы с ошибкой в карантине
+        self.assertEqual(
+            Vote.objects.count(), len(pages) - len(quarantined)
+        )
+        self.assertEqual(
+            list(ParsedPage.objects.exclude(error='')
+                                   .order_by('page')
+                                   .values_list('page', flat=True)),
+            quarantined
+        )
+        self.assertIn('AssertionError', self.command.stderr._out.getvalue())
+
+        # Карантин пропускается, если не указано обратное
+        with open(self.file_path, 'rb') as infile:
+            self.assertEqual(self.command.get_pending_pages(
+                self.file_path, self.file_hash, infile, len(self.page_hashes)
+            ), {})
+            self.command.retry_quarantined = True
+            self.assertEqual(
+                sorted(self.command.get_pending_pages(
+                    self.file_path, self.file_hash, infile,
+                    len(self.page_hashes)
+                )),
+                quarantined
+            )
+
+    def test_load_rollback(self):
+        staging_file_path = self.command.extract_pages(
+            self.file_path, self.file_hash, self.page_hashes
+        )
+
+        loader = VoteLoader()
+        with mock.patch.object(loader, 'flush', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.command.load_staging_file(staging_file_path, loader)
+
+        # Данные и манифест части документа откатываются вместе
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(ParsedPage.objects.exists())
+
+    def test_load_stage(self):
+        self.command.extract_pages(
+            self.file_path, self.file_hash, self.page_hashes
+        )
+
+        metrics_file = os.path.join(self.path, 'metrics.json')
+        call_command(
+            'parse_pdf', stage='load', staging_path=self.path,
+            metrics_file=metrics_file, stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertEqual(Vote.objects.count(), len(self.page_hashes))
+        self.assertEqual(ParsedPage.objects.count(), len(self.page_hashes))
+
+        # Сводка замеров запуска
+        with open(metrics_file, encoding='utf-8') as infile:
+            summary = json.load(infile)
+        self.assertEqual(summary['options']['stage'], 'load')
+        self.assertEqual(
+            summary['total']['loaded_votes'], len(self.page_hashes)
+        )
+        self.assertGreater(summary['total']['seconds']['load'], 0)
+        self.assertEqual(
+            list(summary['documents']), [os.path.basename(self.file_path)]
+        )
+        self.assertEqual(summary['workers'], {})
+
+    def test_metrics_write_error(self):
+        self.command.extract_pages(
+            self.file_path, self.file_hash, self.page_hashes
+        )
+
+        # Каталог для сводки создать нельзя
+        path = os.path.join(self.path, 'metrics')
+        open(path, 'w').close()
+        stderr = StringIO()
+        with mock.patch(
+            'core.management.commands.parse_pdf.refresh_agreement'
+        ) as refresh:
+            call_command(
+                'parse_pdf', stage='load', staging_path=self.path,
+                metrics_file=os.path.join(path, 'metrics.json'),
+                stdout=StringIO(), stderr=stderr
+            )
+        # Статистика по депутатам пересчитана, ошибка записана
+        refresh.assert_called_once_with(mock.ANY)
+        self.assertEqual(Vote.objects.count(), len(self.page_hashes))
+        self.assertIn('Ошибка записи сводки', stderr.getvalue())
+
+    def test_invalid_options(self):
+        for name in ('workers', 'shard_size'):
+            with self.assertRaisesMessage(CommandError, 'больше 0'):
+                call_command(
+                    'parse_pdf', staging_path=self.path, stdout=StringIO(),
+                    **{name: 0}
+                )
+
+
+class ParsePdfCommandTest(TransactionTestCase):
+    """
+    Тесты для полного запуска parse_pdf через пул процессов
+    """
+    file_path = ParsePdfManifestTest.file_path
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        pdf_path = os.path.join(self.path, 'pdf')
+        os.mkdir(pdf_path)
+        shutil.copy(self.file_path, pdf_path)
+        settings = override_settings(PDF_FILES_PATH=pdf_path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        with open(self.file_path, 'rb') as infile:
+            self.pages_count = len(get_pdf_page_hashes(infile))
+
+    def call_command(self) -> str:
+        stdout = StringIO()
+        call_command(
+            'parse_pdf', tables='layout', workers=2, shard_size=2,
+            use_cache=False,
+            staging_path=os.path.join(self.path, 'staging'),
+            metrics_file=os.path.join(self.path, 'metrics.json'),
+            stdout=stdout, stderr=StringIO()
+        )
+        return stdout.getvalue()
+
+    def test_workers(self):
+        self.assertIn('Файлов без изменений: 0 из 1', self.call_command())
+        self.assertEqual(Vote.objects.count(), self.pages_count)
+        self.assertEqual(ParsedPage.objects.count(), self.pages_count)
+        # Промежуточные файлы частей удалены после загрузки
+        self.assertEqual(os.listdir(os.path.join(self.path, 'staging')), [])
+
+        with open(os.path.join(self.path, 'metrics.json')) as infile:
+            summary = json.load(infile)
+        document = summary['documents'][os.path.basename(self.file_path)]
+        self.assertEqual(document['pages'], self.pages_count)
+        self.assertEqual(document['loaded_votes'], self.pages_count)
+        self.assertEqual(
+            sum(worker['pages'] for worker in summary['workers'].values()),
+            self.pages_count
+        )
+
+        # Повторный запуск в том же процессе пропускает разобранный файл
+        self.assertIn('Файлов без изменений: 1 из 1', self.call_command())
+        self.assertEqual(Vote.objects.count(), self.pages_count)
@@ -0,0 +1,139 @@
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Council, Session, Deputy, Vote, Voice
+from ..export import get_export_rows, iter_csv, iter_ndjson
+
+from datetime import date
+from io import StringIO
+import json
+import os
+import tempfile
+from unittest import skipUnless
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class ExportTest(TestCase):
+    """
+    Тесты для выгрузки голосов депутатов
+    """
+    def setUp(self):
+        council = Council.objects.create(title='Броварська міська рада')
+        other_council = Council.objects.create(title='Інша міська рада')
+        session1 = Session.objects.create(
+            title='18 чергова сесія', date=date(2016, 9, 22)
+        )
+        session2 = Session.objects.create(
+            title='19 чергова сесія', date=date(2016, 10, 20)
+        )
+        self.deputy1 = Deputy.objects.create(
+            full_name='Іваненко Валерій Іванович'
+        )
+        self.deputy2 = Deputy.objects.create(
+            full_name='Веремчук Ірина Сергіївна'
+        )
+        self.vote1 = Vote.objects.create(
+            council=council, session=session2, title='Друге', result=1
+        )
+        self.vote2 = Vote.objects.create(
+            council=council, session=session1, title='Перше, "з комою"',
+            result=2
+        )
+        self.vote3 = Vote.objects.create(
+            council=other_council, session=session1, title='Інше', result=1
+        )
+        for vote in (self.vote1, self.vote2, self.vote3):
+            Voice.objects.create(vote=vote, deputy=self.deputy2, result=1)
+            Voice.objects.create(vote=vote, deputy=self.deputy1, result=2)
+
+    def test_get_export_rows(self):
+        rows = list(get_export_rows())
+        self.assertEqual(len(rows), 6)
+        # Упорядочены по дате сессии, голосованию и депутату
+        self.assertEqual(
+            [(row[3], row[7]) for row in rows],
+            [
+                (self.vote2.pk, self.deputy1.full_name),
+                (self.vote2.pk, self.deputy2.full_name),
+                (self.vote3.pk, self.deputy1.full_name),
+                (self.vote3.pk, self.deputy2.full_name),
+                (self.vote1.pk, self.deputy1.full_name),
+                (self.vote1.pk, self.deputy2.full_name),
+            ]
+        )
+        self.assertEqual(rows[0], (
+            'Броварська міська рада', '18 чергова сесія', date(2016, 9, 22),
+            self.vote2.pk, 'Перше, "з комою"', None, 2,
+            self.deputy1.full_name, 2
+        ))
+
+        council = Council.objects.get(title='Броварська міська рада')
+        rows = list(get_export_rows(council=council.pk))
+        self.assertEqual(
+            {row[3] for row in rows}, {self.vote1.pk, self.vote2.pk}
+        )
+        rows = list(get_export_rows(date_from=date(2016, 10, 1)))
+        self.assertEqual({row[3] for row in rows}, {self.vote1.pk})
+        rows = list(get_export_rows(date_to=date(2016, 9, 22)))
+        self.assertEqual(
+            {row[3] for row in rows}, {self.vote2.pk, self.vote3.pk}
+        )
+
+    def test_iter_csv(self):
+        lines = ''.join(iter_csv(get_export_rows())).splitlines()
+        self.assertEqual(
+            lines[0],
+            'council,session,session_date,vote,title,types,vote_result,'
+            'deputy,result'
+        )
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(
+            lines[1],
+            'Броварська міська рада,18 чергова сесія,2016-09-22,{},'
+            '"Перше, ""з комою""",,2,{},2'.format(
+                self.vote2.pk, self.deputy1.full_name
+            )
+        )
+
+    def test_iter_ndjson(self):
+        lines = ''.join(iter_ndjson(get_export_rows())).splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(json.loads(lines[0]), {
+            'council': 'Броварська міська рада',
+            'session': '18 чергова сесія',
+            'session_date': '2016-09-22',
+            'vote': self.vote2.pk,
+            'title': 'Перше, "з комою"',
+            'types': None,
+            'vote_result': 2,
+            'deputy': self.deputy1.full_name,
+            'result': 2,
+        })
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'export_votes', format='ndjson', date_from='01-10-2016', stdout=out
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            {json.loads(line)['vote'] for line in lines}, {self.vote1.pk}
+        )
+
+    @skipUnless(pyarrow, 'Для формата parquet необходим pyarrow')
+    def test_command_parquet(self):
+        fd, path = tempfile.mkstemp(suffix='.parquet')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command('export_votes', format='parquet', output=path)
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(
+            table.column('title').to_pylist()[0], 'Перше, "з комою"'
+        )
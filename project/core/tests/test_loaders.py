@@ -0,0 +1,182 @@
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Vote, Voice, Council, Session, Deputy
+from ..loaders import VoteRecord, VoteLoader, CopyVoteLoader
+from ..generation import get_generation
+
+from datetime import date
+from unittest import skipUnless
+
+
+class VoteLoaderTest(TestCase):
+    """
+    Тесты для пакетной записи результатов голосований
+    """
+    deputy_name1 = 'Іваненко Валерій Іванович'
+    deputy_name2 = 'Веремчук Ірина Сергіївна'
+    deputy_name3 = 'Батюк Сергій Іванович'
+
+    def setUp(self):
+        self.loader = VoteLoader()
+        council = self.loader.get_council('Броварська міська рада')
+        session = self.loader.get_session(
+            '18 чергова сесія', date(2016, 9, 22)
+        )
+        self.vote = self.loader.get_vote(
+            'Про затвердження порядку денного', 1, council, session
+        )
+
+    def get_voices(self) -> dict:
+        return dict(
+            Voice.objects.filter(vote=self.vote)
+                         .values_list('deputy__full_name', 'result')
+        )
+
+    def test_get_or_create(self):
+        council = self.loader.get_council('Броварська міська рада')
+        session = self.loader.get_session(
+            '18 чергова сесія', date(2016, 9, 22)
+        )
+        self.assertEqual(Council.objects.count(), 1)
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(
+            self.loader.get_vote(
+                'Про затвердження порядку денного', 1, council, session
+            ),
+            self.vote
+        )
+
+    def test_save_voices(self):
+        self.loader.save_voices(
+            self.vote, [(self.deputy_name1, 1), (self.deputy_name2, 2)]
+        )
+        self.assertEqual(
+            self.get_voices(), {self.deputy_name1: 1, self.deputy_name2: 2}
+        )
+        self.assertEqual(Deputy.objects.count(), 2)
+
+        vote = Vote.objects.get(pk=self.vote.pk)
+        self.assertEqual((vote.agree, vote.disagree), (1, 1))
+        self.assertEqual(vote.result, 2)
+
+        # Изменение голоса, новый депутат и депутат, которого больше нет
+        self.loader.save_voices(
+            self.vote, [(self.deputy_name1, 1), (self.deputy_name3, 1)]
+        )
+        self.assertEqual(
+            self.get_voices(), {self.deputy_name1: 1, self.deputy_name3: 1}
+        )
+
+        vote = Vote.objects.get(pk=self.vote.pk)
+        self.assertEqual((vote.agree, vote.disagree), (2, 0))
+        self.assertEqual(vote.result, 1)
+
+    def test_add(self):
+        self.loader.add(VoteRecord(
+            council='Броварська міська рада',
+            session='18 чергова сесія',
+            session_date=date(2016, 9, 22),
+            title='Про затвердження порядку денного',
+            types=1,
+            voices=[(self.deputy_name1, 1)]
+        ))
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(self.get_voices(), {self.deputy_name1: 1})
+
+    def test_generation(self):
+        # Поколение данных увеличивается один раз за загрузку
+        generation = get_generation()
+        with VoteLoader() as loader:
+            for title in ('Про бюджет', 'Про регламент'):
+                loader.add(VoteRecord(
+                    council='Броварська міська рада',
+                    session='18 чергова сесія',
+                    session_date=date(2016, 9, 22),
+                    title=title,
+                    types=1,
+                    voices=[(self.deputy_name1, 1), (self.deputy_name2, 2)]
+                ))
+            self.assertEqual(get_generation(), generation)
+        self.assertEqual(get_generation(), generation + 1)
+
+    def test_save_voices_queries(self):
+        voices = [(self.deputy_name1, 1), (self.deputy_name2, 3)]
+        self.loader.save_voices(self.vote, voices)
+
+        # Депутаты уже известны: получение голосов, изменение одного голоса
+        # и сохранение результатов голосования внутри транзакции
+        # (в тестах транзакция - это SAVEPOINT и RELEASE SAVEPOINT)
+        voices[1] = (self.deputy_name2, 1)
+        with self.assertNumQueries(5):
+            self.loader.save_voices(self.vote, voices)
+
+        self.assertEqual(
+            self.get_voices(), {self.deputy_name1: 1, self.deputy_name2: 1}
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY есть только в PostgreSQL')
+class CopyVoteLoaderTest(TestCase):
+    """
+    Тесты для загрузки результатов голосований через COPY
+    """
+    deputy_name1 = VoteLoaderTest.deputy_name1
+    deputy_name2 = VoteLoaderTest.deputy_name2
+    deputy_name3 = VoteLoaderTest.deputy_name3
+
+    def get_record(self, title: str, voices: list) -> VoteRecord:
+        return VoteRecord(
+            council='Броварська міська рада',
+            session='18 чергова сесія',
+            session_date=date(2016, 9, 22),
+            title=title,
+            types=None,
+            voices=voices
+        )
+
+    def test_flush(self):
+        with CopyVoteLoader() as loader:
+            loader.add(self.get_record(
+                'Про затвердження порядку денного',
+                [(self.deputy_name1, 1), (self.deputy_name2, 2)]
+            ))
+            loader.add(self.get_record('Без таблицы', []))
+            # Повтор голосования: голоса берутся с последней страницы
+            loader.add(self.get_record(
+                'Про затвердження порядку денного',
+                [(self.deputy_name1, 1), (self.deputy_name3, 1)]
+            ))
+            self.assertEqual(Vote.objects.count(), 0)
+
+        self.assertEqual(Council.objects.count(), 1)
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(Deputy.objects.count(), 3)
+        self.assertEqual(Vote.objects.count(), 2)
+
+        vote = Vote.objects.get(title='Про затвердження порядку денного')
+        self.assertEqual(
+            dict(vote.voice_set.values_list('deputy__full_name', 'result')),
+            {self.deputy_name1: 1, self.deputy_name3: 1}
+        )
+        self.assertEqual((vote.agree, vote.disagree), (2, 0))
+        self.assertEqual(vote.result, 1)
+
+        vote = Vote.objects.get(title='Без таблицы')
+        self.assertFalse(vote.voice_set.exists())
+        self.assertEqual(vote.result, 2)
+
+        # Повторная загрузка обновляет голоса и удаляет лишние
+        with CopyVoteLoader() as loader:
+            loader.add(self.get_record(
+                'Про затвердження порядку денного',
+                [(self.deputy_name1, 2), (self.deputy_name2, 2)]
+            ))
+
+        vote = Vote.objects.get(title='Про затвердження порядку денного')
+        self.assertEqual(
+            dict(vote.voice_set.values_list('deputy__full_name', 'result')),
+            {self.deputy_name1: 2, self.deputy_name2: 2}
+        )
+        self.assertEqual((vote.agree, vote.disagree), (0, 2))
+        self.assertEqual(Vote.objects.count(), 2)
@@ -0,0 +1,58 @@
+from django.test import SimpleTestCase
+
+from ..metrics import StageMetrics, IngestMetrics
+
+import os
+import json
+import shutil
+import tempfile
+
+
+class IngestMetricsTest(SimpleTestCase):
+    """
+    Тесты для замеров обработки документов
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def get_metrics(self, pages: int, seconds: float) -> StageMetrics:
+        metrics = StageMetrics()
+        metrics.count('pages', pages)
+        metrics.count('votes', pages - 1)
+        metrics.seconds['text'] = seconds
+        metrics.seconds['tables'] = seconds
+        return metrics
+
+    def test_summary(self):
+        metrics = IngestMetrics()
+        metrics.add(self.get_metrics(10, 1.0), 'a.pdf', 1)
+        metrics.add(self.get_metrics(5, 0.5), 'a.pdf', 2)
+        metrics.add(self.get_metrics(3, 0.5), 'b.pdf', 2)
+
+        loaded = StageMetrics()
+        loaded.count('loaded_votes', 12)
+        loaded.seconds['load'] = 2.0
+        metrics.add(loaded, 'a.pdf')
+
+        path = os.path.join(self.path, 'run', 'metrics.json')
+        metrics.write(path, stage='all')
+        with open(path, encoding='utf-8') as infile:
+            summary = json.load(infile)
+
+        self.assertEqual(summary['options'], {'stage': 'all'})
+        self.assertEqual(summary['total']['pages'], 18)
+        self.assertEqual(summary['total']['votes'], 15)
+
+        # Скорость документов и процессов - по времени извлечения
+        document = summary['documents']['a.pdf']
+        self.assertEqual(document['elapsed'], 3.0)
+        self.assertEqual(document['pages_per_second'], 5.0)
+        self.assertEqual(document['votes_per_second'], 13 / 3)
+        self.assertEqual(document['load_votes_per_second'], 6.0)
+        self.assertEqual(summary['workers']['2']['pages'], 8)
+        self.assertEqual(summary['workers']['2']['pages_per_second'], 4.0)
+        self.assertIsNone(summary['workers']['2']['load_votes_per_second'])
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['metrics.json'])
@@ -0,0 +1,237 @@
+from django.test import SimpleTestCase, TransactionTestCase, \
+    override_settings
+from django.db import transaction
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from django.contrib.auth.models import User
+
+from ..models import Council
+from ..generation import get_generation, bump_generation, on_commit_once
+from ..response_cache import ResponseCache
+from ..timing import RequestTiming, TimingStats, timing_stats
+
+import os
+import shutil
+import tempfile
+
+
+class ResponseCacheTest(SimpleTestCase):
+    """
+    Тесты для LRU кеша ответов API
+    """
+    def test_evict(self):
+        cache = ResponseCache(10)
+        cache.set('a', 'A', 4)
+        cache.set('b', 'B', 4)
+        self.assertEqual(cache.get('a'), 'A')
+
+        # Вытесняется давно не использовавшийся ответ
+        cache.set('c', 'C', 4)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), ('A', 'C'))
+        self.assertEqual(cache.size, 8)
+
+        # Ответ больше кеша не сохраняется
+        cache.set('d', 'D', 11)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.size, 8)
+
+
+class ApiCacheMiddlewareTest(APITestCase):
+    """
+    Тесты для кеша ответов API с ETag
+    """
+    url_list = reverse('council-list')
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        settings = override_settings(
+            DATASET_GENERATION_FILE=os.path.join(self.path, 'generation')
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.path)
+
+        Council.objects.create(title='Броварська міська рада')
+
+    def test_generation(self):
+        generation = get_generation()
+        self.assertEqual(bump_generation(), generation + 1)
+        self.assertEqual(get_generation(), generation + 1)
+
+        # Изменение данных через ORM увеличивает поколение
+        Council.objects.create(title='Київська міська рада')
+        self.assertGreater(get_generation(), generation + 1)
+
+    def test_etag(self):
+        response = self.client.get(self.url_list)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        # Ответ из кеша без обращения к базе данных
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url_list)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 1)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.url_list, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # После изменения данных ответ собирается заново
+        Council.objects.create(title='Київська міська рада')
+        response = self.client.get(self.url_list, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_not_cached(self):
+        # Ошибки и веб интерфейс API не кешируются
+        url = reverse('statistic-deputy-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('ETag', response)
+
+        response = self.client.get(self.url_list, HTTP_ACCEPT='text/html')
+        self.assertNotIn('ETag', response)
+
+
+class GenerationTest(TransactionTestCase):
+    """
+    Тесты для поколения данных
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_once_per_transaction(self):
+        with override_settings(
+            DATASET_GENERATION_FILE=os.path.join(self.path, 'generation')
+        ):
+            with transaction.atomic():
+                Council.objects.create(title='Броварська міська рада')
+                Council.objects.create(title='Київська міська рада')
+            # Сразу при первом изменении и после фиксации
+            self.assertEqual(get_generation(), 2)
+
+    def test_on_commit_once(self):
+        calls = []
+
+        def func(values):
+            calls.append(values)
+
+        with transaction.atomic():
+            self.assertTrue(on_commit_once(func, [1]))
+            self.assertFalse(on_commit_once(func, [2]))
+        self.assertEqual(calls, [{1, 2}])
+
+        # Вызов откатившейся транзакции (или точки сохранения) отбрасывается
+        for savepoint in (False, True):
+            with transaction.atomic():
+                with self.assertRaises(ValueError):
+                    with transaction.atomic(savepoint=savepoint):
+                        on_commit_once(func, [3])
+                        raise ValueError
+                if savepoint:
+                    self.assertTrue(on_commit_once(func, [4]))
+        with transaction.atomic():
+            self.assertTrue(on_commit_once(func, [5]))
+        self.assertEqual(calls, [{1, 2}, {4}, {5}])
+
+    def test_not_writable(self):
+        # Каталог для файла поколения создать нельзя
+        path = os.path.join(self.path, 'run')
+        open(path, 'w').close()
+        with override_settings(
+            DATASET_GENERATION_FILE=os.path.join(path, 'generation')
+        ):
+            with self.assertLogs('core.generation', 'ERROR'):
+                Council.objects.create(title='Броварська міська рада')
+        self.assertEqual(Council.objects.count(), 1)
+
+
+class TimingStatsTest(SimpleTestCase):
+    """
+    Тесты для сводных замеров запросов
+    """
+    def test_add(self):
+        stats = TimingStats()
+        stats.add('VoteViewSet.list', RequestTiming(2, 3.0, 1.0, 7.0))
+        stats.add('VoteViewSet.list', RequestTiming(4, 1.0, 1.0, 10000.0))
+
+        views = stats.get()
+        self.assertEqual(list(views), ['VoteViewSet.list'])
+        view = views['VoteViewSet.list']
+        self.assertEqual(view['count'], 2)
+        self.assertEqual(view['queries'], {'sum': 6, 'max': 4})
+        self.assertEqual(view['db_ms'], {'sum': 4.0, 'max': 3.0})
+        self.assertEqual(view['histogram']['10'], 1)
+        self.assertEqual(view['histogram']['+Inf'], 1)
+        self.assertEqual(sum(view['histogram'].values()), 2)
+
+        # Копия не меняется вместе с замерами
+        stats.add('VoteViewSet.list', RequestTiming(1, 0.0, 0.0, 1.0))
+        self.assertEqual(view['count'], 2)
+
+    def test_server_timing(self):
+        self.assertEqual(
+            RequestTiming(2, 3.0, 1.25, 7.0).get_server_timing(),
+            'db;dur=3.0;desc="2 queries", render;dur=1.2, total;dur=7.0'
+        )
+
+
+@override_settings(API_CACHE_SIZE=0, REQUEST_TIMING_SAMPLE_RATE=1)
+class RequestTimingMiddlewareTest(APITestCase):
+    """
+    Тесты для замеров запросов
+    """
+    url_list = reverse('council-list')
+    url_timing = reverse('timing-list')
+
+    def setUp(self):
+        timing_stats.clear()
+        self.addCleanup(timing_stats.clear)
+        Council.objects.create(title='Броварська міська рада')
+
+    def test_server_timing(self):
+        response = self.client.get(self.url_list)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+        stats = timing_stats.get()
+        self.assertEqual(list(stats), ['CouncilViewSet.list'])
+        self.assertEqual(stats['CouncilViewSet.list']['count'], 1)
+        self.assertEqual(
+            stats['CouncilViewSet.list']['queries'], {'sum': 1, 'max': 1}
+        )
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_disabled(self):
+        response = self.client.get(self.url_list)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(timing_stats.get(), {})
+
+    @override_settings(API_CACHE_SIZE=1024 * 1024)
+    def test_timing_list(self):
+        response = self.client.get(self.url_timing)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(
+            User.objects.create_superuser('admin', 'admin@example.com', 'a')
+        )
+        self.client.get(self.url_list)
+        response = self.client.get(self.url_timing)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['CouncilViewSet.list']['count'], 1)
+
+        # Замеры не кешируются
+        response = self.client.get(self.url_timing)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(
+            response.data['RequestTimingViewSet.list']['count'], 2
+        )
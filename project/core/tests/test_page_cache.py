@@ -0,0 +1,60 @@
+from django.test import SimpleTestCase
+
+from ..page_cache import PageCache
+
+import os
+import shutil
+import tempfile
+
+
+class PageCacheTest(SimpleTestCase):
+    """
+    Тесты для кеша текста и таблиц страниц
+    """
+    file_hash = 'a' * 64
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = PageCache(self.path, 1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get(self.file_hash, 0, 'layout'))
+
+        voices = [('Іваненко Валерій Іванович', 'За')]
+        self.cache.set(self.file_hash, 0, 'layout', 'Текст', voices)
+        self.cache.set(self.file_hash, 1, 'layout', 'Текст', None)
+
+        self.assertEqual(
+            self.cache.get(self.file_hash, 0, 'layout'), ('Текст', voices)
+        )
+        self.assertEqual(
+            self.cache.get(self.file_hash, 1, 'layout'), ('Текст', None)
+        )
+        self.assertIsNone(self.cache.get(self.file_hash, 0, 'tabula'))
+
+    def test_broken_file(self):
+        path = self.cache.get_path(self.file_hash, 0, 'layout')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as outfile:
+            outfile.write(b'broken')
+        self.assertIsNone(self.cache.get(self.file_hash, 0, 'layout'))
+
+    def test_evict(self):
+        for page in range(3):
+            self.cache.set(self.file_hash, page, 'layout', str(page), None)
+            path = self.cache.get_path(self.file_hash, page, 'layout')
+            os.utime(path, (page, page))
+        size = os.path.getsize(path)
+
+        self.cache.max_size = size * 2
+        self.assertEqual(self.cache.evict(), 1)
+        # Вытесняется давно не использовавшаяся страница
+        self.assertIsNone(self.cache.get(self.file_hash, 0, 'layout'))
+        self.assertIsNotNone(self.cache.get(self.file_hash, 2, 'layout'))
+
+        # Нулевой размер очищает кеш
+        self.assertEqual(PageCache(self.path, 0).evict(), 2)
+        self.assertIsNone(self.cache.get(self.file_hash, 2, 'layout'))
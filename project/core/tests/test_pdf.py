@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ..models import Voice
+from ..pdf import (
+    get_file_hash, get_pdf_pages_count, get_pdf_page_hashes, get_page_ranges,
+    iter_pdf_pages, get_layout_vote_table
+)
+from ..utils import TabulaWorker, get_tabula_vote_table
+
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+
+from io import StringIO
+from unittest import skipUnless
+import os
+import re
+import shutil
+import hashlib
+
+
+class IterPdfPagesTest(SimpleTestCase):
+    """
+    Тесты для потокового чтения страниц pdf файла
+    """
+    file_path = os.path.join(
+        settings.PDF_FILES_PATH,
+        'Результат поіменного голосування_11.11.2016.pdf'
+    )
+
+    def setUp(self):
+        self.infile = open(self.file_path, 'rb')
+
+    def tearDown(self):
+        self.infile.close()
+
+    def get_converter_text(self, page: int) -> str:
+        output = StringIO()
+        manager = PDFResourceManager()
+        converter = TextConverter(manager, output, laparams=LAParams())
+        interpreter = PDFPageInterpreter(manager, converter)
+        for current_page in PDFPage.get_pages(self.infile, [page]):
+            interpreter.process_page(current_page)
+        converter.close()
+        return output.getvalue()
+
+    def test_get_pdf_pages_count(self):
+        self.assertEqual(
+            get_pdf_pages_count(self.infile),
+            len(list(PDFPage.get_pages(self.infile)))
+        )
+
+    def test_iter_pdf_pages(self):
+        pages = list(iter_pdf_pages(self.infile))
+        self.assertEqual(
+            [page.number for page in pages],
+            list(range(get_pdf_pages_count(self.infile)))
+        )
+        for page in pages:
+            self.assertEqual(page.text, self.get_converter_text(page.number))
+
+        pages = list(iter_pdf_pages(self.infile, [2, 0]))
+        self.assertEqual([page.number for page in pages], [0, 2])
+
+    def test_get_file_hash(self):
+        with open(self.file_path, 'rb') as infile:
+            self.assertEqual(
+                get_file_hash(self.file_path),
+                hashlib.sha256(infile.read()).hexdigest()
+            )
+
+    def test_get_pdf_page_hashes(self):
+        hashes = get_pdf_page_hashes(self.infile)
+        self.assertEqual(len(hashes), get_pdf_pages_count(self.infile))
+        self.assertEqual(len(set(hashes)), len(hashes))
+        self.assertEqual(get_pdf_page_hashes(self.infile), hashes)
+
+    def test_get_page_ranges(self):
+        self.assertEqual(
+            get_page_ranges(7, 3), [(0, 3), (3, 6), (6, 7)]
+        )
+        self.assertEqual(get_page_ranges(3, 3), [(0, 3)])
+        self.assertEqual(get_page_ranges(0, 3), [])
+
+
+class LayoutVoteTableTest(SimpleTestCase):
+    """
+    Тесты для извлечения таблиц по разметке страницы
+    """
+    file_path = IterPdfPagesTest.file_path
+    # Итоги голосования на странице в порядке Voice.RESULT
+    summary_patterns = (
+        r'"За" - (\d+)',
+        r'"Проти" - (\d+)',
+        r'"Утрималися" - (\d+)',
+        r'Не брали участі у голосуванні - (\d+)',
+        r'Відсутні на пленарному засіданні - (\d+)',
+    )
+
+    def get_summary(self, text: str) -> list:
+        text = ' '.join(text.split())
+        return [
+            int(re.search(pattern, text).group(1))
+            for pattern in self.summary_patterns
+        ]
+
+    def test_get_layout_vote_table(self):
+        results = [title for value, title in Voice.RESULT]
+
+        with open(self.file_path, 'rb') as infile:
+            for page in iter_pdf_pages(infile):
+                voices = get_layout_vote_table(page.layout)
+                self.assertTrue(voices)
+
+                # Строки с переносом ФИО склеены
+                self.assertIn(
+                    ('Оксютенко Володимир Миколайович', 'За'), voices
+                )
+                for full_name, vote_result in voices:
+                    self.assertEqual(len(full_name.split()), 3)
+                    self.assertIn(vote_result, results)
+
+                self.assertEqual(
+                    [sum(1 for full_name, vote_result in voices
+                         if vote_result == title) for title in results],
+                    self.get_summary(page.text)
+                )
+
+    @skipUnless(shutil.which('java'), 'Для сравнения с tabula нужна java')
+    def test_tabula_parity(self):
+        for file_name in sorted(os.listdir(settings.PDF_FILES_PATH)):
+            if not file_name.endswith('.pdf'):
+                continue
+            file_path = os.path.join(settings.PDF_FILES_PATH, file_name)
+
+            with open(file_path, 'rb') as infile, TabulaWorker() as tabula:
+                for page in iter_pdf_pages(infile):
+                    df = tabula.read_pdf_table(
+                        file_path, pages=page.number + 1, silent=True
+                    )
+                    self.assertEqual(
+                        get_layout_vote_table(page.layout),
+                        get_tabula_vote_table(df),
+                        '{}, страница {}'.format(file_name, page.number + 1)
+                    )
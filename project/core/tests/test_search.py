@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVector
+from django.test import TestCase
+
+from ..models import Council, Session, Vote
+from ..search import (
+    search_votes, has_trigram, PrefixSearchQuery, SEARCH_CONFIG
+)
+
+from unittest import mock
+
+
+class SearchVotesTest(TestCase):
+    """
+    Тесты для поиска голосований по названию
+    """
+    titles = (
+        'Про затвердження порядку денного',
+        'Про бюджет участі (громадський бюджет) в місті Бровари',
+        'Про внесення змін до міського бюджету на 2017 рік',
+        'Про затвердження Регламенту Броварської міської ради',
+    )
+
+    def setUp(self):
+        council = Council.objects.create(title='Броварська міська рада')
+        session = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        self.votes = [
+            Vote.objects.create(council=council, session=session, title=title)
+            for title in self.titles
+        ]
+
+    def search(self, text: str) -> list:
+        return [
+            self.votes.index(vote)
+            for vote in search_votes(Vote.objects.all(), text)
+        ]
+
+    def test_search(self):
+        # Слова совпадают по началу, без учёта регистра, более
+        # релевантные голосования первые
+        self.assertEqual(self.search('Бюджет'), [1, 2])
+        self.assertEqual(self.search('затвердження'), [0, 3])
+        self.assertEqual(self.search('затвердження ради'), [3])
+        self.assertEqual(self.search('міськ бюдж'), [2])
+        self.assertEqual(self.search('податки'), [])
+        self.assertEqual(self.search(' :* & '), [])
+
+    def test_prefix_query(self):
+        # Операторы tsquery из слов удаляются
+        votes = Vote.objects.annotate(
+            search=SearchVector('title', config=SEARCH_CONFIG)
+        ).filter(search=PrefixSearchQuery(["бюдж')|!('", 'міськ:*']))
+        self.assertEqual(list(votes), [self.votes[2]])
+
+    def test_trigram_query(self):
+        with mock.patch('core.search.has_trigram', return_value=True):
+            queryset = search_votes(Vote.objects.all(), 'юдже')
+        self.assertEqual(
+            list(queryset.query.order_by),
+            ['-search_rank', '-search_similarity', 'pk']
+        )
+        # Подстрока ищется через icontains (UPPER(title) LIKE) по
+        # триграммному индексу
+        sql = str(queryset.query)
+        self.assertIn('SIMILARITY(', sql)
+        self.assertIn('UPPER("core_vote"."title"::text) LIKE UPPER(', sql)
+
+    def test_trigram(self):
+        if not has_trigram():
+            self.skipTest('Нет расширения pg_trgm')
+        # Подстрока внутри слова
+        self.assertEqual(self.search('юдже'), [1, 2])
+
+    def test_admin(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+
+        response = self.client.get('/admin/core/vote/', {'q': 'бюджет'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context['cl'].result_list), self.votes[1:3]
+        )
+
+        # Более релевантное голосование первое и в админке
+        vote = Vote.objects.create(
+            council=self.votes[0].council, session=self.votes[0].session,
+            title='Про бюджет, зміни до бюджету та виконання бюджету'
+        )
+        response = self.client.get('/admin/core/vote/', {'q': 'бюджет'})
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [vote] + self.votes[1:3]
+        )
@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase
+
+from ..loaders import VoteRecord
+from ..staging import (
+    StagedPage, get_staging_file_path, write_staging_file, read_staging_file
+)
+
+from datetime import date
+import os
+import shutil
+import tempfile
+
+
+class StagingFileTest(SimpleTestCase):
+    """
+    Тесты для промежуточных файлов извлечённых голосований
+    """
+    file_hash = 'a' * 64
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_get_staging_file_path(self):
+        self.assertEqual(
+            get_staging_file_path(self.path, self.file_hash, 25),
+            os.path.join(self.path, self.file_hash + '.00025.ndjson')
+        )
+
+    def test_write_read(self):
+        pages = [
+            StagedPage(
+                file_name='Результат поіменного голосування.pdf',
+                file_hash=self.file_hash,
+                page=0,
+                content_hash='b' * 64,
+                vote=VoteRecord(
+                    council='Броварська міська рада',
+                    session='18 чергова сесія',
+                    session_date=date(2016, 9, 22),
+                    title='Про затвердження порядку денного',
+                    types=None,
+                    voices=[('Іваненко Валерій Іванович', 1)]
+                ),
+                error=None
+            ),
+            StagedPage(
+                file_name='Результат поіменного голосування.pdf',
+                file_hash=self.file_hash,
+                page=1,
+                content_hash='c' * 64,
+                vote=None,
+                error='Traceback (most recent call last):'
+            ),
+        ]
+        path = get_staging_file_path(
+            os.path.join(self.path, 'staging'), self.file_hash, 0
+        )
+        write_staging_file(path, pages)
+
+        self.assertEqual(list(read_staging_file(path)), pages)
+        self.assertEqual(os.listdir(os.path.dirname(path)), [
+            os.path.basename(path)
+        ])
@@ -0,0 +1,125 @@
+from django.test import TestCase
+
+from ..models import Council, Session, Deputy, Vote, Voice
+from ..statistics import (
+    get_deputy_attendance, get_session_summary, get_council_summary
+)
+
+from datetime import date
+
+
+class StatisticsTest(TestCase):
+    """
+    Тесты для итогов голосований, посчитанных группировкой в базе данных
+    """
+    def setUp(self):
+        self.council = Council.objects.create(title='Броварська міська рада')
+        self.session1 = Session.objects.create(
+            title='18 чергова сесія', date=date(2016, 9, 22)
+        )
+        self.session2 = Session.objects.create(
+            title='19 чергова сесія', date=date(2016, 10, 20)
+        )
+        self.deputy1 = Deputy.objects.create(
+            full_name='Іваненко Валерій Іванович'
+        )
+        self.deputy2 = Deputy.objects.create(
+            full_name='Веремчук Ірина Сергіївна'
+        )
+
+        # Голоса депутатов и результаты голосований
+        votes = (
+            (self.session1, 1, (1, 1)),
+            (self.session1, 2, (2, 5)),
+            (self.session2, 1, (1, 4)),
+        )
+        for session, result, voices in votes:
+            vote = Vote.objects.create(
+                council=self.council, session=session, result=result,
+                agree=voices.count(1), disagree=voices.count(2),
+                did_not_participate=voices.count(4), absent=voices.count(5)
+            )
+            for deputy, voice in zip((self.deputy1, self.deputy2), voices):
+                Voice.objects.create(deputy=deputy, vote=vote, result=voice)
+
+    def test_get_deputy_attendance(self):
+        with self.assertNumQueries(1):
+            rows = get_deputy_attendance()
+        # Порядок по ФИО зависит от правил сортировки базы данных
+        self.assertEqual(sorted(rows, key=lambda row: row['deputy']), [
+            {
+                'deputy': self.deputy1.pk,
+                'full_name': self.deputy1.full_name,
+                'votes': 3,
+                'attendance': 100.0,
+                'agree': 2,
+                'disagree': 1,
+                'abstained': 0,
+                'did_not_participate': 0,
+                'absent': 0,
+            },
+            {
+                'deputy': self.deputy2.pk,
+                'full_name': self.deputy2.full_name,
+                'votes': 3,
+                'attendance': 200 / 3,
+                'agree': 1,
+                'disagree': 0,
+                'abstained': 0,
+                'did_not_participate': 1,
+                'absent': 1,
+            },
+        ])
+
+        rows = get_deputy_attendance(date_from=date(2016, 10, 1))
+        self.assertEqual(
+            {row['deputy']: (row['votes'], row['agree']) for row in rows},
+            {self.deputy1.pk: (1, 1), self.deputy2.pk: (1, 0)}
+        )
+        self.assertEqual(get_deputy_attendance(council=0), [])
+
+    def test_get_session_summary(self):
+        with self.assertNumQueries(1):
+            rows = get_session_summary()
+        self.assertEqual(rows[0], {
+            'session': self.session1.pk,
+            'title': self.session1.title,
+            'date': self.session1.date,
+            'votes': 2,
+            'passed': 1,
+            'failed': 1,
+            'pass_rate': 50.0,
+            'agree': 2,
+            'disagree': 1,
+            'abstained': 0,
+            'did_not_participate': 0,
+            'absent': 1,
+        })
+        self.assertEqual(
+            [(row['session'], row['pass_rate']) for row in rows],
+            [(self.session1.pk, 50.0), (self.session2.pk, 100.0)]
+        )
+
+        rows = get_session_summary(session=self.session2.pk)
+        self.assertEqual([row['session'] for row in rows], [self.session2.pk])
+
+    def test_get_council_summary(self):
+        with self.assertNumQueries(1):
+            rows = get_council_summary()
+        self.assertEqual(rows, [{
+            'council': self.council.pk,
+            'title': self.council.title,
+            'sessions': 2,
+            'votes': 3,
+            'passed': 2,
+            'failed': 1,
+            'pass_rate': 200 / 3,
+            'agree': 3,
+            'disagree': 1,
+            'abstained': 0,
+            'did_not_participate': 1,
+            'absent': 1,
+        }])
+
+        rows = get_council_summary(date_to=date(2016, 9, 22))
+        self.assertEqual((rows[0]['sessions'], rows[0]['votes']), (1, 2))
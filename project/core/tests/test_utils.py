@@ -1,7 +1,20 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, SimpleTestCase
+from django.urls import reverse
 
 from ..models import Vote, Voice, Council, Session, Deputy
-from ..utils import recalc_vote_results
+from ..utils import recalc_vote_results, recalc_votes_results, TabulaWorker
+
+from io import StringIO
+import os
+import shutil
+import subprocess
+from subprocess import PIPE
+import sys
+import tempfile
+from unittest import mock, skipUnless
 
 
 class RecalcVoteResultsTest(TestCase):
@@ -34,3 +47,186 @@ class RecalcVoteResultsTest(TestCase):
 
         self.assertEqual(self.vote.agree, 2)
         self.assertEqual(self.vote.result, 1)
+
+    def test_recalc_vote_results_queries(self):
+        # Голоса считаются одним запросом, затем голосование сохраняется
+        with self.assertNumQueries(2):
+            recalc_vote_results(self.vote)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'UPDATE ... FROM с FILTER для PostgreSQL')
+class RecalcVotesResultsTest(TestCase):
+    """
+    Тесты для пересчёта результатов голосований одним запросом
+    """
+    def setUp(self):
+        council = Council.objects.create(title='Броварська міська рада')
+        self.session = Session.objects.create(
+            title='18 чергова сесія', date='2016-09-22'
+        )
+        other_session = Session.objects.create(
+            title='19 чергова сесія', date='2016-10-20'
+        )
+        self.vote1 = Vote.objects.create(
+            council=council, session=self.session, result=2
+        )
+        self.vote2 = Vote.objects.create(
+            council=council, session=other_session, result=2
+        )
+        # Голосование без голосов со старыми результатами
+        self.vote3 = Vote.objects.create(
+            council=council, session=self.session, agree=3, result=1
+        )
+
+        deputy1 = Deputy.objects.create(full_name='Іваненко Валерій Іванович')
+        deputy2 = Deputy.objects.create(full_name='Веремчук Ірина Сергіївна')
+        for vote in (self.vote1, self.vote2):
+            Voice.objects.create(deputy=deputy1, vote=vote, result=1)
+            Voice.objects.create(deputy=deputy2, vote=vote, result=5)
+
+    def get_results(self, vote: Vote) -> tuple:
+        vote.refresh_from_db()
+        return (
+            vote.agree, vote.disagree, vote.abstained,
+            vote.did_not_participate, vote.absent, vote.result
+        )
+
+    def test_recalc_votes_results(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(recalc_votes_results([self.vote1.pk]), 1)
+        self.assertEqual(self.get_results(self.vote1), (1, 0, 0, 0, 1, 1))
+        self.assertEqual(self.get_results(self.vote2), (0, 0, 0, 0, 0, 2))
+
+        # Все голосования, неизменившиеся не перезаписываются
+        self.assertEqual(recalc_votes_results(), 2)
+        self.assertEqual(self.get_results(self.vote2), (1, 0, 0, 0, 1, 1))
+        self.assertEqual(self.get_results(self.vote3), (0, 0, 0, 0, 0, 2))
+        self.assertEqual(recalc_votes_results(), 0)
+        self.assertEqual(recalc_votes_results([]), 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('recalc_votes', session=[self.session.pk], stdout=out)
+        self.assertEqual(out.getvalue(), 'Изменено голосований: 2\n')
+        self.assertEqual(self.get_results(self.vote2), (0, 0, 0, 0, 0, 2))
+
+    def test_admin_action(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        response = self.client.post(
+            reverse('admin:core_vote_changelist'),
+            {
+                'action': 'recalc_results',
+                '_selected_action': [self.vote1.pk, self.vote3.pk],
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_results(self.vote1), (1, 0, 0, 0, 1, 1))
+        self.assertEqual(self.get_results(self.vote3), (0, 0, 0, 0, 0, 2))
+
+
+class FakeTabulaWorker(TabulaWorker):
+    """
+    Вместо JVM запускаем python процесс, отвечающий по тому же протоколу.
+    На странице 98 процесс падает, если нет файла-отметки (создаёт его),
+    на странице 99 - всегда.
+    """
+    script = (
+        'import sys, os, json\n'
+        'for line in sys.stdin:\n'
+        '    args = json.loads(line)\n'
+        '    if "--pages" not in args:\n'
+        '        print(json.dumps({"error": "no pages"}), flush=True)\n'
+        '        continue\n'
+        '    page = args[args.index("--pages") + 1]\n'
+        '    if page == "99" or page == "98" and \\\n'
+        '            not os.path.exists(sys.argv[1]):\n'
+        '        open(sys.argv[1], "w").close()\n'
+        '        sys.exit(1)\n'
+        '    print(json.dumps({"output": "a,b\\n" + page + ",x\\n"}),'
+        ' flush=True)\n'
+    )
+
+    def __init__(self, marker_path: str = os.devnull):
+        super().__init__()
+        self.marker_path = marker_path
+        self.starts = 0
+
+    def start(self):
+        self.starts += 1
+        self.process = subprocess.Popen(
+            [sys.executable, '-c', self.script, self.marker_path],
+            stdin=PIPE, stdout=PIPE
+        )
+
+
+class DeadTabulaWorker(FakeTabulaWorker):
+    """
+    Процесс, который сразу завершается (как JVM без Nashorn)
+    """
+    script = 'import sys'
+
+
+class TabulaWorkerTest(SimpleTestCase):
+    """
+    Тесты для долгоживущего процесса tabula
+    """
+    def test_read_pdf_table(self):
+        with FakeTabulaWorker() as tabula:
+            for page in (1, 2):
+                df = tabula.read_pdf_table('test.pdf', pages=page)
+                self.assertEqual(list(df.head()), ['a', 'b'])
+                self.assertEqual(df['a'][0], page)
+            process = tabula.process
+
+            with self.assertRaises(subprocess.CalledProcessError):
+                tabula.read_pdf_table('test.pdf', pages=0)
+            self.assertIs(tabula.process, process)
+
+        self.assertIsNone(tabula.process)
+
+    def test_restart(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        with FakeTabulaWorker(os.path.join(path, 'crashed')) as tabula, \
+                mock.patch('core.utils.read_pdf_table') as read_pdf_table:
+            tabula.read_pdf_table('test.pdf', pages=1)
+            self.assertEqual(tabula.starts, 1)
+
+            # Упавший процесс перезапускается, страница читается заново
+            df = tabula.read_pdf_table('test.pdf', pages=98)
+            self.assertEqual(df['a'][0], 98)
+            self.assertEqual(tabula.starts, 2)
+
+            # Процесс падает и после перезапуска: страница читается без
+            # него, следующая - новым процессом
+            self.assertIs(
+                tabula.read_pdf_table('test.pdf', pages=99),
+                read_pdf_table.return_value
+            )
+            df = tabula.read_pdf_table('test.pdf', pages=2)
+            self.assertEqual(df['a'][0], 2)
+            self.assertEqual(tabula.starts, 4)
+            self.assertTrue(tabula.available)
+        read_pdf_table.assert_called_once_with('test.pdf', pages=99)
+
+    def test_fallback(self):
+        with DeadTabulaWorker() as tabula, \
+                mock.patch('core.utils.read_pdf_table') as read_pdf_table:
+            for page in (1, 2):
+                self.assertIs(
+                    tabula.read_pdf_table('test.pdf', pages=page),
+                    read_pdf_table.return_value
+                )
+            # Процесс, не ответивший ни разу, больше не запускается
+            self.assertFalse(tabula.available)
+            self.assertEqual(tabula.starts, 2)
+        self.assertEqual(read_pdf_table.call_count, 2)
+
+        tabula = TabulaWorker()
+        with mock.patch.object(tabula, 'start', side_effect=OSError), \
+                mock.patch('core.utils.read_pdf_table') as read_pdf_table:
+            tabula.read_pdf_table('test.pdf', pages=1)
+        self.assertFalse(tabula.available)
+        read_pdf_table.assert_called_once_with('test.pdf', pages=1)
@@ -0,0 +1,96 @@
+from threading import Lock
+
+
+# Верхние границы интервалов гистограммы времени ответа, мс
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class RequestTiming:
+    """
+    Замеры одного запроса: количество и время SQL запросов, время
+    отрисовки ответа и общее время, мс
+    """
+    __slots__ = ('queries', 'db', 'render', 'total')
+
+    def __init__(self, queries: int = 0, db: float = 0.0,
+                 render: float = 0.0, total: float = 0.0):
+        self.queries = queries
+        self.db = db
+        self.render = render
+        self.total = total
+
+    def get_server_timing(self) -> str:
+        """
+        Значение заголовка Server-Timing
+        """
+        return 'db;dur={:.1f};desc="{} queries", render;dur={:.1f}, ' \
+               'total;dur={:.1f}'.format(
+                   self.db, self.queries, self.render, self.total
+               )
+
+
+class TimingStats:
+    """
+    Сводные замеры запросов в памяти процесса по представлениям:
+    количество запросов, суммы и максимумы, гистограмма общего времени
+    """
+    def __init__(self):
+        self.views = {}
+        self.lock = Lock()
+
+    def add(self, view: str, timing: RequestTiming):
+        """
+        Добавляем замеры запроса к представлению
+        """
+        with self.lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = {
+                    'count': 0,
+                    'queries': {'sum': 0, 'max': 0},
+                    'db_ms': {'sum': 0.0, 'max': 0.0},
+                    'render_ms': {'sum': 0.0, 'max': 0.0},
+                    'total_ms': {'sum': 0.0, 'max': 0.0},
+                    'histogram': [0] * (len(LATENCY_BUCKETS) + 1),
+                }
+            stats['count'] += 1
+            for name, value in (('queries', timing.queries),
+                                ('db_ms', timing.db),
+                                ('render_ms', timing.render),
+                                ('total_ms', timing.total)):
+                stats[name]['sum'] += value
+                stats[name]['max'] = max(stats[name]['max'], value)
+
+            bucket = len(LATENCY_BUCKETS)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if timing.total <= bound:
+                    bucket = index
+                    break
+            stats['histogram'][bucket] += 1
+
+    def get(self) -> dict:
+        """
+        Копия сводных замеров, гистограмма - количество запросов по
+        верхним границам интервалов (мс)
+        """
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+        with self.lock:
+            return {
+                view: dict(
+                    {
+                        name: value if name == 'count' else dict(value)
+                        for name, value in stats.items()
+                        if name != 'histogram'
+                    },
+                    histogram=dict(zip(bounds, stats['histogram']))
+                )
+                for view, stats in self.views.items()
+            }
+
+    def clear(self):
+        with self.lock:
+            self.views = {}
+
+
+# Сводные замеры запросов процесса
+timing_stats = TimingStats()
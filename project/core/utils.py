@@ -1,34 +1,130 @@
+from django.db import connection
+from django.db.models import Count, Case, When, IntegerField
+
 from .models import Vote, Voice
+from .generation import dataset_changed
 
 from tabula.wrapper import jar_path, localize_file, build_options
 
+from typing import Optional, Iterable, Mapping
+from collections import Counter
 import os
 import subprocess
-from subprocess import DEVNULL
+from subprocess import DEVNULL, PIPE
 import json
 import pandas as pd
 import io
 
 
-def recalc_vote_results(vote: Vote):
+# Поля результатов голосования для значений Voice.RESULT
+VOTE_RESULT_FIELDS = (
+    (1, 'agree'),
+    (2, 'disagree'),
+    (3, 'abstained'),
+    (4, 'did_not_participate'),
+    (5, 'absent'),
+)
+
+
+def set_vote_counts(vote: Vote, counts: Mapping[int, int]):
     """
-    Функция перерасчёта результатов голосования
+    Заполняем результаты голосования по количеству голосов депутатов
+    {значение Voice.RESULT: количество}. То же правило итога голосования
+    в SQL - recalc_votes_sql.
     """
-    vote.agree = Voice.objects.filter(vote=vote, result=1).count()
-    vote.disagree = Voice.objects.filter(vote=vote, result=2).count()
-    vote.abstained = Voice.objects.filter(vote=vote, result=3).count()
-    vote.did_not_participate = Voice.objects.filter(vote=vote, result=4)\
-                                            .count()
-    vote.absent = Voice.objects.filter(vote=vote, result=5).count()
+    for value, field in VOTE_RESULT_FIELDS:
+        setattr(vote, field, counts.get(value, 0))
 
     if vote.agree > vote.disagree:
         vote.result = 1
     else:
         vote.result = 2
 
+
+def set_vote_results(vote: Vote, results: Iterable[int]):
+    """
+    Заполняем результаты голосования по значениям голосов депутатов,
+    не обращаясь к базе данных
+    """
+    set_vote_counts(vote, Counter(results))
+
+
+def count_if(field: str, value: int) -> Count:
+    """
+    Количество строк группы, у которых поле равно значению
+    """
+    return Count(Case(When(**{field: value}, then=1),
+                      output_field=IntegerField()))
+
+
+def recalc_vote_results(vote: Vote):
+    """
+    Функция перерасчёта результатов голосования.
+    Голоса депутатов считаются одним запросом.
+    """
+    counts = Voice.objects.filter(vote=vote).aggregate(**{
+        field: count_if('result', value)
+        for value, field in VOTE_RESULT_FIELDS
+    })
+    set_vote_counts(vote, {
+        value: counts[field] for value, field in VOTE_RESULT_FIELDS
+    })
     vote.save()
 
 
+# Пересчёт результатов голосований одним запросом. Строки, результаты
+# которых не изменились, не перезаписываются
+recalc_votes_sql = """
+    UPDATE core_vote v SET
+        agree = r.agree,
+        disagree = r.disagree,
+        abstained = r.abstained,
+        did_not_participate = r.did_not_participate,
+        absent = r.absent,
+        result = CASE WHEN r.agree > r.disagree THEN 1 ELSE 2 END
+    FROM (
+        SELECT vv.id AS vote_id,
+               count(cv.id) FILTER (WHERE cv.result = 1) AS agree,
+               count(cv.id) FILTER (WHERE cv.result = 2) AS disagree,
+               count(cv.id) FILTER (WHERE cv.result = 3) AS abstained,
+               count(cv.id) FILTER (WHERE cv.result = 4)
+                   AS did_not_participate,
+               count(cv.id) FILTER (WHERE cv.result = 5) AS absent
+        FROM core_vote vv
+        LEFT JOIN core_voice cv ON cv.vote_id = vv.id
+        {where}
+        GROUP BY vv.id
+    ) r
+    WHERE v.id = r.vote_id
+      AND (v.agree, v.disagree, v.abstained, v.did_not_participate,
+           v.absent, v.result)
+          IS DISTINCT FROM
+          (r.agree, r.disagree, r.abstained, r.did_not_participate,
+           r.absent, CASE WHEN r.agree > r.disagree THEN 1 ELSE 2 END)
+"""
+
+
+def recalc_votes_results(votes: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересчёт результатов голосований (id, по умолчанию все) одним
+    запросом UPDATE ... FROM с группировкой голосов (только PostgreSQL).
+    Возвращает количество изменившихся голосований.
+    """
+    with connection.cursor() as cursor:
+        if votes is None:
+            cursor.execute(recalc_votes_sql.format(where=''))
+        else:
+            cursor.execute(
+                recalc_votes_sql.format(where='WHERE vv.id = ANY(%s)'),
+                [list(votes)]
+            )
+        count = cursor.rowcount
+
+    if count:
+        dataset_changed()
+    return count
+
+
 def read_pdf_table(input_path, **kwargs):
     """
     Мы делаем копию функции read_pdf_table из библиотеки tabula
@@ -53,6 +149,63 @@ def read_pdf_table(input_path, **kwargs):
         if is_url:
             os.unlink(path)
 
+    return parse_tabula_output(output, **kwargs)
+
+
+def get_tabula_vote_table(df: Optional[pd.DataFrame]) -> list:
+    """
+    Получаем строки таблиц с результатами голосования депутатов
+    (ФИО, результат) из таблицы, распознанной tabula
+    """
+    # На странице может не быть таблиц
+    if df is None:
+        return []
+
+    head = list(df.head())
+
+    # Таблица слева
+    full_name1 = df[head[1]].fillna('')
+    if len(head) == 8:
+        vote_result1 = df[head[3]].fillna('')
+    else:
+        vote_result1 = df[head[2]].fillna('')
+
+    # Таблица справа
+    if len(head) == 8:
+        full_name2 = df[head[5]].fillna('')
+        vote_result2 = df[head[7]].fillna('')
+    else:
+        full_name2 = df[head[4]].fillna('')
+        vote_result2 = df[head[5]].fillna('')
+
+    return get_tabula_voices(full_name1, vote_result1) + \
+        get_tabula_voices(full_name2, vote_result2)
+
+
+def get_tabula_voices(full_name: pd.Series, vote_result: pd.Series) -> list:
+    """
+    Склеиваем ФИО, разбитые tabula на несколько строк
+    """
+    voices = []
+
+    for i in range(1, len(full_name)):
+        # Если не указано значение голосования - из-за длинного имени
+        # ячейка занимает 2 строки
+        if not vote_result[i]:
+            if i + 1 < len(full_name):
+                full_name[i + 1] = '{} {}'.format(full_name[i],
+                                                  full_name[i + 1])
+            continue
+
+        voices.append((full_name[i].strip(), vote_result[i]))
+
+    return voices
+
+
+def parse_tabula_output(output: bytes, **kwargs):
+    """
+    Разбираем вывод tabula так же, как это делает read_pdf_table
+    """
     if len(output) == 0:
         return
 
@@ -64,3 +217,118 @@ def read_pdf_table(input_path, **kwargs):
 
     else:
         return pd.read_csv(io.BytesIO(output), encoding=encoding)
+
+
+class TabulaWorker:
+    """
+    Долгоживущий процесс tabula, общающийся с нами через pipe.
+    JVM запускается один раз на документ (или его часть), а не на каждую
+    страницу.
+    Если процесс не удалось запустить (например, в JVM нет Nashorn),
+    таблицы читаются через read_pdf_table как раньше.
+    """
+    script_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'java', 'tabula_worker.js'
+    )
+
+    def __init__(self):
+        self.process = None
+        self.available = True
+        # Отвечал ли процесс хотя бы раз
+        self.answered = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """
+        Запускаем процесс tabula
+        """
+        self.process = subprocess.Popen(
+            ['java', '-cp', jar_path, 'jdk.nashorn.tools.Shell',
+             self.script_path],
+            stdin=PIPE, stdout=PIPE, stderr=DEVNULL
+        )
+
+    def close(self):
+        """
+        Завершаем процесс tabula
+        """
+        if self.process is None:
+            return
+
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        finally:
+            self.process.stdout.close()
+            self.process = None
+
+    def request(self, args: list) -> Optional[bytes]:
+        """
+        Передаём аргументы командной строки tabula и получаем её вывод.
+        None, если процесс tabula недоступен.
+        Упавший процесс перезапускается один раз. Если он упал и после
+        перезапуска, страница читается без него; если процесс не ответил
+        ни разу (например, в JVM нет Nashorn), он больше не запускается.
+        """
+        for _ in range(2):
+            if self.process is None:
+                try:
+                    self.start()
+                except OSError:
+                    self.available = False
+                    return None
+
+            try:
+                self.process.stdin.write(
+                    json.dumps(args).encode('utf-8') + b'\n'
+                )
+                self.process.stdin.flush()
+                line = self.process.stdout.readline()
+            except OSError:
+                line = b''
+            if line:
+                break
+
+            # Процесс завершился
+            self.close()
+        else:
+            if not self.answered:
+                self.available = False
+            return None
+
+        self.answered = True
+        response = json.loads(line.decode('utf-8'))
+        if 'error' in response:
+            raise subprocess.CalledProcessError(
+                1, args, output=response['error']
+            )
+        return response['output'].encode('utf-8')
+
+    def read_pdf_table(self, input_path: str, **kwargs):
+        """
+        Аналог read_pdf_table, использующий запущенный процесс tabula
+        """
+        if not self.available:
+            return read_pdf_table(input_path, **kwargs)
+
+        output_format = kwargs.get('output_format', 'dataframe')
+
+        if output_format == 'dataframe':
+            kwargs.pop('format', None)
+
+        elif output_format == 'json':
+            kwargs['format'] = 'JSON'
+
+        output = self.request(build_options(kwargs) + [input_path])
+        if output is None:
+            return read_pdf_table(input_path, **kwargs)
+
+        return parse_tabula_output(output, **kwargs)
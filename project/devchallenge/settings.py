@@ -54,6 +54,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.ApiCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'devchallenge.urls'
@@ -134,6 +136,30 @@ STATIC_URL = '/static/'
 # Path to pdf files
 PDF_FILES_PATH = os.path.join(BASE_DIR, '..', 'pdf')
 
+# Cache of extracted pdf pages text and tables
+PDF_CACHE_PATH = os.path.join(BASE_DIR, '..', 'cache')
+PDF_CACHE_SIZE = 512 * 1024 * 1024
+
+# Staging files of extracted votes (parse_pdf --stage extract/load)
+PDF_STAGING_PATH = os.path.join(BASE_DIR, '..', 'staging')
+
+# Summary of parse_pdf stage timings and throughput (JSON)
+PDF_METRICS_FILE = os.path.join(BASE_DIR, '..', 'run', 'parse_pdf.json')
+
+# Dataset generation counter (bumped on every data change)
+DATASET_GENERATION_FILE = os.path.join(BASE_DIR, '..', 'run', 'generation')
+
+# Tests keep the run directory files in a temporary directory
+TEST_RUNNER = 'devchallenge.test_runner.TestRunner'
+
+# Size of the in-process API response cache in bytes (0 - disabled)
+API_CACHE_SIZE = 64 * 1024 * 1024
+
+# Share of requests timed by RequestTimingMiddleware (0 - disabled)
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 0)
+)
+
 # debug_toolbar
 INTERNAL_IPS = ('127.0.0.1',)
 DEBUG_TOOLBAR_CONFIG = {
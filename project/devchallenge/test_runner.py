@@ -0,0 +1,27 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+import os
+import shutil
+import tempfile
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Файлы каталога run (поколение данных, сводка parse_pdf) на время
+    тестов переносятся во временный каталог, чтобы тесты не меняли
+    рабочую копию и состояние запущенного сервера
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.run_path = tempfile.mkdtemp()
+        self.run_settings = override_settings(
+            DATASET_GENERATION_FILE=os.path.join(self.run_path, 'generation'),
+            PDF_METRICS_FILE=os.path.join(self.run_path, 'parse_pdf.json')
+        )
+        self.run_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.run_settings.disable()
+        shutil.rmtree(self.run_path)
+        super().teardown_test_environment(**kwargs)